@@ -1,5 +1,6 @@
 # dealer/admin.py
 from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
 from django.contrib.auth.models import Group, User
 from django.contrib.auth.admin import GroupAdmin, UserAdmin
 
@@ -10,6 +11,7 @@ from .models import (
     Commission,
     Expense,
     Income,
+    without_property_text,
 )
 
 
@@ -31,6 +33,22 @@ class SuperuserOnlyMixin:
         return request.user.is_superuser
 
 
+# ---------- Common: keep property text columns off list pages ----------
+class PropertyListChangeList(ChangeList):
+    def get_queryset(self, request, exclude_parameters=None):
+        return super().get_queryset(request, exclude_parameters).projection('list')
+
+
+class LightPropertyMixin:
+    """Changelists that show property_item skip its large text columns."""
+    list_select_related = ("property_item",)
+
+    def get_queryset(self, request):
+        # ChangeList only adds its own select_related when none is set
+        qs = super().get_queryset(request).select_related(*self.list_select_related)
+        return without_property_text(qs)
+
+
 # ---------- PropertyItem ----------
 @admin.register(PropertyItem)
 class PropertyItemAdmin(admin.ModelAdmin):
@@ -48,11 +66,16 @@ class PropertyItemAdmin(admin.ModelAdmin):
     ordering = ("-id",)
     list_per_page = 20
 
+    def get_changelist(self, request, **kwargs):
+        # change form still loads the full row
+        return PropertyListChangeList
+
 
 # ---------- Transaction ----------
 @admin.register(Transaction)
-class TransactionAdmin(admin.ModelAdmin):
+class TransactionAdmin(LightPropertyMixin, admin.ModelAdmin):
     list_display = ("id", "property_item", "investor", "transaction_type", "amount")
+    list_select_related = ("property_item", "investor")
     list_filter = ("transaction_type",)
     search_fields = ("property_item__address", "investor__full_name")
     ordering = ("-id",)
@@ -79,7 +102,7 @@ class InvestorAdmin(admin.ModelAdmin):
 
 # ---------- Commission ----------
 @admin.register(Commission)
-class CommissionAdmin(admin.ModelAdmin):
+class CommissionAdmin(LightPropertyMixin, admin.ModelAdmin):
     list_display = (
         "id",
         "property_item",
@@ -95,12 +118,19 @@ class CommissionAdmin(admin.ModelAdmin):
     ordering = ("-id",)
     readonly_fields = ("total_earned",)
     list_per_page = 20
+    actions = ["recompute_totals"]
+
+    @admin.action(description="Recompute total earned for selected commissions")
+    def recompute_totals(self, request, queryset):
+        fixed = queryset.recompute_totals()
+        self.message_user(request, f"{fixed} commission total(s) corrected.")
 
 
 # ---------- Expense ----------
 @admin.register(Expense)
-class ExpenseAdmin(admin.ModelAdmin):
+class ExpenseAdmin(LightPropertyMixin, admin.ModelAdmin):
     list_display = ("id", "date", "category", "property_item", "amount", "created_by")
+    list_select_related = ("property_item", "created_by")
     list_filter = ("category", "date")
     search_fields = ("description", "property_item__address")
     ordering = ("-date", "-id")
@@ -109,8 +139,9 @@ class ExpenseAdmin(admin.ModelAdmin):
 
 # ---------- Income ----------
 @admin.register(Income)
-class IncomeAdmin(admin.ModelAdmin):
+class IncomeAdmin(LightPropertyMixin, admin.ModelAdmin):
     list_display = ("id", "date", "source", "property_item", "amount", "created_by")
+    list_select_related = ("property_item", "created_by")
     list_filter = ("source", "date")
     search_fields = ("description", "property_item__address")
     ordering = ("-date", "-id")
@@ -4,3 +4,13 @@ from django.apps import AppConfig
 class DealerConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'dealer'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from django.db.models.signals import post_migrate
+        from . import signals  # noqa: F401  (registers the signal handlers)
+        from . import profiling
+
+        connection_created.connect(profiling.count_queries)
+        post_migrate.connect(signals.ensure_search_index, sender=self)
+        post_migrate.connect(signals.reset_cache_versions, sender=self)
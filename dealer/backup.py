@@ -0,0 +1,356 @@
+import datetime
+import io
+import json
+import zipfile
+from contextlib import contextmanager
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.management.color import no_style
+from django.db import connection, connections, transaction
+from django.db import models
+from django.db.models import Max
+from django.utils import timezone
+
+from .caching import bump_all
+from .ledger import rebuild_totals
+from .reports import clear_period_summaries, closed_through, next_month
+from .search import drop_fts_triggers, fts_installed, rebuild_fts
+from .snapshot import read_snapshot
+from .models import (
+    Investor, PropertyItem, Transaction, Commission, Expense, Income, PeriodBalance, PeriodSummary,
+)
+
+
+# ===================== FULL BACKUP ARCHIVE =====================
+# A .zip with one JSON-lines file per model (first line = column names,
+# then one JSON array per row) plus manifest.json. Models are listed in
+# FK order so a restore can remap ids as it goes.
+
+FORMAT_VERSION = 1
+
+BACKUP_MODELS = [
+    Investor, PropertyItem, Transaction, Commission, Expense, Income,
+    # closed books and cached month totals, so a restore neither reopens
+    # closed months nor re-sums every historical one
+    PeriodBalance, PeriodSummary,
+]
+
+# only restored with --flush: they describe the archive's ledgers as a
+# whole, not whatever a merge restore adds them to
+PERIOD_MODELS = [PeriodBalance, PeriodSummary]
+
+# ledger models whose rows are dated into (possibly closed) periods
+DATED_MODELS = [Expense, Income]
+
+# FK columns that point at other backed-up models
+FK_TARGETS = {
+    'property_item_id': PropertyItem,
+    'investor_id': Investor,
+}
+
+# FK columns to User, stored as the username
+USER_COLUMNS = {
+    'created_by_id': 'created_by__username',
+    'closed_by_id': 'closed_by__username',
+}
+USER_ATTNAMES = {column: attname for attname, column in USER_COLUMNS.items()}
+
+CHUNK_SIZE = 5000
+
+
+class _Encoder(DjangoJSONEncoder):
+    # DjangoJSONEncoder trims datetimes to milliseconds; keep them exact
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.date)):
+            return o.isoformat()
+        return super().default(o)
+
+
+def _member_name(model):
+    return f'{model._meta.model_name}.jsonl'
+
+
+def _columns(model):
+    """Concrete column names for a model, with user FKs swapped for the username."""
+    return [USER_COLUMNS.get(field.attname, field.attname) for field in model._meta.concrete_fields]
+
+
+def write_backup(path_or_file):
+    """
+    Write every dealer model into one archive, read inside a single
+    transaction so all files describe the same moment. Returns the manifest.
+    """
+    manifest = {
+        'format_version': FORMAT_VERSION,
+        'created_at': timezone.now().isoformat(),
+        'models': [],
+    }
+
+    with read_snapshot(), zipfile.ZipFile(path_or_file, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for model in BACKUP_MODELS:
+            cols = _columns(model)
+            rows = 0
+            with zf.open(_member_name(model), 'w') as raw:
+                out = io.TextIOWrapper(raw, encoding='utf-8', newline='\n')
+                out.write(json.dumps(cols) + '\n')
+                values = model.objects.order_by('pk').values_list(*cols).iterator(chunk_size=CHUNK_SIZE)
+                for row in values:
+                    out.write(json.dumps(row, cls=_Encoder) + '\n')
+                    rows += 1
+                out.flush()
+                out.detach()
+
+            manifest['models'].append({
+                'model': model._meta.label,
+                'file': _member_name(model),
+                'columns': cols,
+                'rows': rows,
+            })
+
+        zf.writestr('manifest.json', json.dumps(manifest, indent=2))
+
+    return manifest
+
+
+# ===================== RESTORE =====================
+
+class BackupError(Exception):
+    pass
+
+
+def _read_rows(zf, name):
+    with zf.open(name) as raw:
+        lines = io.TextIOWrapper(raw, encoding='utf-8')
+        cols = json.loads(next(lines))
+        for line in lines:
+            if line.strip():
+                yield cols, json.loads(line)
+
+
+def read_manifest(zf):
+    try:
+        manifest = json.loads(zf.read('manifest.json'))
+    except KeyError:
+        raise BackupError("Not a Khplwak backup: manifest.json is missing.")
+    if manifest.get('format_version') != FORMAT_VERSION:
+        raise BackupError(f"Unsupported backup format version {manifest.get('format_version')!r}.")
+    return manifest
+
+
+@contextmanager
+def _indexes_deferred(conn, models, defer=True):
+    """
+    SQLite: drop the secondary indexes of `models` and build them again on
+    exit, which is quicker than updating them row by row on a large load
+    into empty tables. Indexes behind PRIMARY KEY / UNIQUE (no sql) stay.
+    """
+    if not defer or conn.vendor != 'sqlite':
+        yield
+        return
+    tables = [m._meta.db_table for m in models]
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL "
+            f"AND tbl_name IN ({', '.join(['%s'] * len(tables))})",
+            tables,
+        )
+        indexes = cursor.fetchall()
+        for name, _ in indexes:
+            cursor.execute(f'DROP INDEX {conn.ops.quote_name(name)}')
+    yield
+    with conn.cursor() as cursor:
+        for _, sql in indexes:
+            cursor.execute(sql)
+
+
+def _next_id(model):
+    """First free primary key; ids are handed out from here during a restore."""
+    if connection.vendor == 'postgresql':
+        # keep other writers from taking ids out of the sequence meanwhile
+        with connection.cursor() as cursor:
+            cursor.execute(f'LOCK TABLE {connection.ops.quote_name(model._meta.db_table)} IN EXCLUSIVE MODE')
+    return (model.objects.aggregate(top=Max('pk'))['top'] or 0) + 1
+
+
+# stored as they come out of the archive
+_PLAIN_FIELDS = {
+    models.CharField, models.TextField, models.IntegerField, models.BigIntegerField,
+    models.PositiveIntegerField, models.PositiveSmallIntegerField, models.SmallIntegerField,
+    models.AutoField, models.BigAutoField,
+}
+
+
+def _converter(fields, col, users, id_maps, conn):
+    """
+    Archive value (not None) -> database parameter, for one column.
+    Values are the archive's own (ints, ISO dates, decimal strings), so
+    the common types skip the field's to_python() validation and go
+    straight to the backend's adapter.
+    """
+    if col in USER_COLUMNS.values():
+        return users.get
+    field = fields[col]
+    if col in FK_TARGETS:
+        return id_maps[FK_TARGETS[col]].get   # JSON ints, like the map's keys
+    kind = type(field)
+    if kind in _PLAIN_FIELDS:
+        # JSON already gives the str / int the database takes
+        return _same
+    if kind is models.DecimalField:
+        return Decimal
+    if kind is models.DateTimeField:
+        adapt = conn.ops.adapt_datetimefield_value
+        return lambda value: adapt(datetime.datetime.fromisoformat(value))
+    if kind is models.DateField:
+        adapt = conn.ops.adapt_datefield_value
+        return lambda value: adapt(datetime.date.fromisoformat(value))
+    to_python, prep = field.to_python, field.get_db_prep_save
+    return lambda value: prep(to_python(value), conn)
+
+
+def _same(value):
+    return value
+
+
+def _insert_sql(model, columns):
+    quote = connection.ops.quote_name
+    return 'INSERT INTO {} ({}) VALUES ({})'.format(
+        quote(model._meta.db_table),
+        ', '.join(quote(c) for c in columns),
+        ', '.join(['%s'] * len(columns)),
+    )
+
+
+def insert_objects(model, objs, batch_size=CHUNK_SIZE):
+    """
+    INSERT unsaved instances exactly as they are, in executemany batches.
+    Unlike bulk_create(), auto_now_add / auto_now fields keep the values
+    set on the instances, without switching them off on the shared model
+    fields (which would affect every other thread's saves meanwhile).
+    No signals, no pk set on the instances. Returns the number of rows.
+    """
+    fields = [f for f in model._meta.concrete_fields if not f.primary_key]
+    sql = _insert_sql(model, [f.column for f in fields])
+    conn = connections[model.objects.db]   # not the per-call proxy
+    preps = [(f.attname, f.get_db_prep_save) for f in fields]
+    count = 0
+    batch = []
+    with conn.cursor() as cursor:
+        for obj in objs:
+            batch.append([prep(getattr(obj, attname), conn) for attname, prep in preps])
+            if len(batch) >= batch_size:
+                cursor.executemany(sql, batch)
+                count += len(batch)
+                batch.clear()
+        if batch:
+            cursor.executemany(sql, batch)
+            count += len(batch)
+    return count
+
+
+def restore_backup(path_or_file, batch_size=CHUNK_SIZE, flush=False, stdout=None):
+    """
+    Load an archive written by write_backup() with one multi-row INSERT
+    (executemany) per batch. Values are converted column by column with the
+    model fields, without building model instances. Rows get new primary
+    keys counted on from the table's current maximum; FKs are remapped
+    through the old->new id maps of the models restored before them.
+    Without `flush` the rows are merged into the existing data: the
+    period balances and summaries are not restored, and an expense or
+    income row dated in a closed month fails the whole restore.
+    Returns {label: rows}.
+    """
+    counts = {}
+    with zipfile.ZipFile(path_or_file) as zf, transaction.atomic():
+        manifest = read_manifest(zf)
+        entries = {m['model']: m for m in manifest['models']}
+
+        # re-index the search table once at the end, not per row
+        search_index = fts_installed()
+        if search_index:
+            drop_fts_triggers()
+
+        if flush:
+            # children first; plain DELETEs without per-row signals, the
+            # running totals are rebuilt below anyway
+            for model in reversed(BACKUP_MODELS):
+                model.objects.all()._raw_delete(model.objects.db)
+            closed = None
+        else:
+            closed = closed_through()
+
+        conn = connections[BACKUP_MODELS[0].objects.db]   # not the per-call proxy
+        users = dict(User.objects.values_list('username', 'id'))
+        id_maps = {}
+
+        with _indexes_deferred(conn, BACKUP_MODELS, defer=flush):
+            for model in BACKUP_MODELS:
+                entry = entries.get(model._meta.label)
+                if entry is None or (model in PERIOD_MODELS and not flush):
+                    continue
+
+                fields = {f.attname: f for f in model._meta.concrete_fields}
+                cols = entry['columns']
+                convert = [_converter(fields, col, users, id_maps, conn) for col in cols]
+                db_cols = [USER_ATTNAMES.get(c, c) for c in cols]
+                # columns added to the model after the backup was taken
+                missing = [f for name, f in fields.items() if name not in db_cols]
+                defaults = [
+                    f.get_db_prep_save(timezone.now() if getattr(f, 'auto_now_add', False) else f.get_default(), conn)
+                    for f in missing
+                ]
+                sql = _insert_sql(model, db_cols + [f.attname for f in missing])
+                id_col = cols.index('id')
+                # ISO dates compare as strings
+                date_col, open_from = None, None
+                if closed is not None and model in DATED_MODELS:
+                    date_col, open_from = cols.index('date'), next_month(closed).isoformat()
+
+                id_map = {}
+                next_id = _next_id(model)
+                batch = []
+                with conn.cursor() as cursor:
+                    for _, row in _read_rows(zf, entry['file']):
+                        if date_col is not None and row[date_col] < open_from:
+                            raise BackupError(
+                                f"{model._meta.verbose_name.capitalize()} {row[id_col]} is dated "
+                                f"{row[date_col]}, in a closed month (books closed through "
+                                f"{closed:%B %Y}). Restore with --flush to replace the books."
+                            )
+                        values = [
+                            None if value is None else fn(value)
+                            for fn, value in zip(convert, row)
+                        ]
+                        id_map[values[id_col]] = values[id_col] = next_id
+                        next_id += 1
+                        batch.append(values + defaults)
+                        if len(batch) >= batch_size:
+                            cursor.executemany(sql, batch)
+                            batch.clear()
+                    if batch:
+                        cursor.executemany(sql, batch)
+
+                id_maps[model] = id_map
+                counts[model._meta.label] = len(id_map)
+                if stdout:
+                    stdout.write(f"  {model._meta.label}: {len(id_map)} rows")
+
+        # explicit ids leave PostgreSQL sequences behind
+        with conn.cursor() as cursor:
+            for statement in conn.ops.sequence_reset_sql(no_style(), BACKUP_MODELS):
+                cursor.execute(statement)
+
+        if search_index:
+            rebuild_fts()
+
+        # raw INSERTs skip signals -> recompute the running totals once;
+        # merged rows change month totals, so let the summaries fill in
+        # again on the next report
+        rebuild_totals()
+        if not flush:
+            clear_period_summaries()
+        bump_all()
+
+    return counts
@@ -0,0 +1,352 @@
+import datetime
+import json
+import multiprocessing
+import platform
+import statistics
+import time
+from decimal import Decimal
+from urllib.parse import urlsplit
+
+import django
+from django.core.cache import cache
+from django.db import OperationalError, connection, connections, reset_queries
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, reverse
+from django.utils import timezone
+
+from . import urls as dealer_urls
+from .api import RESOURCES
+from .models import Investor, PropertyItem, Transaction, Commission, Expense, Income, LedgerTotal
+from .profiling import recent_requests
+from .search import fts_supported, icontains_search, search_properties
+from .views import AUTOCOMPLETE_SOURCES
+
+
+# ===================== URL BENCHMARK =====================
+# Times every GET page in dealer/urls.py through the test client:
+# `repeat` cold requests (cache cleared each time, so the real queries
+# run) and `repeat` warm ones, interleaved across pages, keeping the
+# median of each. Results are plain JSON so runs at different scales or
+# on different commits can be kept and compared.
+
+# POST-only or with side effects on GET
+SKIP = {'login', 'logout', 'finance_close'}
+
+# url name prefix -> model its <id> refers to
+ID_MODELS = {
+    'investor': Investor,
+    'property': PropertyItem,
+    'commission': Commission,
+    'transaction': Transaction,
+    'expense': Expense,
+    'income': Income,
+}
+
+# extra query strings worth timing separately
+VARIANTS = {
+    'property_list': ['?q=kabul', '?pnl=1&sort=-profit'],
+    'investor_list': ['?sort=-net'],
+    'finance_report': ['?group=quarter'],
+    'export_backup_csv': ['?gzip=1'],
+    'autocomplete': ['?q=ka'],
+}
+
+COUNTED_MODELS = [PropertyItem, Investor, Transaction, Commission, Expense, Income]
+
+# compare(): ignore slowdowns smaller than this, they are noise
+NOISE_MS = 2.0
+
+# compare(): a median of fewer samples than this is one noisy request,
+# so only query counts are compared
+MIN_SAMPLES = 3
+
+
+def _sample_id(model):
+    return model.objects.order_by('pk').values_list('pk', flat=True).first()
+
+
+def _kwargs_for(name, pattern):
+    """Concrete kwargs (one or more sets) for a URL pattern, or [] if there is no data."""
+    params = set(pattern.pattern.converters)
+    if not params:
+        return [{}]
+
+    if 'resource' in params:
+        sources = RESOURCES if name.startswith('api_') else AUTOCOMPLETE_SOURCES
+        sets = []
+        for resource in sources:
+            kwargs = {'resource': resource}
+            if 'pk' in params:
+                pk = _sample_id(RESOURCES[resource].model)
+                if pk is None:
+                    continue
+                kwargs['pk'] = pk
+            sets.append(kwargs)
+        return sets
+
+    model = next((m for prefix, m in ID_MODELS.items() if name.startswith(prefix)), None)
+    pk = _sample_id(model) if model else None
+    if pk is None:
+        return []
+    return [{'id': pk}]
+
+
+def discover_cases():
+    """[(label, url)] for every benchmarkable GET in dealer/urls.py."""
+    cases = []
+    for pattern in dealer_urls.urlpatterns:
+        if not isinstance(pattern, URLPattern) or not pattern.name or pattern.name in SKIP:
+            continue
+        for kwargs in _kwargs_for(pattern.name, pattern):
+            url = reverse(pattern.name, kwargs=kwargs)
+            label = pattern.name + ''.join(f':{kwargs[k]}' for k in ('resource',) if k in kwargs)
+            cases.append((label, url))
+            for query in VARIANTS.get(pattern.name, []):
+                cases.append((f'{label}{query}', url + query))
+    return cases
+
+
+def _get(client, url):
+    """(status, bytes, ms, template ms or None) for one GET."""
+    started = time.perf_counter()
+    response = client.get(url)
+    if response.streaming:
+        size = sum(len(chunk) for chunk in response.streaming_content)
+    else:
+        size = len(response.content)
+    elapsed = (time.perf_counter() - started) * 1000
+
+    # render time as measured by the RequestProfiler middleware
+    recent = recent_requests()[:1]
+    template_ms = recent[0]['template_ms'] if recent and recent[0]['path'] == urlsplit(url).path else None
+    return response.status_code, size, elapsed, template_ms
+
+
+def _median(values):
+    return round(statistics.median(values), 2) if values else None
+
+
+def run(user, repeat=5, cases=None, stdout=None):
+    """
+    Benchmark `cases` (default: discover_cases()) logged in as `user`.
+    Each of the `repeat` rounds requests every page once cold and once
+    warm, so a slow spell on the machine lands on one sample of many
+    pages rather than on every sample of one.
+    """
+    if repeat < 1:
+        raise ValueError("repeat must be at least 1")
+    client = Client(SERVER_NAME='localhost')
+    client.force_login(user)
+    cases = cases or discover_cases()
+    first = {}
+    timings = {label: ([], [], []) for label, _ in cases}
+
+    for n in range(repeat):
+        if stdout:
+            stdout.write(f"Round {n + 1} of {repeat}...")
+        for label, url in cases:
+            cold, warm, rendered = timings[label]
+            cache.clear()
+            reset_queries()   # a full queries_log (DEBUG) would make the capture come out empty
+            with CaptureQueriesContext(connection) as ctx:
+                status, size, ms, _ = _get(client, url)
+            cold.append(ms)
+            if not n:
+                first[label] = (status, size, len(ctx.captured_queries))
+            _, _, ms, template_ms = _get(client, url)
+            warm.append(ms)
+            if template_ms is not None:
+                rendered.append(template_ms)
+
+    results = {}
+    for label, url in cases:
+        status, size, queries = first[label]
+        cold, warm, rendered = timings[label]
+        results[label] = r = {
+            'url': url,
+            'status': status,
+            'queries': queries,
+            'bytes': size,
+            'samples': repeat,
+            'cold_ms': _median(cold),
+            'warm_ms': _median(warm),
+            'template_ms': _median(rendered),
+        }
+        if stdout:
+            stdout.write(
+                f"  {label:<40} {status}  {queries:>3} q  "
+                f"cold {r['cold_ms']:>9.1f} ms  warm {r['warm_ms']:>8.1f} ms  "
+                f"render {r['template_ms'] or 0:>7.1f} ms  {size:>10} B  (median of {repeat})"
+            )
+
+    return {'meta': meta(repeat), 'results': results}
+
+
+def meta(repeat):
+    """What a result file was measured against."""
+    return {
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'rows': {m._meta.label: m.objects.count() for m in COUNTED_MODELS},
+        'database': connection.vendor,
+        'django': django.get_version(),
+        'python': platform.python_version(),
+        'repeat': repeat,
+    }
+
+
+def samples(result):
+    """Samples behind each timing in run() output; files from before 'samples' existed took one cold sample."""
+    counts = [r.get('samples', 1) for r in result['results'].values()]
+    return min(counts, default=0)
+
+
+def compare(current, baseline, threshold=1.25):
+    """
+    Regressions of `current` against `baseline` (both run() output):
+    [(label, what, baseline value, current value)]. A page regresses when
+    it runs more queries, or when its median cold, warm or render time
+    grows by more than `threshold` times (and by more than NOISE_MS).
+    Times are only compared when both sides took MIN_SAMPLES or more.
+    """
+    timed = min(samples(current), samples(baseline)) >= MIN_SAMPLES
+    regressions = []
+    for label, now in current['results'].items():
+        before = baseline['results'].get(label)
+        if before is None:
+            continue
+        if now['queries'] > before['queries']:
+            regressions.append((label, 'queries', before['queries'], now['queries']))
+        if not timed:
+            continue
+        for key in ('cold_ms', 'warm_ms', 'template_ms'):
+            old, new = before.get(key), now.get(key)
+            if old is None or new is None:
+                continue
+            if new > old * threshold and new - old > NOISE_MS:
+                regressions.append((label, key, old, new))
+    return regressions
+
+
+def load(path):
+    with open(path) as fh:
+        return json.load(fh)
+
+
+def save(data, path):
+    with open(path, 'w') as fh:
+        json.dump(data, fh, indent=2, sort_keys=True)
+
+
+# ===================== SEARCH =====================
+# What property_list runs for ?q= (the match count and the first page),
+# through the FTS5 index and through the icontains scan it replaced on
+# SQLite, over the same fields. Rounds are interleaved as in run().
+
+SEARCH_TERMS = ['karte', 'wazir akbar', 'stanikzai', 'solar roof', 'nowhere']
+SEARCH_PAGE = 25
+
+
+def _search_page(queryset, ordering):
+    """(matches, ms) for the count and first page of one search."""
+    started = time.perf_counter()
+    count = queryset.count()
+    list(queryset.order_by(*ordering).values_list('pk', flat=True)[:SEARCH_PAGE])
+    return count, (time.perf_counter() - started) * 1000
+
+
+def search_comparison(terms=SEARCH_TERMS, repeat=5, stdout=None):
+    """Rows and median ms for each path, per term, over the current PropertyItem table."""
+    if not fts_supported():
+        raise ValueError("the FTS5 index is SQLite only")
+    if repeat < 1:
+        raise ValueError("repeat must be at least 1")
+    properties = PropertyItem.objects.all()
+    paths = {}
+    for term in terms:
+        ranked, _ = search_properties(properties, term)
+        paths[term] = [
+            ('fts', ranked, ['search_rank', 'id']),
+            ('icontains', icontains_search(properties, term), ['id']),
+        ]
+    rows, timings = {}, {(term, name): [] for term in terms for name in ('fts', 'icontains')}
+    for _ in range(repeat):
+        for term in terms:
+            for name, queryset, ordering in paths[term]:
+                rows[term, name], ms = _search_page(queryset, ordering)
+                timings[term, name].append(ms)
+
+    results = {}
+    for term in terms:
+        r = results[term] = {'samples': repeat}
+        for name in ('fts', 'icontains'):
+            r[f'{name}_rows'] = rows[term, name]
+            r[f'{name}_ms'] = _median(timings[term, name])
+        if stdout:
+            stdout.write(
+                f"  {term!r:<16} fts {r['fts_rows']:>7} rows {r['fts_ms']:>9.1f} ms   "
+                f"icontains {r['icontains_rows']:>7} rows {r['icontains_ms']:>9.1f} ms  (median of {repeat})"
+            )
+    return {'meta': meta(repeat), 'search': results}
+
+
+# ===================== WRITE CONCURRENCY =====================
+# Several processes saving expenses at once, as gunicorn workers do on
+# expense_create: every save is the INSERT plus the ledger total and
+# cache version writes from the signals, in the one transaction that
+# LedgerRow.save opens, followed by a read of the running totals. Saves
+# that fail with "database is locked" are counted, not retried.
+
+def _writer(worker, writes):
+    saved = locked = 0
+    today = timezone.localdate()
+    for i in range(writes):
+        try:
+            Expense.objects.create(
+                description=f"stress {worker}-{i}", category='office',
+                amount=Decimal('100.00'), date=today,
+            )
+            list(LedgerTotal.objects.all())
+            saved += 1
+        except OperationalError as exc:
+            if 'locked' not in str(exc):
+                raise
+            locked += 1
+    connections.close_all()
+    return saved, locked
+
+
+def write_stress(processes=4, writes=100, tuned=True):
+    """
+    `processes` forked workers each saving `writes` expenses against the
+    default database. tuned=False runs with the database OPTIONS removed
+    and the rollback journal, i.e. Django's SQLite defaults.
+    """
+    settings_dict = connection.settings_dict
+    options = settings_dict['OPTIONS']
+    try:
+        if not tuned:
+            settings_dict['OPTIONS'] = {}
+            connection.close()
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA journal_mode=DELETE')   # WAL sticks to the file
+        connections.close_all()   # children must open their own
+
+        started = time.perf_counter()
+        with multiprocessing.get_context('fork').Pool(processes) as pool:
+            results = pool.starmap(_writer, [(n, writes) for n in range(processes)])
+        seconds = time.perf_counter() - started
+    finally:
+        settings_dict['OPTIONS'] = options
+        connection.close()
+
+    saved = sum(r[0] for r in results)
+    return {
+        'mode': 'tuned' if tuned else 'defaults',
+        'processes': processes,
+        'writes': processes * writes,
+        'saved': saved,
+        'locked': sum(r[1] for r in results),
+        'seconds': round(seconds, 2),
+        'per_second': round(saved / seconds, 1) if seconds else None,
+    }
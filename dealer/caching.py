@@ -0,0 +1,160 @@
+import hashlib
+import uuid
+from functools import wraps
+
+from django.contrib import messages
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.utils import timezone
+from django.utils.cache import add_never_cache_headers, get_conditional_response
+from django.utils.http import quote_etag
+
+from .models import Investor, PropertyItem, Transaction, Commission, Expense, Income, PeriodBalance
+
+
+# ===================== VERSIONED CACHE =====================
+# Expensive view data (dashboard KPIs, report series, list pages) is
+# cached under keys that embed a version token per model it was built
+# from. Saving or deleting a row gives its model a new token, so every
+# entry built from the old data is simply never looked up again and
+# ages out. The tokens only mean anything if every process reads the
+# same cache: on a process-local backend (local memory) nothing is cached
+# unless settings.CACHE_SINGLE_PROCESS says there is just one process.
+
+CACHE_TIMEOUT = 60 * 60
+
+# models whose post_save / post_delete bump their version
+VERSIONED_MODELS = [Investor, PropertyItem, Transaction, Commission, Expense, Income, PeriodBalance]
+
+
+def _version_key(model):
+    return f'khplwak:version:{model._meta.label_lower}'
+
+
+def _new_token():
+    return uuid.uuid4().hex[:12]
+
+
+def versions(*models):
+    """Current version token of each model (created on first use)."""
+    keys = [_version_key(m) for m in models]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            cache.add(key, _new_token(), None)
+            found[key] = cache.get(key) or _new_token()
+    return [found[key] for key in keys]
+
+
+def bump(*models):
+    """
+    New version for `models`, applied once the current transaction
+    commits so nobody can cache pre-commit data under the new version.
+    """
+    def apply():
+        cache.set_many({_version_key(m): _new_token() for m in models}, None)
+    transaction.on_commit(apply)
+
+
+def bump_all():
+    bump(*VERSIONED_MODELS)
+
+
+def cache_key(name, models, *parts):
+    digest = hashlib.md5(repr(parts).encode()).hexdigest()
+    return f"khplwak:{name}:{'.'.join(versions(*models))}:{digest}"
+
+
+def shared_versions():
+    """
+    Whether every process sees the same version tokens: a shared cache
+    backend, or a process-local one in a single-process setup.
+    """
+    return settings.CACHE_SINGLE_PROCESS or not isinstance(caches[DEFAULT_CACHE_ALIAS], LocMemCache)
+
+
+def cached(name, models, compute, *parts, timeout=CACHE_TIMEOUT):
+    """
+    compute() cached under `name` + the versions of `models` + `parts`
+    (anything else the result depends on, e.g. the query string).
+    """
+    if not shared_versions():
+        return compute()
+    key = cache_key(name, models, *parts)
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        cache.set(key, value, timeout)
+    return value
+
+
+def query_parts(request):
+    """The request's GET parameters in a stable order, for cache keys."""
+    return tuple(sorted((k, tuple(v)) for k, v in request.GET.lists()))
+
+
+# ===================== CONDITIONAL GET =====================
+# Opt-in for read-only pages: the ETag is built from the same version
+# tokens, so a browser revalidating an unchanged page gets a 304 before
+# the view runs any query or renders anything. Like cached(), only where
+# every process sees the same tokens (shared_versions()); otherwise a
+# worker that missed a save would keep answering 304 for the old page. These responses are sent
+# as `private, no-cache` (browser may keep them, must revalidate, shared
+# caches must not store them) instead of the usual no-store.
+
+REVALIDATE_CACHE_CONTROL = 'private, no-cache'
+
+
+def _etag_func(name, models, daily):
+    def etag(request, *args, **kwargs):
+        # pending flash messages are rendered (and consumed) by the page
+        if len(messages.get_messages(request)):
+            return None
+        parts = [
+            name,
+            versions(*models),
+            request.user.pk,
+            request.session.session_key,   # new session -> new CSRF token
+            query_parts(request),
+            args,
+            sorted(kwargs.items()),
+        ]
+        if daily:
+            parts.append(timezone.localdate())
+        return hashlib.md5(repr(parts).encode()).hexdigest()
+    return etag
+
+
+def revalidate(name, models, daily=False):
+    """
+    Use instead of @never_cache on read-only views: answers If-None-Match
+    with 304 while none of `models` changed (and, with daily=True, on the
+    same day). Pages with pending messages are never conditional.
+    """
+    etag_func = _etag_func(name, models, daily)
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            etag = None
+            if request.method in ('GET', 'HEAD') and shared_versions():
+                etag = etag_func(request, *args, **kwargs)
+
+            response = None
+            if etag:
+                etag = quote_etag(etag)
+                response = get_conditional_response(request, etag=etag)
+            if response is None:
+                response = view(request, *args, **kwargs)
+
+            if etag and response.status_code in (200, 304):
+                response['ETag'] = etag
+                response['Cache-Control'] = REVALIDATE_CACHE_CONTROL
+                response.revalidate = True   # NoCacheForAuthenticatedPages leaves it alone
+            else:
+                add_never_cache_headers(response)
+            return response
+        return wrapper
+    return decorator
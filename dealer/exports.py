@@ -0,0 +1,206 @@
+import csv
+import zlib
+from contextlib import contextmanager
+
+from django.db import connection
+
+from .models import Investor, PropertyItem, Transaction, Commission, Expense, Income
+from .snapshot import read_snapshot
+
+
+CHUNK_SIZE = 2000
+
+
+@contextmanager
+def streaming_read():
+    """
+    Where an export's .iterator() queries run. On PostgreSQL they are
+    server-side cursors: inside one REPEATABLE READ transaction they are
+    plain cursors that stream (in autocommit Django has to declare them
+    WITH HOLD, and the server materializes the whole result before the
+    first row), and every backup section sees the same moment. SQLite
+    reads without a transaction, which would take the write lock.
+    """
+    if connection.vendor != 'postgresql':
+        yield
+        return
+    with read_snapshot():
+        yield
+
+
+class Echo:
+    """
+    Pseudo-buffer for csv.writer: write() just hands the line back,
+    so rows can be yielded straight into a StreamingHttpResponse.
+    """
+    def write(self, value):
+        return value
+
+
+# ===================== PROPERTIES CSV =====================
+# (header, model field) in export order. The import pipeline reads the
+# same layout back.
+
+PROPERTY_CSV_COLUMNS = [
+    ('ID', 'id'),
+    ('Address', 'address'),
+    ('City', 'city'),
+    ('Area', 'area_name'),
+    ('Property Type', 'property_type'),
+    ('Listing Type', 'listing_type'),
+    ('Status', 'status'),
+    ('Size (Biswa)', 'size'),
+    ('Bedrooms', 'bedrooms'),
+    ('Bathrooms', 'bathrooms'),
+    ('Kitchens', 'kitchens'),
+    ('Floor No', 'floor_no'),
+    ('Total Floors', 'total_floors'),
+    ('Parking Spaces', 'parking_spaces'),
+    ('Floor Area (sqft)', 'floor_area_sqft'),
+    ('Sale Price', 'sale_price'),
+    ('Rent Monthly', 'rent_monthly'),
+    ('Rent Deposit', 'rent_deposit'),
+    ('Mortgage Amount', 'mortgage_amount'),
+    ('Mortgage Terms', 'mortgage_terms'),
+    ('Owner Name', 'owner_name'),
+    ('Owner Contact', 'owner_contact'),
+    ('Description', 'description'),
+]
+
+# free-text columns that get newlines flattened
+_FLATTEN = {'mortgage_terms', 'description'}
+
+
+def property_csv_lines(properties):
+    """
+    Yield the properties CSV one encoded line at a time.
+    Reads plain tuples in chunks (no model instances, no result cache),
+    so memory stays flat however many rows are exported.
+    """
+    writer = csv.writer(Echo())
+    fields = [field for _, field in PROPERTY_CSV_COLUMNS]
+    listing_col = fields.index('listing_type')
+    flatten_cols = [i for i, f in enumerate(fields) if f in _FLATTEN]
+    listing_labels = dict(PropertyItem.LISTING_CHOICES)
+
+    yield writer.writerow([header for header, _ in PROPERTY_CSV_COLUMNS])
+
+    with streaming_read():
+        rows = properties.values_list(*fields).iterator(chunk_size=CHUNK_SIZE)
+        for values in rows:
+            row = [v or '' for v in values]
+            row[listing_col] = listing_labels.get(values[listing_col], values[listing_col])
+            for i in flatten_cols:
+                row[i] = row[i].replace('\n', ' ')
+            yield writer.writerow(row)
+
+
+# ===================== FULL BACKUP CSV =====================
+# One section per model: (title, model, [(header, lookup)]).
+# FK columns are pulled through values() joins, so every section is a
+# single query no matter how many rows it has.
+
+BACKUP_SECTIONS = [
+    ('INVESTORS', Investor, [
+        ('id', 'id'),
+        ('full_name', 'full_name'),
+        ('surname', 'surname'),
+        ('phone', 'phone'),
+        ('location', 'location'),
+        ('invested_amount', 'invested_amount'),
+        ('created_at', 'created_at'),
+    ]),
+    ('PROPERTIES', PropertyItem, [
+        ('id', 'id'),
+        ('address', 'address'),
+        ('city', 'city'),
+        ('area_name', 'area_name'),
+        ('property_type', 'property_type'),
+        ('listing_type', 'listing_type'),
+        ('status', 'status'),
+        ('sale_price', 'sale_price'),
+        ('rent_monthly', 'rent_monthly'),
+        ('rent_deposit', 'rent_deposit'),
+        ('mortgage_amount', 'mortgage_amount'),
+        ('owner_name', 'owner_name'),
+        ('owner_contact', 'owner_contact'),
+        ('created_at', 'created_at'),
+    ]),
+    ('TRANSACTIONS', Transaction, [
+        ('id', 'id'),
+        ('transaction_date', 'transaction_date'),
+        ('transaction_type', 'transaction_type'),
+        ('amount', 'amount'),
+        ('property_item', 'property_item__address'),
+        ('investor', 'investor__full_name'),
+    ]),
+    ('COMMISSIONS', Commission, [
+        ('id', 'id'),
+        ('created_at', 'created_at'),
+        ('property_item', 'property_item__address'),
+        ('deal_type', 'deal_type'),
+        ('deal_amount', 'deal_amount'),
+        ('commission_type', 'commission_type'),
+        ('commission_value', 'commission_value'),
+        ('total_earned', 'total_earned'),
+        ('notes', 'notes'),
+    ]),
+    ('EXPENSES', Expense, [
+        ('id', 'id'),
+        ('date', 'date'),
+        ('category', 'category'),
+        ('description', 'description'),
+        ('amount', 'amount'),
+        ('property_item', 'property_item__address'),
+        ('remarks', 'remarks'),
+    ]),
+    ('INCOME', Income, [
+        ('id', 'id'),
+        ('date', 'date'),
+        ('source', 'source'),
+        ('description', 'description'),
+        ('amount', 'amount'),
+        ('property_item', 'property_item__address'),
+        ('remarks', 'remarks'),
+    ]),
+]
+
+
+def backup_csv_lines():
+    """Yield the full backup CSV, section by section, in constant memory."""
+    writer = csv.writer(Echo())
+
+    with streaming_read():
+        for i, (title, model, columns) in enumerate(BACKUP_SECTIONS):
+            if i:
+                yield writer.writerow([])
+            yield writer.writerow([f'=== {title} ==='])
+            yield writer.writerow([header for header, _ in columns])
+
+            lookups = [lookup for _, lookup in columns]
+            rows = model.objects.order_by('id').values_list(*lookups).iterator(chunk_size=CHUNK_SIZE)
+            for values in rows:
+                yield writer.writerow(values)
+
+
+def buffered(lines, size=64 * 1024):
+    """Group small text lines into ~size byte chunks for the response."""
+    buf, length = [], 0
+    for line in lines:
+        buf.append(line)
+        length += len(line)
+        if length >= size:
+            yield ''.join(buf)
+            buf, length = [], 0
+    if buf:
+        yield ''.join(buf)
+
+
+def gzip_stream(chunks, level=6):
+    """Gzip a stream of text chunks on the fly."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
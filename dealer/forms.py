@@ -2,7 +2,9 @@ from django import forms
 from .models import Investor, PropertyItem, Transaction, Commission
 import re
 from django import forms
+from django.urls import reverse_lazy
 from .models import Expense, Income
+from .reports import check_open
 
 
 
@@ -217,7 +219,53 @@ class PropertyItemForm(forms.ModelForm):
         }
 
 
-class TransactionForm(forms.ModelForm):
+class AutocompleteSelect(forms.Select):
+    """
+    <select> that renders only the chosen option; the others are fetched
+    from the autocomplete endpoint as the user types (autocomplete.js),
+    so the page stays the same size however many rows the table has.
+    """
+
+    class Media:
+        js = ['dealer/js/autocomplete.js']
+
+    def __init__(self, resource, attrs=None):
+        super().__init__(attrs)
+        self.resource = resource
+
+    def build_attrs(self, base_attrs, extra_attrs=None):
+        attrs = super().build_attrs(base_attrs, extra_attrs)
+        attrs['data-autocomplete-url'] = reverse_lazy('autocomplete', args=[self.resource])
+        return attrs
+
+    def optgroups(self, name, value, attrs=None):
+        field = self.choices.field
+        selected = [v for v in value if str(v).isdigit()]
+        options = []
+        if field.empty_label is not None:
+            options.append(self.create_option(name, '', field.empty_label, not selected, 0))
+        for index, obj in enumerate(self.choices.queryset.filter(pk__in=selected), start=1):
+            options.append(self.create_option(
+                name, field.prepare_value(obj), field.label_from_instance(obj), True, index,
+            ))
+        return [(None, options, 0)]
+
+
+class LightChoicesMixin:
+    """
+    FK choices load only what the label needs: the chosen row on render,
+    the submitted pk on validation.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if 'property_item' in self.fields:
+            self.fields['property_item'].queryset = PropertyItem.objects.projection('dropdown')
+        if 'investor' in self.fields:
+            self.fields['investor'].queryset = Investor.objects.only('id', 'full_name')
+
+
+class TransactionForm(LightChoicesMixin, forms.ModelForm):
     class Meta:
         model = Transaction
         fields = [
@@ -227,10 +275,10 @@ class TransactionForm(forms.ModelForm):
             "amount",
         ]
         widgets = {
-            "property_item": forms.Select(attrs={
+            "property_item": AutocompleteSelect("properties", attrs={
                 "class": "form-select"
             }),
-            "investor": forms.Select(attrs={
+            "investor": AutocompleteSelect("investors", attrs={
                 "class": "form-select"
             }),
             "transaction_type": forms.Select(
@@ -249,7 +297,7 @@ class TransactionForm(forms.ModelForm):
         }
 
 
-class CommissionForm(forms.ModelForm):
+class CommissionForm(LightChoicesMixin, forms.ModelForm):
     class Meta:
         model = Commission
         fields = [
@@ -261,7 +309,7 @@ class CommissionForm(forms.ModelForm):
             "notes",
         ]
         widgets = {
-            "property_item": forms.Select(attrs={
+            "property_item": AutocompleteSelect("properties", attrs={
                 "class": "form-select"
             }),
             "deal_type": forms.Select(attrs={
@@ -291,7 +339,17 @@ class CommissionForm(forms.ModelForm):
 
 
 
-class ExpenseForm(forms.ModelForm):
+class ClosedPeriodMixin:
+    """Reject dates (new or, when editing, the current one) in closed months."""
+
+    def clean_date(self):
+        date = self.cleaned_data.get('date')
+        old = self.instance.date if self.instance.pk else None
+        check_open(date, old)
+        return date
+
+
+class ExpenseForm(LightChoicesMixin, ClosedPeriodMixin, forms.ModelForm):
     class Meta:
         model = Expense
         fields = [
@@ -303,12 +361,13 @@ class ExpenseForm(forms.ModelForm):
             'remarks',
         ]
         widgets = {
+            'property_item': AutocompleteSelect('properties'),
             'date': forms.DateInput(attrs={'type': 'date'}),
             'remarks': forms.Textarea(attrs={'rows': 2}),
         }
 
 
-class IncomeForm(forms.ModelForm):
+class IncomeForm(LightChoicesMixin, ClosedPeriodMixin, forms.ModelForm):
     class Meta:
         model = Income
         fields = [
@@ -320,6 +379,33 @@ class IncomeForm(forms.ModelForm):
             'remarks',
         ]
         widgets = {
+            'property_item': AutocompleteSelect('properties'),
             'date': forms.DateInput(attrs={'type': 'date'}),
             'remarks': forms.Textarea(attrs={'rows': 2}),
         }
+
+
+class ImportForm(forms.Form):
+    KIND_CHOICES = [
+        ('properties', 'Properties (same columns as the properties CSV export)'),
+        ('investors', 'Investors'),
+    ]
+
+    kind = forms.ChoiceField(
+        choices=KIND_CHOICES,
+        widget=forms.Select(attrs={"class": "form-select"})
+    )
+    file = forms.FileField(
+        widget=forms.ClearableFileInput(attrs={
+            "class": "form-control",
+            "accept": ".csv,.xlsx",
+        })
+    )
+    dry_run = forms.BooleanField(
+        required=False,
+        label="Only check the file (import nothing)"
+    )
+    skip_invalid = forms.BooleanField(
+        required=False,
+        label="Import the valid rows even if some rows have errors"
+    )
@@ -0,0 +1,246 @@
+import codecs
+import csv
+import os
+from contextlib import nullcontext
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from .backup import insert_objects
+from .caching import bump
+from .exports import PROPERTY_CSV_COLUMNS
+from .forms import AF_PHONE_REGEX
+from .models import Investor, PropertyItem
+
+
+BATCH_SIZE = 2000
+MAX_REPORTED_ERRORS = 200
+
+
+# ===================== READING FILES =====================
+
+def _normalise_header(name):
+    return (name or '').strip().lower().replace(' ', '_')
+
+
+def read_rows(fileobj, filename=''):
+    """
+    Yield (row_number, {header: value}) from a .csv or .xlsx upload,
+    reading the file as it goes rather than loading it whole.
+    Row numbers are spreadsheet line numbers (header = 1).
+    """
+    ext = os.path.splitext(filename or getattr(fileobj, 'name', ''))[1].lower()
+
+    if ext in ('.xlsx', '.xlsm'):
+        try:
+            from openpyxl import load_workbook
+        except ImportError:
+            raise ValidationError("Excel import needs the openpyxl package; upload a CSV instead.")
+        sheet = load_workbook(fileobj, read_only=True, data_only=True).active
+        rows = sheet.iter_rows(values_only=True)
+        headers = [str(h or '') for h in next(rows, [])]
+        for number, values in enumerate(rows, start=2):
+            yield number, {
+                h: ('' if v is None else str(v)) for h, v in zip(headers, values)
+            }
+        return
+
+    reader = csv.DictReader(codecs.iterdecode(fileobj, 'utf-8-sig'))
+    try:
+        for number, row in enumerate(reader, start=2):
+            yield number, row
+    except UnicodeDecodeError:
+        raise ValidationError("File must be UTF-8 encoded")
+
+
+# ===================== VALIDATION =====================
+
+class ImportResult:
+    def __init__(self):
+        self.created = 0
+        self.rows = 0
+        self.errors = []   # (row_number, message)
+        self.errors_truncated = False
+        self.error_total = 0
+
+    def add_error(self, number, message):
+        self.error_total += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((number, message))
+        else:
+            self.errors_truncated = True
+
+
+def _clean_value(field, raw):
+    """Model field validation (type, choices, max_length, blank) for one cell."""
+    raw = (raw or '').strip()
+    if raw == '' and field.null:
+        return None
+    return field.clean(raw, None)
+
+
+def _check_phone(value, label):
+    if not value:
+        return value
+    compact = value.replace(' ', '').replace('-', '')
+    if not AF_PHONE_REGEX.match(compact):
+        raise ValidationError(f"{label}: enter a valid Afghanistan number like +93XXXXXXXXX or 07XXXXXXXX.")
+    return value
+
+
+class ModelImporter:
+    """
+    Column mapping + per-row validation + batched inserts for one model.
+    Subclasses set `model` and `columns` ({normalised header: field name}).
+    """
+    model = None
+    columns = {}
+    required = []
+
+    def __init__(self):
+        self.fields = {f.name: f for f in self.model._meta.concrete_fields}
+        # insert_objects() writes instances as they are, so stamp these here
+        self.stamped = [
+            f for f in self.fields.values()
+            if getattr(f, 'auto_now', False) or getattr(f, 'auto_now_add', False)
+        ]
+
+    def map_row(self, row):
+        values = {}
+        for header, raw in row.items():
+            field_name = self.columns.get(_normalise_header(header))
+            if field_name:
+                values[field_name] = raw
+        return values
+
+    def clean_row(self, values):
+        cleaned, problems = {}, []
+        for name in self.required:
+            if name not in values:
+                problems.append(f"{name}: this column is required.")
+
+        for name, raw in values.items():
+            try:
+                cleaned[name] = _clean_value(self.fields[name], raw)
+            except ValidationError as exc:
+                problems.append(f"{name}: {' '.join(exc.messages)}")
+
+        if problems:
+            raise ValidationError(problems)
+        return cleaned
+
+    def build(self, row):
+        obj = self.model(**self.clean_row(self.map_row(row)))
+        for field in self.stamped:
+            field.pre_save(obj, add=True)
+        return obj
+
+    def run(self, rows, dry_run=False, skip_invalid=False, batch_size=BATCH_SIZE, max_rows=None):
+        """
+        Validate the rows and insert the valid ones as they are read, a
+        batch at a time inside one transaction, so a large file is never
+        held in memory. Without skip_invalid, the first error stops the
+        inserts (the rest is still checked) and rolls back what was written.
+        A file with more than `max_rows` rows is refused (ValidationError).
+        """
+        result = ImportResult()
+        writing = not dry_run
+        batch = []
+        with nullcontext() if dry_run else transaction.atomic():
+            for number, row in rows:
+                result.rows += 1
+                if max_rows is not None and result.rows > max_rows:
+                    raise ValidationError(
+                        f"The file has more than {max_rows} rows, too many to import here; "
+                        "run `manage.py khplwak_import` on the server instead."
+                    )
+                try:
+                    obj = self.build(row)
+                except ValidationError as exc:
+                    result.add_error(number, '; '.join(exc.messages))
+                    writing = writing and skip_invalid
+                    continue
+                if writing:
+                    batch.append(obj)
+                    if len(batch) >= batch_size:
+                        result.created += insert_objects(self.model, batch, batch_size)
+                        batch.clear()
+
+            if writing and batch:
+                result.created += insert_objects(self.model, batch, batch_size)
+            if not writing and result.created:
+                transaction.set_rollback(True)
+                result.created = 0
+            if result.created:
+                # raw inserts send no post_save
+                bump(self.model)
+        return result
+
+
+class PropertyImporter(ModelImporter):
+    """Reads the same layout export_properties_csv writes (ID column ignored)."""
+    model = PropertyItem
+    columns = {
+        _normalise_header(header): field
+        for header, field in PROPERTY_CSV_COLUMNS
+        if field != 'id'
+    }
+    # also accept plain field names as headers
+    columns.update({field: field for _, field in PROPERTY_CSV_COLUMNS if field != 'id'})
+    required = ['address', 'property_type']
+
+    def __init__(self):
+        super().__init__()
+        # the export writes listing type labels ("For Sale"); map them back
+        self.listing_values = {
+            label.lower(): value for value, label in PropertyItem.LISTING_CHOICES
+        }
+
+    def map_row(self, row):
+        values = super().map_row(row)
+        listing = (values.get('listing_type') or '').strip()
+        if listing:
+            values['listing_type'] = self.listing_values.get(listing.lower(), listing)
+        else:
+            values.pop('listing_type', None)
+        if not (values.get('status') or '').strip():
+            values.pop('status', None)
+        return values
+
+
+class InvestorImporter(ModelImporter):
+    model = Investor
+    columns = {
+        name: name for name in [
+            'full_name', 'surname', 'location', 'phone', 'whatsapp',
+            'invested_amount', 'investor_type', 'status', 'id_document', 'notes',
+        ]
+    }
+    columns['name'] = 'full_name'
+    required = ['full_name']
+
+    def map_row(self, row):
+        values = super().map_row(row)
+        for name in ('investor_type', 'status', 'invested_amount'):
+            if not (values.get(name) or '').strip():
+                values.pop(name, None)
+        return values
+
+    def clean_row(self, values):
+        cleaned = super().clean_row(values)
+        # same phone rule as InvestorForm
+        _check_phone(cleaned.get('phone'), 'phone')
+        _check_phone(cleaned.get('whatsapp'), 'whatsapp')
+        return cleaned
+
+
+IMPORTERS = {
+    'properties': PropertyImporter,
+    'investors': InvestorImporter,
+}
+
+
+def import_file(kind, fileobj, filename='', **options):
+    """Run the importer for `kind` ('properties' / 'investors') over a file."""
+    importer = IMPORTERS[kind]()
+    return importer.run(read_rows(fileobj, filename), **options)
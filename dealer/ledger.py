@@ -0,0 +1,140 @@
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+
+from .caching import bump
+from .models import Transaction, Commission, Expense, Income, LedgerTotal
+
+
+# model -> (ledger name, field used as key, amount field)
+LEDGERS = {
+    Transaction: ('transaction', 'transaction_type', 'amount'),
+    Commission: ('commission', None, 'total_earned'),
+    Expense: ('expense', 'category', 'amount'),
+    Income: ('income', 'source', 'amount'),
+}
+
+
+def ledger_key(model, value):
+    """Normalised key for a row (transaction types are stored lowercase)."""
+    if value is None:
+        return ''
+    if model is Transaction:
+        return value.lower()
+    return value
+
+
+def apply_delta(ledger, key, count, amount):
+    """
+    Add `count` rows and `amount` money to one running total. O(1):
+    a single UPDATE, plus an INSERT the first time a key is seen.
+    """
+    if not count and not amount:
+        return
+
+    updated = LedgerTotal.objects.filter(ledger=ledger, key=key).update(
+        row_count=F('row_count') + count,
+        total=F('total') + amount,
+    )
+    if updated:
+        return
+
+    try:
+        with transaction.atomic():
+            LedgerTotal.objects.create(ledger=ledger, key=key, row_count=count, total=amount)
+    except IntegrityError:
+        # someone else created the row in between -> just update it
+        LedgerTotal.objects.filter(ledger=ledger, key=key).update(
+            row_count=F('row_count') + count,
+            total=F('total') + amount,
+        )
+
+
+def compute_totals(models=None):
+    """
+    Full recount straight from the ledger tables (all, or just `models`).
+    Returns {(ledger, key): (row_count, total)}.
+    """
+    result = {}
+    for model, (ledger, key_field, amount_field) in LEDGERS.items():
+        if models is not None and model not in models:
+            continue
+        if key_field is None:
+            agg = model.objects.aggregate(n=Count('id'), total=Sum(amount_field))
+            rows = [{'key': None, 'n': agg['n'], 'total': agg['total']}]
+        else:
+            rows = (
+                model.objects
+                .values(key=F(key_field))
+                .annotate(n=Count('id'), total=Sum(amount_field))
+                .order_by()
+            )
+        for row in rows:
+            k = (ledger, ledger_key(model, row['key']))
+            n, total = result.get(k, (0, Decimal('0')))
+            result[k] = (n + row['n'], total + (row['total'] or 0))
+    return result
+
+
+def stored_totals():
+    return {
+        (t.ledger, t.key): (t.row_count, t.total)
+        for t in LedgerTotal.objects.all()
+    }
+
+
+def verify_totals():
+    """List of (ledger, key, stored, actual) for every total that is out of sync."""
+    actual = compute_totals()
+    stored = stored_totals()
+    empty = (0, Decimal('0'))
+
+    mismatches = []
+    for k in sorted(set(actual) | set(stored)):
+        a = actual.get(k, empty)
+        s = stored.get(k, empty)
+        if a[0] != s[0] or a[1] != s[1]:
+            mismatches.append((k[0], k[1], s, a))
+    return mismatches
+
+
+@transaction.atomic
+def rebuild_totals():
+    """Throw away all running totals and recompute them from the ledgers."""
+    LedgerTotal.objects.all().delete()
+    LedgerTotal.objects.bulk_create([
+        LedgerTotal(ledger=ledger, key=key, row_count=n, total=total)
+        for (ledger, key), (n, total) in compute_totals().items()
+    ])
+    # pages cached from the old totals
+    bump(*LEDGERS)
+
+
+@transaction.atomic
+def rebuild_ledger(model):
+    """rebuild_totals() for a single ledger table."""
+    ledger = LEDGERS[model][0]
+    LedgerTotal.objects.filter(ledger=ledger).delete()
+    LedgerTotal.objects.bulk_create([
+        LedgerTotal(ledger=ledger, key=key, row_count=n, total=total)
+        for (_, key), (n, total) in compute_totals([model]).items()
+    ])
+    bump(model)
+
+
+def ledger_totals(ledger):
+    """{key: total} for one ledger, only keys that still have rows."""
+    return {
+        t.key: t.total
+        for t in LedgerTotal.objects.filter(ledger=ledger, row_count__gt=0)
+    }
+
+
+def ledger_summary(ledger):
+    """(row_count, total) for a whole ledger."""
+    agg = LedgerTotal.objects.filter(ledger=ledger).aggregate(
+        n=Sum('row_count'),
+        total=Sum('total'),
+    )
+    return agg['n'] or 0, agg['total'] or 0
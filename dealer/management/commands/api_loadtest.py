@@ -0,0 +1,96 @@
+import statistics
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY, get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Fire concurrent GET requests at a running server and report throughput "
+        "and latency. To compare WSGI and ASGI, start the site once with "
+        "`gunicorn KhplwakProperty.wsgi:application -w 4` and once with "
+        "`uvicorn KhplwakProperty.asgi:application --workers 4` (pip install uvicorn), "
+        "then run this command against each with the same options."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('urls', nargs='+', help="Full URLs to request, used round-robin.")
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--concurrency', type=int, default=20)
+        parser.add_argument(
+            '--user',
+            help="Log in as this user (a session is created in the database the server uses).",
+        )
+        parser.add_argument('--gzip', action='store_true', help="Send Accept-Encoding: gzip.")
+        parser.add_argument(
+            '--header', action='append', default=[], metavar='NAME:VALUE',
+            help="Extra request header, repeatable. With DEBUG=False the site redirects to "
+                 "HTTPS unless it sees `X-Forwarded-Proto: https`, as sent by Render's proxy.",
+        )
+
+    def _session_cookie(self, username):
+        try:
+            user = get_user_model().objects.get(username=username)
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"No user named {username!r}.")
+        store = import_module(settings.SESSION_ENGINE).SessionStore()
+        store[SESSION_KEY] = str(user.pk)
+        store[BACKEND_SESSION_KEY] = 'django.contrib.auth.backends.ModelBackend'
+        store[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        store.create()
+        return f'{settings.SESSION_COOKIE_NAME}={store.session_key}'
+
+    def handle(self, *args, **options):
+        headers = {}
+        for header in options['header']:
+            name, sep, value = header.partition(':')
+            if not sep:
+                raise CommandError(f"--header {header!r} is not NAME:VALUE.")
+            headers[name.strip()] = value.strip()
+        if options['user']:
+            headers['Cookie'] = self._session_cookie(options['user'])
+        if options['gzip']:
+            headers['Accept-Encoding'] = 'gzip'
+
+        urls = options['urls']
+        total = options['requests']
+
+        def fetch(i):
+            request = urllib.request.Request(urls[i % len(urls)], headers=headers)
+            started = time.perf_counter()
+            try:
+                with urllib.request.urlopen(request, timeout=30) as response:
+                    size = len(response.read())
+                    status = response.status
+            except urllib.error.HTTPError as exc:
+                size, status = 0, exc.code
+            except OSError as exc:
+                size, status = 0, type(exc).__name__
+            return status, size, time.perf_counter() - started
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            results = list(pool.map(fetch, range(total)))
+        elapsed = time.perf_counter() - started
+
+        statuses = Counter(status for status, _, _ in results)
+        latencies = sorted(t for _, _, t in results)
+        quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+        size = sum(s for _, s, _ in results)
+
+        self.stdout.write(f"requests:     {total} ({options['concurrency']} concurrent)")
+        self.stdout.write(f"elapsed:      {elapsed:.2f}s")
+        self.stdout.write(f"throughput:   {total / elapsed:.1f} req/s")
+        self.stdout.write(
+            f"latency (ms): p50 {quantiles[49] * 1000:.1f}  "
+            f"p95 {quantiles[94] * 1000:.1f}  p99 {quantiles[98] * 1000:.1f}"
+        )
+        self.stdout.write(f"bytes read:   {size}")
+        self.stdout.write(f"statuses:     {dict(statuses)}")
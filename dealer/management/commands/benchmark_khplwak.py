@@ -0,0 +1,93 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from dealer.benchmark import MIN_SAMPLES, compare, load, run, samples, save, search_comparison
+from dealer.seed import SCALES, scale_counts, seed
+
+
+class Command(BaseCommand):
+    help = (
+        "Time every GET page in dealer/urls.py with the test client and write the "
+        "results as JSON. With --scale, a throwaway test database is created and "
+        "seeded at that size first; otherwise the configured database is used as is. "
+        "--compare flags regressions against an earlier result file. --search times "
+        "property search through the FTS5 index against the icontains scan instead."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', choices=sorted(SCALES), help="Seed a throwaway database at this size.")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--repeat', type=int, default=5, help="Cold and warm requests per page; medians are kept (default 5).")
+        parser.add_argument('--user', help="Log in as this user (default: the first superuser).")
+        parser.add_argument('--output', help="Write the JSON results here (default: stdout).")
+        parser.add_argument('--compare', metavar='BASELINE', help="Result file to compare against.")
+        parser.add_argument('--search', action='store_true',
+                            help="Compare FTS5 and icontains property search instead of timing pages.")
+        parser.add_argument('--threshold', type=float, default=1.25,
+                            help="Slowdown factor counted as a regression (default 1.25).")
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError("--repeat must be at least 1.")
+        if options['search'] and options['compare']:
+            raise CommandError("--compare only applies to page timings, not --search.")
+        if options['search'] and connection.vendor != 'sqlite':
+            raise CommandError("--search compares the FTS5 index, which is SQLite only.")
+        baseline = load(options['compare']) if options['compare'] else None
+
+        old_name = None
+        if options['scale']:
+            old_name = connection.settings_dict['NAME']
+            connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+            self.stderr.write(f"Seeding a throwaway database at scale {options['scale']}...")
+            seed(scale_counts(options['scale']), seed=options['seed'])
+        try:
+            if options['search']:
+                result = search_comparison(repeat=options['repeat'], stdout=self.stderr)
+            else:
+                user = self._user(options['user'], old_name is not None)
+                result = run(user, repeat=options['repeat'], stdout=self.stderr)
+        finally:
+            if old_name is not None:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        if options['scale']:
+            result['meta']['scale'] = options['scale']
+        if options['output']:
+            save(result, options['output'])
+            self.stderr.write(f"Results written to {options['output']}.")
+        else:
+            self.stdout.write(json.dumps(result, indent=2, sort_keys=True))
+
+        if baseline is not None:
+            regressions = compare(result, baseline, options['threshold'])
+            taken, before = samples(result), samples(baseline)
+            if min(taken, before) < MIN_SAMPLES:
+                self.stderr.write(self.style.WARNING(
+                    f"Timings not compared: {taken} sample(s) per page against {before} in the baseline, "
+                    f"{MIN_SAMPLES} needed. Only query counts were checked."
+                ))
+            else:
+                self.stderr.write(f"Compared medians of {taken} samples per page against {before} in the baseline.")
+            for label, what, before, now in regressions:
+                self.stderr.write(f"REGRESSION {label}: {what} {before} -> {now}")
+            if regressions:
+                raise CommandError(f"{len(regressions)} regression(s) against {options['compare']}.")
+            self.stderr.write(self.style.SUCCESS("No regressions."))
+
+    def _user(self, username, throwaway):
+        User = get_user_model()
+        if username:
+            try:
+                return User.objects.get(username=username)
+            except User.DoesNotExist:
+                raise CommandError(f"No user named {username!r}.")
+        user = User.objects.filter(is_superuser=True).order_by('pk').first()
+        if user is None:
+            if not throwaway:
+                raise CommandError("No superuser to log in as; pass --user.")
+            user = User.objects.create_superuser('benchmark', 'benchmark@example.com', None)
+        return user
@@ -0,0 +1,39 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from dealer.reports import PeriodClosedError, close_books, closed_through
+
+
+class Command(BaseCommand):
+    help = "Close the income / expense books through a month (writes immutable PeriodBalance rows)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'through',
+            nargs='?',
+            help="Last month to close, as YYYY-MM. Without it, just show the current state.",
+        )
+
+    def handle(self, *args, **options):
+        if not options['through']:
+            last = closed_through()
+            self.stdout.write(f"Books closed through {last:%Y-%m}." if last else "No months closed yet.")
+            return
+
+        try:
+            month = datetime.date.fromisoformat(options['through'] + '-01')
+        except ValueError:
+            raise CommandError("Give the month as YYYY-MM.")
+
+        try:
+            months = close_books(month)
+        except PeriodClosedError as exc:
+            raise CommandError(exc.messages[0])
+
+        if not months:
+            self.stdout.write(f"{month:%Y-%m} is already closed.")
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"Closed {len(months)} month(s): {months[0]:%Y-%m} to {months[-1]:%Y-%m}."
+        ))
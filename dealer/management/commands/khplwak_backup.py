@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from dealer.backup import write_backup
+
+
+class Command(BaseCommand):
+    help = "Write a consistent snapshot of all dealer data to a .zip archive."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            nargs='?',
+            help="Archive to write (default: khplwak_backup_<timestamp>.zip).",
+        )
+
+    def handle(self, *args, **options):
+        path = options['path'] or timezone.now().strftime('khplwak_backup_%Y%m%d_%H%M%S.zip')
+        manifest = write_backup(path)
+
+        for entry in manifest['models']:
+            self.stdout.write(f"  {entry['model']}: {entry['rows']} rows")
+        self.stdout.write(self.style.SUCCESS(f"Backup written to {path}"))
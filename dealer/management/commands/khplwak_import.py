@@ -0,0 +1,44 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from dealer.importers import BATCH_SIZE, IMPORTERS, import_file
+
+
+class Command(BaseCommand):
+    help = "Bulk import properties or investors from a CSV (or .xlsx) file."
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(IMPORTERS))
+        parser.add_argument('path')
+        parser.add_argument('--dry-run', action='store_true', help="Validate only, insert nothing.")
+        parser.add_argument(
+            '--skip-invalid',
+            action='store_true',
+            help="Insert the valid rows even if some rows have errors.",
+        )
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['path'], 'rb') as fh:
+                result = import_file(
+                    options['kind'],
+                    fh,
+                    options['path'],
+                    dry_run=options['dry_run'],
+                    skip_invalid=options['skip_invalid'],
+                    batch_size=options['batch_size'],
+                )
+        except (OSError, ValidationError) as exc:
+            raise CommandError(' '.join(getattr(exc, 'messages', [str(exc)])))
+
+        for number, message in result.errors:
+            self.stderr.write(f"row {number}: {message}")
+        if result.errors_truncated:
+            self.stderr.write(f"... {result.error_total - len(result.errors)} more errors")
+
+        self.stdout.write(
+            f"{result.rows} rows read, {result.error_total} invalid, {result.created} imported."
+        )
+        if result.error_total and not options['skip_invalid'] and not options['dry_run']:
+            raise CommandError("Nothing imported because of the errors above (use --skip-invalid to import the valid rows).")
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from dealer.backup import BackupError, restore_backup, CHUNK_SIZE
+
+
+class Command(BaseCommand):
+    help = "Restore a .zip archive written by khplwak_backup (bulk insert, FKs remapped)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Archive written by khplwak_backup.")
+        parser.add_argument(
+            '--flush',
+            action='store_true',
+            help="Delete all existing dealer data before restoring.",
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=CHUNK_SIZE,
+            help=f"Rows per bulk INSERT (default {CHUNK_SIZE}).",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            counts = restore_backup(
+                options['path'],
+                batch_size=options['batch_size'],
+                flush=options['flush'],
+                stdout=self.stdout,
+            )
+        except (BackupError, OSError) as exc:
+            raise CommandError(str(exc))
+
+        total = sum(counts.values())
+        self.stdout.write(self.style.SUCCESS(f"Restored {total} rows."))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from dealer.ledger import rebuild_totals, verify_totals
+
+
+class Command(BaseCommand):
+    help = "Recompute the running ledger totals (LedgerTotal) from scratch and verify them."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify-only',
+            action='store_true',
+            help="Only compare stored totals with the ledgers, do not rebuild.",
+        )
+
+    def handle(self, *args, **options):
+        if not options['verify_only']:
+            rebuild_totals()
+            self.stdout.write("Ledger totals rebuilt.")
+
+        mismatches = verify_totals()
+        if mismatches:
+            for ledger, key, stored, actual in mismatches:
+                self.stderr.write(
+                    f"{ledger}:{key or '*'} stored={stored[1]} ({stored[0]} rows) "
+                    f"actual={actual[1]} ({actual[0]} rows)"
+                )
+            raise CommandError(f"{len(mismatches)} ledger total(s) out of sync.")
+
+        self.stdout.write(self.style.SUCCESS("Ledger totals verified."))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from dealer.search import rebuild_fts
+
+
+class Command(BaseCommand):
+    help = "Recreate the property full-text search index (SQLite FTS5) and re-index every property."
+
+    def handle(self, *args, **options):
+        if rebuild_fts():
+            self.stdout.write(self.style.SUCCESS("Property search index rebuilt."))
+        else:
+            self.stdout.write("Full-text index is SQLite only; nothing to do on this database.")
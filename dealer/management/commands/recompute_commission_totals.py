@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from dealer.models import Commission
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute Commission.total_earned in the database with one UPDATE "
+        "(for rows written with raw SQL or other tools that skip save())."
+    )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        fixed = Commission.objects.recompute_totals()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"{fixed} commission total(s) corrected in {elapsed:.2f}s."
+        ))
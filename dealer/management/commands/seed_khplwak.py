@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from dealer.seed import BATCH_SIZE, SCALES, scale_counts, seed
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-insert realistic, FK-consistent synthetic data into all six dealer "
+        "models (for benchmarks). Deterministic for a given --seed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', choices=sorted(SCALES), help="Preset row counts; the options below override it.")
+        for name in ('properties', 'investors', 'transactions', 'commissions', 'expenses', 'income'):
+            parser.add_argument(f'--{name}', type=int)
+        parser.add_argument('--seed', type=int, default=0, help="Random seed (default 0).")
+        parser.add_argument('--years', type=int, default=3, help="Spread dates over this many past years.")
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        counts = scale_counts(options['scale']) if options['scale'] else {}
+        for name in ('properties', 'investors', 'transactions', 'commissions', 'expenses', 'income'):
+            if options[name] is not None:
+                counts[name] = options[name]
+        if not any(counts.values()):
+            raise CommandError("Nothing to create: pass --scale or row counts such as --properties 1000.")
+
+        started = time.perf_counter()
+        try:
+            seed(counts, seed=options['seed'], years=options['years'],
+                 batch_size=options['batch_size'], stdout=self.stdout)
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {sum(counts.values())} rows in {time.perf_counter() - started:.1f}s."
+        ))
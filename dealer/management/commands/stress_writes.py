@@ -0,0 +1,39 @@
+import os
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from dealer.benchmark import write_stress
+
+
+class Command(BaseCommand):
+    help = (
+        "Save expenses from several processes at once against a throwaway SQLite "
+        "file and report throughput and 'database is locked' failures, with the "
+        "tuned connection settings and/or Django's defaults."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=4)
+        parser.add_argument('--writes', type=int, default=200, help="Saves per process (default 200).")
+        parser.add_argument('--mode', choices=['tuned', 'defaults', 'both'], default='both')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError("stress_writes measures the SQLite settings; the database is not SQLite.")
+        modes = [True, False] if options['mode'] == 'both' else [options['mode'] == 'tuned']
+
+        with tempfile.TemporaryDirectory() as tmp:
+            old_name = connection.settings_dict['NAME']
+            connection.settings_dict['TEST']['NAME'] = os.path.join(tmp, 'stress.sqlite3')
+            connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+            try:
+                for tuned in modes:
+                    r = write_stress(options['processes'], options['writes'], tuned=tuned)
+                    self.stdout.write(
+                        f"{r['mode']:<9} {r['processes']} processes  {r['saved']}/{r['writes']} saved  "
+                        f"{r['locked']} locked  {r['seconds']:.2f}s  {r['per_second']} saves/s"
+                    )
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
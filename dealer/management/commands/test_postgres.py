@@ -0,0 +1,88 @@
+import importlib.util
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the test suite against a throwaway local PostgreSQL: initdb into a "
+        "temporary directory, start it on a free port, run `manage.py test` with "
+        "DATABASE_URL pointing at it, then stop it and delete the directory. Needs "
+        "the PostgreSQL server binaries (initdb, pg_ctl) and psycopg."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('labels', nargs='*', help="Test labels, as for `manage.py test`.")
+        parser.add_argument(
+            '--pg-bin',
+            default=os.environ.get('PG_BIN'),
+            help="Directory holding initdb and pg_ctl (default: $PG_BIN, then PATH).",
+        )
+        parser.add_argument(
+            '--os-user', default='postgres',
+            help="PostgreSQL refuses to run as root; when run as root, start it as this user (default postgres).",
+        )
+
+    def handle(self, *args, **options):
+        if importlib.util.find_spec('psycopg') is None:
+            raise CommandError("psycopg is not installed: pip install 'psycopg[binary,pool]'.")
+        initdb, pg_ctl = self._binaries(options['pg_bin'])
+
+        as_user = []
+        if os.geteuid() == 0:
+            if shutil.which('runuser') is None:
+                raise CommandError("Running as root needs runuser to start PostgreSQL as --os-user.")
+            as_user = ['runuser', '-u', options['os_user'], '--']
+
+        with tempfile.TemporaryDirectory(prefix='khplwak-pg-') as tmp:
+            data = Path(tmp) / 'data'
+            log = Path(tmp) / 'postgres.log'
+            if as_user:
+                shutil.chown(tmp, options['os_user'])
+            port = self._free_port()
+
+            self._run(as_user + [initdb, '-D', str(data), '-U', 'postgres', '-A', 'trust', '-E', 'UTF8'])
+            # fsync off: the cluster is thrown away, and it makes the suite much faster
+            server = f"-h 127.0.0.1 -p {port} -k {tmp} -F"
+            self._run(as_user + [pg_ctl, '-D', str(data), '-l', str(log), '-o', server, '-w', 'start'])
+            self.stderr.write(f"PostgreSQL running on 127.0.0.1:{port}.")
+            try:
+                env = dict(os.environ, DATABASE_URL=f"postgres://postgres@127.0.0.1:{port}/postgres")
+                manage = Path(settings.BASE_DIR) / 'manage.py'
+                verbosity = str(options['verbosity'])
+                result = subprocess.run(
+                    [sys.executable, str(manage), 'test', '--verbosity', verbosity, *options['labels']],
+                    env=env,
+                )
+            finally:
+                self._run(as_user + [pg_ctl, '-D', str(data), '-m', 'fast', '-w', 'stop'])
+
+        if result.returncode:
+            raise CommandError(f"Tests failed against PostgreSQL (exit code {result.returncode}).")
+
+    def _binaries(self, pg_bin):
+        paths = []
+        for name in ('initdb', 'pg_ctl'):
+            path = shutil.which(name, path=pg_bin) if pg_bin else shutil.which(name)
+            if path is None:
+                raise CommandError(f"{name} not found; pass --pg-bin or set PG_BIN to PostgreSQL's bin directory.")
+            paths.append(path)
+        return paths
+
+    def _free_port(self):
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            return sock.getsockname()[1]
+
+    def _run(self, cmd):
+        result = subprocess.run(cmd, capture_output=True, text=True)
+        if result.returncode:
+            raise CommandError(f"{' '.join(cmd)} failed:\n{result.stdout}{result.stderr}")
@@ -0,0 +1,152 @@
+from decimal import Decimal
+
+from django.db.models import BigIntegerField, Count, DecimalField, F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Cast, Coalesce, Round
+
+from .models import (
+    Investor, PropertyItem, Transaction, Commission, Expense, Income, LedgerTotal,
+)
+
+
+MONEY = DecimalField(max_digits=18, decimal_places=2)
+ZERO = Value(Decimal('0'), output_field=MONEY)
+
+
+def _property_counts():
+    # one pass over properties: total + per-status counts
+    return {
+        'property_count': Count('id'),
+        'available_count': Count('id', filter=Q(status='available')),
+        'rented_count': Count('id', filter=Q(status='rented')),
+        'sold_count': Count('id', filter=Q(status='sold')),
+        'mortgaged_count': Count('id', filter=Q(status='mortgaged')),
+    }
+
+
+def _dashboard_totals():
+    # running totals: a handful of rows, independent of ledger size
+    return LedgerTotal.objects.filter(ledger__in=['transaction', 'commission'])
+
+
+def _dashboard(investor_count, props, ledger_rows):
+    totals = {(t.ledger, t.key): t for t in ledger_rows}
+    buy = totals.get(('transaction', 'buy'))
+    sell = totals.get(('transaction', 'sell'))
+    comm = totals.get(('commission', ''))
+
+    transaction_count = sum(
+        t.row_count for (ledger, _), t in totals.items() if ledger == 'transaction'
+    )
+
+    return {
+        "investor_count": investor_count,
+        "property_count": props['property_count'],
+        "transaction_count": transaction_count,
+
+        "available_count": props['available_count'],
+        "rented_count": props['rented_count'],
+        "sold_count": props['sold_count'],
+        "mortgaged_count": props['mortgaged_count'],
+
+        "total_invested": buy.total if buy else 0,
+        "total_returned": sell.total if sell else 0,
+        "total_commissions": comm.total if comm else 0,
+    }
+
+
+def dashboard_metrics():
+    """
+    All dashboard KPIs, one aggregate query per table.
+    Money totals come from the running LedgerTotal rows, so they cost the
+    same no matter how long the ledger history is.
+    Used by the home view and anything else that needs the same numbers.
+    """
+    return _dashboard(
+        Investor.objects.count(),
+        PropertyItem.objects.aggregate(**_property_counts()),
+        list(_dashboard_totals()),
+    )
+
+
+async def adashboard_metrics():
+    """dashboard_metrics() for async views (same queries, async ORM)."""
+    return _dashboard(
+        await Investor.objects.acount(),
+        await PropertyItem.objects.aaggregate(**_property_counts()),
+        [t async for t in _dashboard_totals()],
+    )
+
+
+def cents(expression):
+    """
+    A money expression as whole cents. SQLite sums decimals as REAL, so
+    the same total can come back a rounding error apart from one query to
+    the next; sort, filter and page on this exact integer instead.
+    """
+    return Cast(Round(expression * 100), BigIntegerField())
+
+
+def with_investor_totals(investors):
+    """
+    Annotate an Investor queryset with total_invested / total_returned /
+    net_result, plus invested_cents / net_cents to sort and filter on.
+    Each total is a correlated subquery, so a page in id or name order
+    only computes the totals of the rows it returns.
+    """
+    return investors.annotate(
+        total_invested=_related_sum(Transaction, 'investor', 'amount', transaction_type='buy'),
+        total_returned=_related_sum(Transaction, 'investor', 'amount', transaction_type='sell'),
+    ).annotate(
+        net_result=F('total_returned') - F('total_invested'),
+    ).annotate(
+        invested_cents=cents(F('total_invested')),
+        net_cents=cents(F('net_result')),
+    )
+
+
+def _related_sum(model, link, amount, **filters):
+    """Correlated SUM(amount) of `model` rows whose `link` is the outer row."""
+    rows = (
+        model.objects
+        .filter(**{link: OuterRef('pk')}, **filters)
+        .order_by()
+        .values(link)
+        .annotate(total=Sum(amount))
+        .values('total')
+    )
+    return Coalesce(Subquery(rows, output_field=MONEY), ZERO)
+
+
+def _property_sum(model, amount, **filters):
+    """Correlated SUM(amount) of `model` rows linked to the outer property."""
+    return _related_sum(model, 'property_item', amount, **filters)
+
+
+def with_property_pnl(properties):
+    """
+    Annotate a PropertyItem queryset with its P&L:
+    total_invested / total_returned (buy / sell transactions), net_result,
+    commission_earned, income_total, expense_total and profit
+    (net + commission + income - expenses), plus invested_cents /
+    net_cents / profit_cents to sort on (see cents()).
+    Each figure is a correlated subquery, so a page of properties is still
+    one query and the annotations can be sorted on in SQL.
+    """
+    return properties.annotate(
+        total_invested=_property_sum(Transaction, 'amount', transaction_type='buy'),
+        total_returned=_property_sum(Transaction, 'amount', transaction_type='sell'),
+        commission_earned=_property_sum(Commission, 'total_earned'),
+        income_total=_property_sum(Income, 'amount'),
+        expense_total=_property_sum(Expense, 'amount'),
+    ).annotate(
+        net_result=F('total_returned') - F('total_invested'),
+    ).annotate(
+        profit=(
+            F('net_result') + F('commission_earned')
+            + F('income_total') - F('expense_total')
+        ),
+    ).annotate(
+        invested_cents=cents(F('total_invested')),
+        net_cents=cents(F('net_result')),
+        profit_cents=cents(F('profit')),
+    )
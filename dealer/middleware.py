@@ -1,8 +1,60 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+
+# Every middleware in settings.MIDDLEWARE handles both modes. One that is
+# sync-only makes Django run it, and everything beneath it, in a thread
+# under ASGI, so the async API views would gain a thread hop per request.
+
+
+class AsyncWhiteNoiseMiddleware(WhiteNoiseMiddleware):
+    """WhiteNoise 6.7 is sync-only; the same lookup, native in both modes."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, settings=settings):
+        super().__init__(get_response, settings)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:   # DEBUG: looks on disk
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return self.serve(static_file, request)
+        return await self.get_response(request)
+
+
 class NoCacheForAuthenticatedPages:
-    def __init__(self, get_response): self.get_response = get_response
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
     def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
         resp = self.get_response(request)
-        if request.user.is_authenticated:
+        return self._no_store(resp, request.user)
+
+    async def __acall__(self, request):
+        resp = await self.get_response(request)
+        return self._no_store(resp, await request.auser())
+
+    def _no_store(self, resp, user):
+        # views using dealer.caching.revalidate send `private, no-cache` + ETag instead
+        if user.is_authenticated and not getattr(resp, "revalidate", False):
             resp["Cache-Control"] = "no-store, no-cache, must-revalidate, max-age=0"
             resp["Pragma"] = "no-cache"
             resp["Expires"] = "0"
@@ -49,7 +49,8 @@ class Migration(migrations.Migration):
         migrations.AddField(
             model_name='investor',
             name='phone',
-            field=models.CharField(default=django.utils.timezone.now, max_length=20),
+            # one-off default for existing rows; a timestamp does not fit varchar(20)
+            field=models.CharField(default='', max_length=20),
             preserve_default=False,
         ),
         migrations.AddField(
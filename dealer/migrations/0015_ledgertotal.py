@@ -0,0 +1,60 @@
+# Generated by Django 5.2.7 on 2026-10-18 00:48
+
+from django.db import migrations, models
+from django.db.models import Count, F, Sum
+
+
+def fill_ledger_totals(apps, schema_editor):
+    LedgerTotal = apps.get_model('dealer', 'LedgerTotal')
+    sources = [
+        ('Transaction', 'transaction', 'transaction_type', 'amount'),
+        ('Commission', 'commission', None, 'total_earned'),
+        ('Expense', 'expense', 'category', 'amount'),
+        ('Income', 'income', 'source', 'amount'),
+    ]
+
+    totals = {}
+    for model_name, ledger, key_field, amount_field in sources:
+        model = apps.get_model('dealer', model_name)
+        qs = model.objects.all()
+        if key_field:
+            rows = qs.values(key=F(key_field)).annotate(n=Count('id'), total=Sum(amount_field)).order_by()
+        else:
+            agg = qs.aggregate(n=Count('id'), total=Sum(amount_field))
+            rows = [{'key': '', 'n': agg['n'], 'total': agg['total']}]
+        for row in rows:
+            key = row['key'] or ''
+            if ledger == 'transaction':
+                key = key.lower()
+            n, total = totals.get((ledger, key), (0, 0))
+            totals[(ledger, key)] = (n + row['n'], total + (row['total'] or 0))
+
+    LedgerTotal.objects.bulk_create([
+        LedgerTotal(ledger=ledger, key=key, row_count=n, total=total)
+        for (ledger, key), (n, total) in totals.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dealer', '0014_alter_transaction_transaction_type'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LedgerTotal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ledger', models.CharField(choices=[('transaction', 'Transactions'), ('commission', 'Commissions'), ('expense', 'Expenses'), ('income', 'Income')], max_length=20)),
+                ('key', models.CharField(blank=True, default='', max_length=50)),
+                ('row_count', models.BigIntegerField(default=0)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('ledger', 'key'), name='unique_ledger_total_key')],
+            },
+        ),
+        migrations.RunPython(fill_ledger_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.7 on 2026-10-18 00:50
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dealer', '0015_ledgertotal'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='commission',
+            index=models.Index(fields=['created_at', 'id'], name='dealer_comm_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='commission',
+            index=models.Index(fields=['property_item', 'total_earned'], name='dealer_comm_prop_earned_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['date', 'id'], name='dealer_expense_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['category', 'amount'], name='dealer_expense_cat_amount_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='income',
+            index=models.Index(fields=['date', 'id'], name='dealer_income_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='income',
+            index=models.Index(fields=['source', 'amount'], name='dealer_income_src_amount_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='propertyitem',
+            index=models.Index(fields=['status', 'listing_type'], name='dealer_prop_status_listing_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='propertyitem',
+            index=models.Index(fields=['listing_type'], name='dealer_prop_listing_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['transaction_date', 'id'], name='dealer_trans_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['property_item', 'transaction_type', 'amount'], name='dealer_trans_prop_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['investor', 'transaction_type', 'amount'], name='dealer_trans_inv_type_idx'),
+        ),
+    ]
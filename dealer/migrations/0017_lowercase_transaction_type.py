@@ -0,0 +1,25 @@
+# Generated by Django 5.2.7 on 2026-10-18 00:50
+
+import django.db.models.functions.text
+from django.db import migrations, models
+from django.db.models.functions import Lower, Trim
+
+
+def lowercase_transaction_types(apps, schema_editor):
+    Transaction = apps.get_model('dealer', 'Transaction')
+    Transaction.objects.update(transaction_type=Lower(Trim('transaction_type')))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dealer', '0016_query_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(lowercase_transaction_types, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='transaction',
+            constraint=models.CheckConstraint(condition=models.Q(('transaction_type', django.db.models.functions.text.Lower('transaction_type'))), name='transaction_type_lowercase'),
+        ),
+    ]
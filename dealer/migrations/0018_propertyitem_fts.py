@@ -0,0 +1,65 @@
+from django.db import migrations
+
+
+# Frozen copy of the schema in dealer/search.py as of this migration;
+# later changes to search.py need their own migration.
+CREATE_FTS = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS dealer_propertyitem_fts USING fts5(
+        address, city, area_name, property_type, owner_name, description,
+        content='dealer_propertyitem',
+        content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS dealer_propertyitem_fts_ai AFTER INSERT ON dealer_propertyitem BEGIN
+        INSERT INTO dealer_propertyitem_fts(rowid, address, city, area_name, property_type, owner_name, description)
+        VALUES (new.id, new.address, new.city, new.area_name, new.property_type, new.owner_name, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS dealer_propertyitem_fts_ad AFTER DELETE ON dealer_propertyitem BEGIN
+        INSERT INTO dealer_propertyitem_fts(dealer_propertyitem_fts, rowid, address, city, area_name, property_type, owner_name, description)
+        VALUES ('delete', old.id, old.address, old.city, old.area_name, old.property_type, old.owner_name, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS dealer_propertyitem_fts_au AFTER UPDATE ON dealer_propertyitem BEGIN
+        INSERT INTO dealer_propertyitem_fts(dealer_propertyitem_fts, rowid, address, city, area_name, property_type, owner_name, description)
+        VALUES ('delete', old.id, old.address, old.city, old.area_name, old.property_type, old.owner_name, old.description);
+        INSERT INTO dealer_propertyitem_fts(rowid, address, city, area_name, property_type, owner_name, description)
+        VALUES (new.id, new.address, new.city, new.area_name, new.property_type, new.owner_name, new.description);
+    END
+    """,
+    "INSERT INTO dealer_propertyitem_fts(dealer_propertyitem_fts) VALUES ('rebuild')",
+]
+
+DROP_FTS = [
+    "DROP TRIGGER IF EXISTS dealer_propertyitem_fts_ai",
+    "DROP TRIGGER IF EXISTS dealer_propertyitem_fts_ad",
+    "DROP TRIGGER IF EXISTS dealer_propertyitem_fts_au",
+    "DROP TABLE IF EXISTS dealer_propertyitem_fts",
+]
+
+
+def _run(statements):
+    def run(apps, schema_editor):
+        # FTS5 is SQLite only; other databases search with icontains
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for sql in statements:
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dealer', '0017_lowercase_transaction_type'),
+    ]
+
+    operations = [
+        migrations.RunPython(_run(CREATE_FTS), _run(DROP_FTS)),
+    ]
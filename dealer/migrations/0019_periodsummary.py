@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-18 01:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dealer', '0018_propertyitem_fts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PeriodSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ledger', models.CharField(choices=[('expense', 'Expenses'), ('income', 'Income')], max_length=20)),
+                ('period', models.DateField()),
+                ('key', models.CharField(blank=True, default='', max_length=50)),
+                ('row_count', models.BigIntegerField(default=0)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('ledger', 'period', 'key'), name='unique_period_summary_key')],
+            },
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.7 on 2026-10-18 01:12
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dealer', '0020_periodbalance'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='investor',
+            index=models.Index(django.db.models.functions.text.Lower('full_name'), name='dealer_inv_name_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='propertyitem',
+            index=models.Index(django.db.models.functions.text.Lower('address'), name='dealer_prop_addr_lower_idx'),
+        ),
+    ]
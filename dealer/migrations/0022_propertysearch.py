@@ -0,0 +1,26 @@
+# Generated by Django 5.2.7 on 2026-10-18 02:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dealer', '0021_autocomplete_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PropertySearch',
+            fields=[
+                ('property_item', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_index', serialize=False, to='dealer.propertyitem')),
+                ('match', models.TextField(db_column='dealer_propertyitem_fts')),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'dealer_propertyitem_fts',
+                'managed': False,
+            },
+        ),
+    ]
@@ -1,7 +1,13 @@
+from decimal import Decimal, ROUND_HALF_UP
+
 from django.db import models
+from django.core.exceptions import ValidationError
 from django.core.validators import RegexValidator
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
+from django.db.models import Case, F, Sum, Value, When
+from django.db.models.functions import Lower, Round
+from django.db.models.lookups import Exact
 from django.utils import timezone
 
 
@@ -38,9 +44,54 @@ class Investor(models.Model):
     invested_amount = models.DecimalField(max_digits=18, decimal_places=2, default=0)
     created_at = models.DateTimeField(auto_now_add=True, blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            # autocomplete prefix search (search.prefix_search)
+            models.Index(Lower('full_name'), name='dealer_inv_name_lower_idx'),
+        ]
+
     def __str__(self):
         return self.full_name
 
+# Named column sets for PropertyItem, so wide rows (with the description /
+# mortgage_terms text) are only loaded where they are shown.
+PROPERTY_PROJECTIONS = {
+    # property_list table
+    'list': [
+        'id', 'address', 'city', 'area_name', 'property_type', 'listing_type',
+        'status', 'size', 'sale_price', 'rent_monthly', 'rent_deposit', 'mortgage_amount',
+    ],
+    # compact summaries (search results, API cards)
+    'card': [
+        'id', 'address', 'city', 'area_name', 'property_type', 'listing_type',
+        'status', 'sale_price', 'rent_monthly', 'mortgage_amount',
+    ],
+    # <select> options: __str__ is the address
+    'dropdown': ['id', 'address'],
+    # everything the CSV export writes
+    'export': [
+        'id', 'address', 'city', 'area_name', 'property_type', 'listing_type', 'status',
+        'size', 'bedrooms', 'bathrooms', 'kitchens', 'floor_no', 'total_floors',
+        'parking_spaces', 'floor_area_sqft', 'sale_price', 'rent_monthly', 'rent_deposit',
+        'mortgage_amount', 'mortgage_terms', 'owner_name', 'owner_contact', 'description',
+    ],
+}
+
+# large free-text columns, never needed on list pages
+PROPERTY_TEXT_FIELDS = ['description', 'mortgage_terms']
+
+
+class PropertyItemQuerySet(models.QuerySet):
+    def projection(self, name):
+        """Load only the PROPERTY_PROJECTIONS[name] columns."""
+        return self.only(*PROPERTY_PROJECTIONS[name])
+
+
+def without_property_text(queryset, relation='property_item'):
+    """Defer the related property's text columns on a select_related queryset."""
+    return queryset.defer(*(f'{relation}__{f}' for f in PROPERTY_TEXT_FIELDS))
+
+
 class PropertyItem(models.Model):
     LISTING_CHOICES = [
         ('sale', 'For Sale'),
@@ -136,12 +187,62 @@ class PropertyItem(models.Model):
 
     created_at     = models.DateTimeField(auto_now_add=True)
 
+    objects = PropertyItemQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # property_list filters + dashboard status counts
+            models.Index(fields=['status', 'listing_type'], name='dealer_prop_status_listing_idx'),
+            models.Index(fields=['listing_type'], name='dealer_prop_listing_idx'),
+            # autocomplete prefix search (search.prefix_search)
+            models.Index(Lower('address'), name='dealer_prop_addr_lower_idx'),
+        ]
+
     def __str__(self):
         return self.address
 
 
+class PropertySearch(models.Model):
+    """
+    The FTS5 index over PropertyItem (SQLite only; created and kept in
+    sync by dealer/search.py, never by migrations). Joined one-to-one on
+    rowid so a search filters and ranks in the same query.
+    """
+    property_item = models.OneToOneField(
+        PropertyItem, models.DO_NOTHING,
+        primary_key=True, db_column='rowid', related_name='search_index',
+    )
+    # FTS5's hidden column named after the table: `= query` is MATCH
+    match = models.TextField(db_column='dealer_propertyitem_fts')
+    # bm25, lower = better
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = 'dealer_propertyitem_fts'
+
 
-class Transaction(models.Model):
+
+class LedgerRow:
+    """
+    Save for Transaction / Commission / Expense / Income: the row write
+    and the running total and period updates made by its signals
+    (dealer/signals.py) commit or roll back together. Deletes get a
+    savepoint of their own: Django's Collector joins the caller's
+    transaction, so a delete refused by a signal (closed month) would
+    otherwise leave that transaction unusable.
+    """
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get('using')):
+            return super().delete(*args, **kwargs)
+
+
+class Transaction(LedgerRow, models.Model):
     TRANSACTION_TYPE_CHOICES = [
         ('buy', 'Buy / Money Spent'),
         ('sell', 'Sell / Money Received'),
@@ -158,12 +259,163 @@ class Transaction(models.Model):
     amount           = models.DecimalField(max_digits=18, decimal_places=2)
     transaction_date = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # transaction_list ordering (-transaction_date, -id)
+            models.Index(fields=['transaction_date', 'id'], name='dealer_trans_date_id_idx'),
+            # per-property / per-investor buy & sell sums, answered from the index alone
+            models.Index(fields=['property_item', 'transaction_type', 'amount'], name='dealer_trans_prop_type_idx'),
+            models.Index(fields=['investor', 'transaction_type', 'amount'], name='dealer_trans_inv_type_idx'),
+        ]
+        constraints = [
+            # types are stored lowercase so filters can use plain, index-friendly equality
+            models.CheckConstraint(
+                condition=models.Q(transaction_type=Lower('transaction_type')),
+                name='transaction_type_lowercase',
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.transaction_type:
+            self.transaction_type = self.transaction_type.strip().lower()
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.transaction_type} - {self.property_item.address}"
 
 
 
-class Commission(models.Model):
+# ---------- Commission total_earned ----------
+# One rule in two forms: Commission.compute_total() in Python (save,
+# bulk_create) and commission_total() in SQL (update, bulk_update,
+# recompute_totals). Both round half away from zero to the cent.
+
+CENT = Decimal('0.01')
+
+# fields total_earned is derived from
+COMMISSION_TOTAL_INPUTS = ('deal_amount', 'commission_type', 'commission_value')
+
+
+class Hundred(Value):
+    """
+    100 as a divisor. NUMERIC on PostgreSQL (it has no ROUND(double
+    precision, int)); the literal 100.0 on SQLite, which stores whole
+    amounts as integers and would do integer division otherwise.
+    """
+
+    def __init__(self):
+        super().__init__(Decimal('100'), output_field=models.DecimalField())
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return '100.0', []
+
+
+def commission_total(**values):
+    """
+    total_earned as a database expression. `values` replace columns the
+    way an UPDATE's SET list would (plain values or expressions).
+    """
+    cols = {}
+    for name in COMMISSION_TOTAL_INPUTS:
+        value = values.get(name, F(name))
+        cols[name] = value if hasattr(value, 'resolve_expression') else Value(value)
+    return Case(
+        When(
+            Exact(cols['commission_type'], Value('percent')),
+            then=Round(cols['deal_amount'] * cols['commission_value'] / Hundred(), 2),
+        ),
+        default=cols['commission_value'],
+        output_field=models.DecimalField(max_digits=18, decimal_places=2),
+    )
+
+
+class CommissionQuerySet(models.QuerySet):
+    """
+    total_earned stays right for writes that skip save(): bulk_create
+    fills it in, update() / bulk_update() of its inputs set it in the
+    same UPDATE, and recompute_totals() repairs rows written any other
+    way. The commission running total (LedgerTotal) follows along, in
+    the same transaction as the write.
+    """
+
+    def recompute_totals(self):
+        """
+        Recompute total_earned for the stale rows of this queryset with a
+        single UPDATE. Stale rows were written behind the running total's
+        back, so that is recounted too. Returns the number of rows fixed.
+        """
+        from .ledger import rebuild_ledger
+
+        stale = self.exclude(total_earned=commission_total())
+        with transaction.atomic(using=self.db):
+            fixed = stale.update(total_earned=commission_total())
+            if fixed:
+                rebuild_ledger(self.model)
+        return fixed
+
+    def update(self, **kwargs):
+        from .caching import bump
+        from .ledger import LEDGERS, apply_delta, ledger_key
+
+        if 'total_earned' in kwargs or not any(name in kwargs for name in COMMISSION_TOTAL_INPUTS):
+            return super().update(**kwargs)
+        with transaction.atomic(using=self.db):
+            delta = self.aggregate(delta=Sum(commission_total(**kwargs) - F('total_earned')))['delta']
+            rows = super().update(total_earned=commission_total(**kwargs), **kwargs)
+            if rows:
+                apply_delta(LEDGERS[self.model][0], ledger_key(self.model, None), 0, delta or 0)
+                bump(self.model)
+        return rows
+
+    update.alters_data = True
+
+    def bulk_create(self, objs, *args, **kwargs):
+        from .caching import bump
+        from .ledger import LEDGERS, apply_delta, ledger_key, rebuild_ledger
+
+        objs = list(objs)
+        for obj in objs:
+            obj.total_earned = obj.compute_total()
+        with transaction.atomic(using=self.db):
+            created = super().bulk_create(objs, *args, **kwargs)
+            if kwargs.get('ignore_conflicts') or kwargs.get('update_conflicts'):
+                # which rows went in (or changed) is not known: recount
+                rebuild_ledger(self.model)
+            elif created:
+                total = sum((obj.total_earned for obj in created), Decimal('0'))
+                apply_delta(LEDGERS[self.model][0], ledger_key(self.model, None), len(created), total)
+            bump(self.model)
+        return created
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        # total_earned is never written as given: update() above derives
+        # it from the new inputs, and asked for alone it is recomputed
+        # from the stored ones
+        objs = list(objs)
+        if 'total_earned' in fields:
+            fields = [f for f in fields if f != 'total_earned']
+            if not fields:
+                return self._recompute_objs(objs)
+        rows = super().bulk_update(objs, fields, *args, **kwargs)
+        if any(name in fields for name in COMMISSION_TOTAL_INPUTS):
+            for obj in objs:
+                obj.total_earned = obj.compute_total()
+        return rows
+
+    bulk_update.alters_data = True
+
+    def _recompute_objs(self, objs):
+        if any(obj.pk is None for obj in objs):
+            raise ValueError("All bulk_update() objects must have a primary key set.")
+        rows = self.filter(pk__in=[obj.pk for obj in objs])
+        rows.recompute_totals()
+        totals = dict(rows.values_list('pk', 'total_earned'))
+        for obj in objs:
+            obj.total_earned = totals.get(obj.pk, obj.total_earned)
+        return len(totals)
+
+
+class Commission(LedgerRow, models.Model):
     DEAL_TYPE_CHOICES = [
         ('sale', 'Sale'),
         ('rent', 'Rent'),
@@ -197,19 +449,34 @@ class Commission(models.Model):
 
     created_at = models.DateTimeField(auto_now_add=True)
 
-    def save(self, *args, **kwargs):
-        # Calculate final earning before saving
+    objects = CommissionQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # commission_list ordering (-created_at, -id)
+            models.Index(fields=['created_at', 'id'], name='dealer_comm_created_id_idx'),
+            # per-property commission sums
+            models.Index(fields=['property_item', 'total_earned'], name='dealer_comm_prop_earned_idx'),
+        ]
+
+    def compute_total(self):
+        """Final earning: percent of the deal, or the fixed amount."""
         if self.commission_type == 'percent':
-            self.total_earned = (self.deal_amount * self.commission_value) / 100
+            total = Decimal(self.deal_amount) * Decimal(self.commission_value) / 100
         else:
-            self.total_earned = self.commission_value
+            total = Decimal(self.commission_value)
+        return total.quantize(CENT, rounding=ROUND_HALF_UP)
+
+    def save(self, *args, **kwargs):
+        # Calculate final earning before saving
+        self.total_earned = self.compute_total()
         super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.get_deal_type_display()} | {self.property_item.address} | {self.total_earned}"
 
 
-class Expense(models.Model):
+class Expense(LedgerRow, models.Model):
     CATEGORY_CHOICES = [
         ('purchase', 'Property Purchase / Payment to Owner'),
         ('maintenance', 'Repair / Maintenance / Work'),
@@ -243,11 +510,19 @@ class Expense(models.Model):
 
     remarks = models.TextField(blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            # expense_list ordering (-date, -id)
+            models.Index(fields=['date', 'id'], name='dealer_expense_date_id_idx'),
+            # finance_report breakdown by category
+            models.Index(fields=['category', 'amount'], name='dealer_expense_cat_amount_idx'),
+        ]
+
     def __str__(self):
         return f"Expense {self.amount} AFN - {self.category}"
 
 
-class Income(models.Model):
+class Income(LedgerRow, models.Model):
     SOURCE_CHOICES = [
         ('sale', 'Property Sale / Installment Received'),
         ('rent', 'Rental Income'),
@@ -279,5 +554,128 @@ class Income(models.Model):
 
     remarks = models.TextField(blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            # income_list ordering (-date, -id)
+            models.Index(fields=['date', 'id'], name='dealer_income_date_id_idx'),
+            # finance_report breakdown by source
+            models.Index(fields=['source', 'amount'], name='dealer_income_src_amount_idx'),
+        ]
+
+    def __str__(self):
+        return f"Income {self.amount} AFN - {self.source}"
+
+
+class LedgerTotal(models.Model):
+    """
+    Running totals per ledger (and per type / category / source inside it).
+    Kept up to date by the signal handlers in dealer/signals.py so the
+    dashboard and reports never have to re-sum the whole history.
+    """
+    LEDGER_CHOICES = [
+        ('transaction', 'Transactions'),
+        ('commission', 'Commissions'),
+        ('expense', 'Expenses'),
+        ('income', 'Income'),
+    ]
+
+    ledger = models.CharField(max_length=20, choices=LEDGER_CHOICES)
+
+    # transaction_type / expense category / income source ('' for commissions)
+    key = models.CharField(max_length=50, blank=True, default='')
+
+    row_count = models.BigIntegerField(default=0)
+    total = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['ledger', 'key'], name='unique_ledger_total_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.ledger}:{self.key or '*'} = {self.total} ({self.row_count} rows)"
+
+
+class PeriodSummary(models.Model):
+    """
+    Per-month totals of the income / expense ledgers, filled in by
+    dealer/reports.py the first time a closed month is reported on, so
+    historical months are not re-summed on every report.
+    Each summarised month has a total row (key '') plus one row per
+    category / source.
+    """
+    LEDGER_CHOICES = [
+        ('expense', 'Expenses'),
+        ('income', 'Income'),
+    ]
+
+    ledger = models.CharField(max_length=20, choices=LEDGER_CHOICES)
+
+    # first day of the month
+    period = models.DateField()
+
+    # expense category / income source ('' = whole month)
+    key = models.CharField(max_length=50, blank=True, default='')
+
+    row_count = models.BigIntegerField(default=0)
+    total = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+
+    computed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['ledger', 'period', 'key'],
+                name='unique_period_summary_key',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.ledger} {self.period:%Y-%m}:{self.key or '*'} = {self.total}"
+
+
+class PeriodBalance(models.Model):
+    """
+    Month-end balance of the income / expense ledgers, written once when
+    the books for that month are closed (dealer/reports.py close_books)
+    and never changed afterwards. Same layout as PeriodSummary.
+    """
+    ledger = models.CharField(max_length=20, choices=PeriodSummary.LEDGER_CHOICES)
+
+    # first day of the month
+    period = models.DateField()
+
+    # expense category / income source ('' = whole month)
+    key = models.CharField(max_length=50, blank=True, default='')
+
+    row_count = models.BigIntegerField(default=0)
+    total = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+
+    closed_at = models.DateTimeField(auto_now_add=True)
+    closed_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['ledger', 'period', 'key'],
+                name='unique_period_balance_key',
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.pk is not None:
+            raise ValidationError("Closed period balances cannot be changed.")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValidationError("Closed period balances cannot be deleted.")
+
     def __str__(self):
-        return f"Income {self.amount} AFN - {self.source}"
\ No newline at end of file
+        return f"{self.ledger} {self.period:%Y-%m}:{self.key or '*'} = {self.total} (closed)"
@@ -0,0 +1,208 @@
+import base64
+import datetime
+import json
+from decimal import Decimal
+from functools import reduce
+
+from django.core.exceptions import FieldDoesNotExist, FieldError, ValidationError
+from django.db.models import Q
+
+
+PAGE_SIZE = 50
+
+
+# ===================== CURSORS =====================
+# A cursor is the ordering values of the first/last row of a page,
+# JSON-encoded and base64'd so it can travel in ?after= / ?before=.
+
+def _pack(value):
+    if isinstance(value, datetime.datetime):
+        return {'dt': value.isoformat()}
+    if isinstance(value, datetime.date):
+        return {'d': value.isoformat()}
+    if isinstance(value, Decimal):
+        return {'dec': str(value)}
+    return value
+
+
+def _unpack(value):
+    if isinstance(value, dict):
+        if 'dt' in value:
+            return datetime.datetime.fromisoformat(value['dt'])
+        if 'd' in value:
+            return datetime.date.fromisoformat(value['d'])
+        if 'dec' in value:
+            return Decimal(value['dec'])
+    return value
+
+
+def encode_cursor(values):
+    raw = json.dumps([_pack(v) for v in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Values list from a cursor token, or None if it is missing/garbled."""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        values = json.loads(raw)
+        return [_unpack(v) for v in values]
+    except (ValueError, TypeError, ArithmeticError):   # ArithmeticError: bad {'dec': ...}
+        return None
+
+
+# ===================== KEYSET PAGINATION =====================
+
+def _parse_ordering(ordering):
+    return [(f[1:], True) if f.startswith('-') else (f, False) for f in ordering]
+
+
+def _sort_field(queryset, name):
+    """Model field or annotation output field behind an ordering name (None if unknown)."""
+    annotation = queryset.query.annotations.get(name)
+    if annotation is not None:
+        try:
+            return annotation.output_field
+        except FieldError:   # e.g. RawSQL without an output_field
+            return None
+    try:
+        return queryset.model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return None
+
+
+def _cursor_values(token, ordering, queryset):
+    """
+    Cursor values, each coerced through its sort field's to_python(), or
+    None (= first page) if the cursor is missing, garbled or tampered with.
+    """
+    values = decode_cursor(token)
+    if values is None or len(values) != len(ordering):
+        return None
+    cleaned = []
+    for (name, _), value in zip(_parse_ordering(ordering), values):
+        if value is None or isinstance(value, (list, dict)):
+            return None
+        field = _sort_field(queryset, name)
+        if field is not None:
+            try:
+                value = field.to_python(value)
+            except (ValidationError, TypeError, ValueError):
+                return None
+        cleaned.append(value)
+    return cleaned
+
+
+def _flip(ordering):
+    return [f[1:] if f.startswith('-') else '-' + f for f in ordering]
+
+
+def _seek_filter(fields, values):
+    """
+    Rows strictly after `values` in the given ordering:
+    (a > x) OR (a = x AND b > y) OR ... with < for descending fields.
+    The redundant leading `a >= x` lets the database seek into the
+    index instead of scanning it from the start.
+    """
+    clauses = []
+    for i, (name, desc) in enumerate(fields):
+        eq = {fields[j][0]: values[j] for j in range(i)}
+        op = 'lt' if desc else 'gt'
+        clauses.append(Q(**eq, **{f'{name}__{op}': values[i]}))
+
+    first, desc = fields[0]
+    bound = Q(**{f"{first}__{'lte' if desc else 'gte'}": values[0]})
+    return bound & reduce(lambda a, b: a | b, clauses)
+
+
+def _row_value(row, name):
+    # model instances, or dicts from values()
+    if isinstance(row, dict):
+        return row[name]
+    return getattr(row, name)
+
+
+class KeysetPage:
+    """One page of rows plus the cursors for its neighbours."""
+
+    def __init__(self, object_list, ordering, has_next, has_previous):
+        self.object_list = object_list
+        self.has_next = has_next
+        self.has_previous = has_previous
+
+        names = [name for name, _ in _parse_ordering(ordering)]
+        self.next_cursor = ''
+        self.previous_cursor = ''
+        if object_list:
+            if has_next:
+                self.next_cursor = encode_cursor([_row_value(object_list[-1], n) for n in names])
+            if has_previous:
+                self.previous_cursor = encode_cursor([_row_value(object_list[0], n) for n in names])
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+
+def keyset_queryset(queryset, ordering, after=None, before=None, per_page=PAGE_SIZE):
+    """
+    The (lazy) queryset for one page: a seek predicate plus LIMIT per_page + 1,
+    never an OFFSET. Rows come back in reverse order when paging backwards.
+    `ordering` must end in a unique column (normally the pk).
+    """
+    fields = _parse_ordering(ordering)
+    after_values = _cursor_values(after, ordering, queryset)
+    before_values = _cursor_values(before, ordering, queryset)
+
+    if before_values is not None:
+        flipped = [(name, not desc) for name, desc in fields]
+        qs = queryset.filter(_seek_filter(flipped, before_values)).order_by(*_flip(ordering))
+    elif after_values is not None:
+        qs = queryset.filter(_seek_filter(fields, after_values)).order_by(*ordering)
+    else:
+        qs = queryset.order_by(*ordering)
+
+    return qs[:per_page + 1]
+
+
+def make_page(rows, queryset, ordering, after=None, before=None, per_page=PAGE_SIZE):
+    """
+    Turn the rows fetched from keyset_queryset(queryset, ...) into a
+    KeysetPage (the queryset is needed to validate the cursors the same way).
+    """
+    rows = list(rows)
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+
+    if _cursor_values(before, ordering, queryset) is not None:
+        rows.reverse()
+        return KeysetPage(rows, ordering, has_next=True, has_previous=has_more)
+
+    return KeysetPage(
+        rows, ordering,
+        has_next=has_more,
+        has_previous=_cursor_values(after, ordering, queryset) is not None,
+    )
+
+
+def keyset_paginate(queryset, ordering, after=None, before=None, per_page=PAGE_SIZE):
+    qs = keyset_queryset(queryset, ordering, after, before, per_page)
+    return make_page(qs, queryset, ordering, after, before, per_page)
+
+
+def paginate_request(request, queryset, ordering, per_page=PAGE_SIZE):
+    """keyset_paginate() driven by ?after= / ?before= on the request."""
+    return keyset_paginate(
+        queryset,
+        ordering,
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+        per_page=per_page,
+    )
@@ -0,0 +1,267 @@
+import json
+import logging
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.template.backends.django import DjangoTemplates, Template
+
+
+# ===================== REQUEST PROFILING =====================
+# Per request: SQL query count and time (an execute wrapper on every
+# connection, see count_queries),
+# template render time (ProfilingTemplates backend), response size and
+# wall time. Every request is logged as one JSON line on the
+# `dealer.profiling` logger and folded into per-view stats for the
+# /backup/stats/ page. GETs of views in settings.QUERY_BUDGETS that run
+# more queries than allowed are logged as warnings, or raise
+# QueryBudgetExceeded when QUERY_BUDGETS_STRICT is on (always under
+# `manage.py test`). Streaming responses are measured until the last
+# chunk is sent, so per-row queries in export loops count too.
+
+logger = logging.getLogger('dealer.profiling')
+
+RECENT_REQUESTS = 200
+
+_current = ContextVar('khplwak_profile', default=None)
+
+# transaction bookkeeping, timed but not counted: how many of these a
+# view runs depends on the database (PostgreSQL's REPEATABLE READ
+# exports) and on whether it is nested in another transaction (tests)
+TRANSACTION_CONTROL = ('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT', 'SET TRANSACTION')
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class RequestProfile:
+    def __init__(self, request):
+        self.method = request.method
+        self.path = request.path
+        self.view = None
+        self.status = None
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.size = 0
+        self.started = time.perf_counter()
+        self.total_time = 0.0
+
+    def record_query(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            if not sql.startswith(TRANSACTION_CONTROL):
+                self.queries += 1
+            self.db_time += time.perf_counter() - started
+
+    def budget(self):
+        # writes run ledger / cache signals, so only reads have budgets
+        if self.method not in ('GET', 'HEAD'):
+            return None
+        return getattr(settings, 'QUERY_BUDGETS', {}).get(self.view)
+
+    def as_dict(self):
+        return {
+            'view': self.view,
+            'method': self.method,
+            'path': self.path,
+            'status': self.status,
+            'queries': self.queries,
+            'db_ms': round(self.db_time * 1000, 2),
+            'template_ms': round(self.template_time * 1000, 2),
+            'total_ms': round(self.total_time * 1000, 2),
+            'bytes': self.size,
+        }
+
+
+def count_queries(sender, connection, **kwargs):
+    """
+    connection_created receiver: every connection, in any thread, adds
+    its queries to the request in the current context. Connections are
+    per thread, so a wrapper installed on the middleware's own would
+    miss the async ORM's worker threads; sync_to_async copies the
+    context into them, so _current follows the request there.
+    """
+    if _record_query not in connection.execute_wrappers:   # fires again on reconnect
+        connection.execute_wrappers.append(_record_query)
+
+
+def _record_query(execute, sql, params, many, context):
+    profile = _current.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    return profile.record_query(execute, sql, params, many, context)
+
+
+# ---------- template timing ----------
+
+class ProfiledTemplate(Template):
+    def render(self, context=None, request=None):
+        profile = _current.get()
+        if profile is None:
+            return super().render(context, request)
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            profile.template_time += time.perf_counter() - started
+
+
+class ProfilingTemplates(DjangoTemplates):
+    """DjangoTemplates whose templates add their render time to the current request."""
+
+    def from_string(self, template_code):
+        return ProfiledTemplate(super().from_string(template_code).template, self)
+
+    def get_template(self, template_name):
+        return ProfiledTemplate(super().get_template(template_name).template, self)
+
+
+# ---------- per-view stats (this worker process) ----------
+
+_lock = threading.Lock()
+_views = {}
+_recent = deque(maxlen=RECENT_REQUESTS)
+
+
+def _record(profile):
+    row = profile.as_dict()
+    budget = profile.budget()
+    over = budget is not None and profile.queries > budget
+    with _lock:
+        _recent.append(row)
+        stats = _views.setdefault(profile.view, {
+            'view': profile.view, 'budget': budget, 'requests': 0, 'over_budget': 0,
+            'queries': 0, 'max_queries': 0, 'db_ms': 0.0, 'template_ms': 0.0,
+            'total_ms': 0.0, 'max_ms': 0.0, 'bytes': 0,
+        })
+        stats['requests'] += 1
+        stats['over_budget'] += over
+        stats['queries'] += row['queries']
+        stats['max_queries'] = max(stats['max_queries'], row['queries'])
+        stats['db_ms'] += row['db_ms']
+        stats['template_ms'] += row['template_ms']
+        stats['total_ms'] += row['total_ms']
+        stats['max_ms'] = max(stats['max_ms'], row['total_ms'])
+        stats['bytes'] += row['bytes']
+    return row, budget, over
+
+
+def view_stats():
+    """Per-view averages, slowest first."""
+    with _lock:
+        rows = [dict(s) for s in _views.values()]
+    for s in rows:
+        n = s['requests']
+        for key in ('queries', 'db_ms', 'template_ms', 'total_ms', 'bytes'):
+            s['avg_' + key] = s[key] / n
+    return sorted(rows, key=lambda s: s['avg_total_ms'], reverse=True)
+
+
+def recent_requests():
+    with _lock:
+        return list(reversed(_recent))
+
+
+def reset_stats():
+    with _lock:
+        _views.clear()
+        _recent.clear()
+
+
+def finish(profile):
+    profile.total_time = time.perf_counter() - profile.started
+    row, budget, over = _record(profile)
+    if over:
+        message = f"{profile.view} ran {profile.queries} queries (budget {budget}): {json.dumps(row)}"
+        if getattr(settings, 'QUERY_BUDGETS_STRICT', False):
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+    else:
+        logger.info(json.dumps(row))
+
+
+# ---------- middleware ----------
+
+class RequestProfiler:
+    """
+    Outermost middleware: everything below it (session, auth, view,
+    templates) is measured. Runs natively in both modes, so under ASGI
+    it does not push async views through a thread.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'PROFILING', True)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.enabled:
+            return self.get_response(request)
+
+        profile = RequestProfile(request)
+        token = _current.set(profile)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._measure(request, response, profile)
+
+    async def __acall__(self, request):
+        if not self.enabled:
+            return await self.get_response(request)
+
+        profile = RequestProfile(request)
+        token = _current.set(profile)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._measure(request, response, profile)
+
+    def _measure(self, request, response, profile):
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            return response   # not one of our views (404, static files)
+        profile.view = match.view_name
+        profile.status = response.status_code
+
+        if response.streaming and response.is_async:
+            response.streaming_content = self._astream(response.streaming_content, profile)
+        elif response.streaming:
+            response.streaming_content = self._stream(response.streaming_content, profile)
+        else:
+            profile.size = len(response.content)
+            finish(profile)
+        return response
+
+    def _stream(self, chunks, profile):
+        token = _current.set(profile)
+        try:
+            for chunk in chunks:
+                profile.size += len(chunk)
+                yield chunk
+        finally:
+            _current.reset(token)
+        finish(profile)
+
+    async def _astream(self, chunks, profile):
+        token = _current.set(profile)
+        try:
+            async for chunk in chunks:
+                profile.size += len(chunk)
+                yield chunk
+        finally:
+            _current.reset(token)
+        finish(profile)
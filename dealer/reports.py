@@ -0,0 +1,411 @@
+import datetime
+from collections import defaultdict
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, Max, Min, Q, Sum
+from django.db.models.functions import TruncMonth, TruncQuarter
+from django.utils import timezone
+
+from .caching import bump, versions
+from .models import Expense, Income, PeriodBalance, PeriodSummary
+
+
+# ===================== PERIOD ROLLUPS =====================
+# Income / expenses bucketed by month or quarter over a date range.
+# Whole months that are already over are read from PeriodBalance (closed
+# books) or PeriodSummary (computed + stored the first time); partial and
+# still-open months are summed live with one grouped query.
+
+# ledger -> (model, key field)
+PERIOD_LEDGERS = {
+    'income': (Income, 'source'),
+    'expense': (Expense, 'category'),
+}
+
+MONTH_TOTAL = ''   # key of the whole-month row in PeriodSummary / PeriodBalance
+
+PERIOD_LOCK = 7201   # PostgreSQL advisory lock namespace, see lock_period_summaries()
+
+GROUPINGS = {
+    'month': TruncMonth,
+    'quarter': TruncQuarter,
+}
+
+
+def as_date(value):
+    if isinstance(value, datetime.datetime):
+        if timezone.is_aware(value):
+            value = timezone.localtime(value)
+        return value.date()
+    return value
+
+
+def month_start(d):
+    return d.replace(day=1)
+
+
+def next_month(d):
+    if d.month == 12:
+        return datetime.date(d.year + 1, 1, 1)
+    return datetime.date(d.year, d.month + 1, 1)
+
+
+def quarter_start(d):
+    return datetime.date(d.year, (d.month - 1) // 3 * 3 + 1, 1)
+
+
+def period_label(period, group='month'):
+    if group == 'quarter':
+        return f"{period.year}-Q{(period.month - 1) // 3 + 1}"
+    return f"{period:%Y-%m}"
+
+
+def _buckets(start, end, group):
+    """Every bucket start from start to end, so empty periods show up too."""
+    bucket = quarter_start if group == 'quarter' else month_start
+    step = 3 if group == 'quarter' else 1
+    periods = []
+    current = bucket(start)
+    while current <= end:
+        periods.append(current)
+        for _ in range(step):
+            current = next_month(current)
+    return periods
+
+
+def _closed_months(start, end):
+    """Whole months inside [start, end] that are already over."""
+    first = start if start.day == 1 else next_month(start)
+    open_month = month_start(timezone.localdate())
+    months = []
+    m = first
+    while m < open_month and next_month(m) - datetime.timedelta(days=1) <= end:
+        months.append(m)
+        m = next_month(m)
+    return months
+
+
+def _grouped(model, key_field, cond, trunc):
+    return (
+        model.objects
+        .filter(cond)
+        .annotate(period=trunc('date'))
+        .values('period', key_field)
+        .annotate(n=Count('id'), total=Sum('amount'))
+        .order_by()
+    )
+
+
+def month_totals(ledger, months):
+    """
+    {month: {key: (row_count, total)}} for `months` of one ledger, in a
+    single grouped query. Months without rows map to {}.
+    """
+    model, key_field = PERIOD_LEDGERS[ledger]
+    data = {m: {} for m in months}
+    if not months:
+        return data
+
+    cond = Q(date__gte=min(months), date__lt=next_month(max(months)))
+    for row in _grouped(model, key_field, cond, TruncMonth):
+        period = as_date(row['period'])
+        if period in data:
+            data[period][row[key_field]] = (row['n'], row['total'] or Decimal('0'))
+    return data
+
+
+def _period_rows(model, ledger, months, **extra):
+    """PeriodSummary / PeriodBalance rows (month total + per key) for month_totals() output."""
+    rows = []
+    for m, keys in months.items():
+        rows.append(model(
+            ledger=ledger, period=m, key=MONTH_TOTAL,
+            row_count=sum(n for n, _ in keys.values()),
+            total=sum((t for _, t in keys.values()), Decimal('0')),
+            **extra,
+        ))
+        for key, (n, total) in keys.items():
+            rows.append(model(ledger=ledger, period=m, key=key, row_count=n, total=total, **extra))
+    return rows
+
+
+def lock_period_summaries(ledger):
+    """
+    Until the current transaction ends, be the only one storing or
+    dropping `ledger`'s summaries. A writer drops them (forget_periods)
+    before it commits; without the lock, a report summing meanwhile
+    cannot see its uncommitted row, and the writer's delete cannot see
+    the report's uncommitted summary, so the stale sum would be kept.
+      SQLite: transactions BEGIN IMMEDIATE (settings.py) and already
+        hold the database write lock until they end.
+      PostgreSQL: a transaction-level advisory lock per ledger. A report
+        that waited reads after the writer committed (READ COMMITTED);
+        a writer that waited deletes the report's committed summary.
+    """
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT pg_advisory_xact_lock(%s, %s)',
+                [PERIOD_LOCK, list(PERIOD_LEDGERS).index(ledger)],
+            )
+
+
+def summarise_months(ledger, months):
+    """
+    Sum past `months` of one ledger in a single grouped query and store
+    them in PeriodSummary. Returns {month: {key: total}}.
+    The sums are read and stored in one transaction that holds
+    lock_period_summaries(), so a write to the ledger either lands
+    before the sums are read or drops what is stored afterwards. Nothing
+    is stored either if the ledger's version token moved meanwhile.
+    """
+    model, _ = PERIOD_LEDGERS[ledger]
+    version = versions(model)
+    with transaction.atomic():
+        lock_period_summaries(ledger)
+        data = month_totals(ledger, months)
+        if versions(model) == version:
+            # a concurrent report may have stored the same month already
+            PeriodSummary.objects.bulk_create(_period_rows(PeriodSummary, ledger, data), ignore_conflicts=True)
+    return {
+        m: {key: total for key, (_, total) in keys.items()}
+        for m, keys in data.items()
+    }
+
+
+def _stored_months(model, ledger, months):
+    """{month: {key: total}} for the months that have stored rows in `model`."""
+    if not months:
+        return {}
+    rows = model.objects.filter(
+        ledger=ledger, period__gte=months[0], period__lte=months[-1],
+    ).values_list('period', 'key', 'total')
+
+    data = defaultdict(dict)
+    for period, key, total in rows:
+        if key == MONTH_TOTAL:
+            data.setdefault(period, {})
+        else:
+            data[period][key] = total
+    return dict(data)
+
+
+def period_rollup(ledger, start, end, group='month'):
+    """
+    Totals of one ledger between start and end (inclusive), bucketed by
+    month or quarter: [(period_start, {key: total}), ...] in date order.
+    """
+    model, key_field = PERIOD_LEDGERS[ledger]
+    bucket = quarter_start if group == 'quarter' else month_start
+    result = {period: defaultdict(Decimal) for period in _buckets(start, end, group)}
+
+    # past whole months: closed balances, then stored summaries, then
+    # compute + store whatever is still missing
+    closed = _closed_months(start, end)
+    months = _stored_months(PeriodBalance, ledger, closed)
+    rest = [m for m in closed if m not in months]
+    months.update(_stored_months(PeriodSummary, ledger, rest))
+    missing = [m for m in rest if m not in months]
+    months.update(summarise_months(ledger, missing))
+
+    for m, totals in months.items():
+        for key, total in totals.items():
+            result[bucket(m)][key] += total
+
+    # everything else in the range is summed live
+    if closed:
+        live = (
+            Q(date__gte=start, date__lt=closed[0])
+            | Q(date__gte=next_month(closed[-1]), date__lte=end)
+        )
+    else:
+        live = Q(date__gte=start, date__lte=end)
+
+    for row in _grouped(model, key_field, live, GROUPINGS[group]):
+        result[as_date(row['period'])][row[key_field]] += row['total'] or 0
+
+    return [(period, dict(totals)) for period, totals in result.items()]
+
+
+def forget_periods(ledger, *dates):
+    """Drop stored summaries for the months of `dates` (rows there changed)."""
+    months = {month_start(as_date(d)) for d in dates if d}
+    if months:
+        lock_period_summaries(ledger)
+        PeriodSummary.objects.filter(ledger=ledger, period__in=months).delete()
+
+
+def clear_period_summaries():
+    with transaction.atomic():
+        for ledger in PERIOD_LEDGERS:
+            lock_period_summaries(ledger)
+        PeriodSummary.objects.all().delete()
+
+
+# ===================== MONTH-END CLOSE =====================
+# Closing a month writes its PeriodBalance rows once; after that rows
+# dated in it cannot be added, edited or deleted. Corrections go in as
+# adjustment entries dated in an open month. Months close in order, so
+# everything up to closed_through() is closed.
+
+class PeriodClosedError(ValidationError):
+    pass
+
+
+def closed_through():
+    """First day of the last closed month, or None."""
+    return PeriodBalance.objects.filter(key=MONTH_TOTAL).aggregate(last=Max('period'))['last']
+
+
+def check_open(*dates):
+    """Raise PeriodClosedError if any of `dates` falls in a closed month."""
+    last = closed_through()
+    if last is None:
+        return
+    for d in dates:
+        if d and month_start(as_date(d)) <= last:
+            raise PeriodClosedError(
+                f"The books for {as_date(d):%B %Y} are closed. "
+                f"Record an adjustment dated after {last:%B %Y} instead."
+            )
+
+
+@transaction.atomic
+def close_books(through, user=None):
+    """
+    Close every open month up to and including the month of `through`.
+    Returns the list of months closed (empty if already closed).
+    """
+    through = month_start(as_date(through))
+    if through >= month_start(timezone.localdate()):
+        raise PeriodClosedError("Only months that are already over can be closed.")
+
+    try:
+        with transaction.atomic():
+            return _close_months(through, user)
+    except IntegrityError:
+        # a concurrent close_books() wrote some of the same months first
+        # (its rows were not visible when we read closed_through());
+        # start again from what it closed
+        return _close_months(through, user)
+
+
+def _close_months(through, user):
+    last = closed_through()
+    if last is not None and through <= last:
+        return []
+
+    if last is not None:
+        first = next_month(last)
+    else:
+        earliest = earliest_ledger_date()
+        first = month_start(earliest) if earliest and earliest < through else through
+
+    months = []
+    m = first
+    while m <= through:
+        months.append(m)
+        m = next_month(m)
+
+    balances = []
+    for ledger in PERIOD_LEDGERS:
+        balances += _period_rows(PeriodBalance, ledger, month_totals(ledger, months), closed_by=user)
+    PeriodBalance.objects.bulk_create(balances)
+    bump(PeriodBalance)
+
+    # the balances supersede any cached summaries for those months
+    PeriodSummary.objects.filter(period__lte=through).delete()
+    return months
+
+
+def balance_before(day):
+    """
+    Income minus expenses dated before `day`: the closed month-end
+    balances plus a scan of only the rows after them.
+    """
+    last = closed_through()
+    if last is None:
+        closed_until, live_from = None, None
+    elif day >= next_month(last):
+        closed_until, live_from = last, next_month(last)
+    else:
+        closed_until = month_start(day) - datetime.timedelta(days=1)
+        live_from = month_start(day)
+
+    balance = Decimal('0')
+    sign = {'income': 1, 'expense': -1}
+    if closed_until is not None:
+        rows = (
+            PeriodBalance.objects
+            .filter(key=MONTH_TOTAL, period__lte=closed_until)
+            .values('ledger')
+            .annotate(total=Sum('total'))
+            .order_by()
+        )
+        for row in rows:
+            balance += sign[row['ledger']] * (row['total'] or 0)
+
+    for ledger, (model, _) in PERIOD_LEDGERS.items():
+        live = model.objects.filter(date__lt=day)
+        if live_from is not None:
+            live = live.filter(date__gte=live_from)
+        balance += sign[ledger] * (live.aggregate(total=Sum('amount'))['total'] or 0)
+    return balance
+
+
+def earliest_ledger_date():
+    dates = [
+        model.objects.aggregate(first=Min('date'))['first']
+        for model, _ in PERIOD_LEDGERS.values()
+    ]
+    dates = [as_date(d) for d in dates if d]
+    return min(dates) if dates else None
+
+
+# ===================== FINANCE SERIES =====================
+
+def finance_series(start, end, group='month'):
+    """
+    Income vs expenses per period (with the running balance) plus the
+    range totals and breakdowns.
+    Used by finance_report and its JSON endpoint for charting.
+    """
+    income = period_rollup('income', start, end, group)
+    expense = period_rollup('expense', start, end, group)
+
+    periods = []
+    income_by_source = defaultdict(Decimal)
+    expense_by_category = defaultdict(Decimal)
+    opening = balance = balance_before(start)
+
+    for (period, inc), (_, exp) in zip(income, expense):
+        inc_total = sum(inc.values(), Decimal('0'))
+        exp_total = sum(exp.values(), Decimal('0'))
+        balance += inc_total - exp_total
+        periods.append({
+            'period': period,
+            'label': period_label(period, group),
+            'income': inc_total,
+            'expense': exp_total,
+            'net': inc_total - exp_total,
+            'balance': balance,
+        })
+        for key, total in inc.items():
+            income_by_source[key] += total
+        for key, total in exp.items():
+            expense_by_category[key] += total
+
+    return {
+        'start': start,
+        'end': end,
+        'group': group,
+        'periods': periods,
+        'opening_balance': opening,
+        'closing_balance': balance,
+        'total_income': sum((p['income'] for p in periods), Decimal('0')),
+        'total_expense': sum((p['expense'] for p in periods), Decimal('0')),
+        'income_by_source': dict(income_by_source),
+        'expense_by_category': dict(expense_by_category),
+    }
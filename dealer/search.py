@@ -0,0 +1,174 @@
+import re
+
+from django.db import connection
+from django.db.models import F, Q
+from django.db.models.functions import Lower
+
+from .models import PropertySearch
+
+
+# ===================== PROPERTY FULL-TEXT SEARCH =====================
+# On SQLite, properties are mirrored into an FTS5 table (external content,
+# so the text is not stored twice) and kept in sync by triggers. Queries
+# reach it through the unmanaged PropertySearch model. Other databases
+# fall back to icontains over the same columns.
+
+FTS_TABLE = PropertySearch._meta.db_table
+
+SEARCH_FIELDS = [
+    'address',
+    'city',
+    'area_name',
+    'property_type',
+    'owner_name',
+    'description',
+]
+
+
+def _fts_schema():
+    cols = ', '.join(SEARCH_FIELDS)
+    new_cols = ', '.join(f'new.{f}' for f in SEARCH_FIELDS)
+    old_cols = ', '.join(f'old.{f}' for f in SEARCH_FIELDS)
+    return [
+        f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+            {cols},
+            content='dealer_propertyitem',
+            content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2',
+            prefix='2 3'
+        )
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON dealer_propertyitem BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, {cols}) VALUES (new.id, {new_cols});
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON dealer_propertyitem BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {cols}) VALUES ('delete', old.id, {old_cols});
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE ON dealer_propertyitem BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {cols}) VALUES ('delete', old.id, {old_cols});
+            INSERT INTO {FTS_TABLE}(rowid, {cols}) VALUES (new.id, {new_cols});
+        END
+        """,
+    ]
+
+
+def fts_supported(conn=None):
+    conn = conn or connection
+    return conn.vendor == 'sqlite'
+
+
+def install_fts(conn=None):
+    """
+    Create the FTS table and its triggers if they are missing.
+    Safe to run any number of times.
+    """
+    conn = conn or connection
+    if not fts_supported(conn):
+        return False
+    with conn.cursor() as cursor:
+        for sql in _fts_schema():
+            cursor.execute(sql)
+    return True
+
+
+def fts_installed(conn=None):
+    conn = conn or connection
+    if not fts_supported(conn):
+        return False
+    with conn.cursor() as cursor:
+        return FTS_TABLE in conn.introspection.table_names(cursor)
+
+
+def rebuild_fts(conn=None):
+    """Re-index every property from dealer_propertyitem."""
+    conn = conn or connection
+    if not install_fts(conn):
+        return False
+    with conn.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+    return True
+
+
+def drop_fts_triggers(conn=None):
+    """
+    Stop syncing the index row by row, e.g. for a bulk load;
+    rebuild_fts() puts the triggers back and re-indexes in one pass.
+    """
+    conn = conn or connection
+    if not fts_supported(conn):
+        return
+    with conn.cursor() as cursor:
+        for suffix in ('ai', 'ad', 'au'):
+            cursor.execute(f"DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}")
+
+
+def drop_fts(conn=None):
+    conn = conn or connection
+    if not fts_supported(conn):
+        return
+    drop_fts_triggers(conn)
+    with conn.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+def fts_query(q):
+    """
+    Turn free text into an FTS5 query: every word must match, as a prefix.
+    'kart se' -> '"kart"* "se"*'
+    """
+    words = re.findall(r'\w+', q, re.UNICODE)
+    return ' '.join(f'"{w}"*' for w in words)
+
+
+def icontains_search(queryset, q):
+    """The unindexed fallback: any search field containing q."""
+    cond = Q()
+    for field in SEARCH_FIELDS:
+        cond |= Q(**{f'{field}__icontains': q})
+    return queryset.filter(cond)
+
+
+def search_properties(queryset, q):
+    """
+    Filter a PropertyItem queryset by the ?q= text.
+    Returns (queryset, ranked): when ranked is True the rows carry a
+    `search_rank` annotation (lower = better match) to order by.
+    """
+    if not q:
+        return queryset, False
+
+    if fts_supported():
+        match = fts_query(q)
+        if not match:
+            return queryset.none(), False
+
+        # a join (PropertySearch), so MATCH runs once and every matched
+        # row carries its rank; a correlated rank subquery re-ran the
+        # MATCH for each row
+        queryset = queryset.filter(search_index__match=match).annotate(search_rank=F('search_index__rank'))
+        return queryset, True
+
+    return icontains_search(queryset, q), False
+
+
+# ===================== PREFIX SEARCH (AUTOCOMPLETE) =====================
+# "Starts with" as a range over Lower(field), so it is answered from the
+# Lower() index on every backend (LIKE 'x%' only uses an index on
+# SQLite / PostgreSQL under collation conditions we cannot rely on).
+
+PREFIX_END = '\U0010ffff'
+
+
+def prefix_search(queryset, field, q):
+    """Rows whose `field` starts with q, case-insensitively, ordered by it."""
+    q = q.strip().lower()
+    queryset = queryset.alias(prefix_key=Lower(field))
+    if q:
+        queryset = queryset.filter(prefix_key__gte=q, prefix_key__lt=q + PREFIX_END)
+    return queryset.order_by('prefix_key', 'pk')
@@ -0,0 +1,222 @@
+import datetime
+import random
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from .backup import insert_objects
+from .caching import bump_all
+from .ledger import rebuild_totals
+from .models import Investor, PropertyItem, Transaction, Commission, Expense, Income
+from .reports import clear_period_summaries, closed_through, next_month
+
+
+# ===================== SYNTHETIC DATA =====================
+# Realistic, FK-consistent rows for all six models, inserted in
+# executemany batches, for benchmarks and load tests. Deterministic for a given
+# seed. Ledger dates are spread over the last `years` years but never
+# fall in a closed month; the running totals, period summaries and
+# cache versions are reset afterwards, as after a restore.
+
+BATCH_SIZE = 5000
+
+# rows per model at each preset scale
+SCALES = {
+    '1k': {'properties': 1_000, 'investors': 100, 'transactions': 1_000,
+           'commissions': 500, 'expenses': 1_000, 'income': 1_000},
+    '100k': {'properties': 100_000, 'investors': 10_000, 'transactions': 100_000,
+             'commissions': 50_000, 'expenses': 100_000, 'income': 100_000},
+    '1m': {'properties': 1_000_000, 'investors': 100_000, 'transactions': 1_000_000,
+           'commissions': 500_000, 'expenses': 1_000_000, 'income': 1_000_000},
+}
+
+CITIES = {
+    'Kabul': ['Karte Se', 'Karte Char', 'Khair Khana', 'Taimani', 'Shahr-e Naw', 'Dasht-e Barchi', 'Wazir Akbar Khan'],
+    'Jalalabad': ['Shisham Bagh', 'Sehat-e Ama', 'Zone 3', 'Chawni'],
+    'Herat': ['Jada-e Mahbas', 'Shahr-e Now', 'Baghe Azadi'],
+    'Mazar-i-Sharif': ['Karte Solh', 'Dasht-e Shadian', 'Hazrat Ali'],
+    'Kandahar': ['Aino Mena', 'Shahr-e Naw', 'Loya Wala'],
+}
+STREETS = ['Main Road', 'Street', 'Lane', 'Square', 'Bazaar Road', 'Avenue']
+PROPERTY_TYPES = ['House', 'Apartment', 'Shop', 'Land', 'Office', 'Villa']
+FIRST_NAMES = ['Ahmad', 'Mohammad', 'Abdul', 'Naweed', 'Farid', 'Hamid', 'Rahim', 'Karim',
+               'Zalmai', 'Wahid', 'Sahar', 'Mariam', 'Nargis', 'Shabnam', 'Laila', 'Fatima']
+SURNAMES = ['Ahmadzai', 'Stanikzai', 'Sultani', 'Popal', 'Barakzai', 'Hotak', 'Rahimi',
+            'Karimi', 'Noori', 'Safi', 'Wardak', 'Mohmand']
+WORDS = ['bright', 'corner', 'garden', 'renovated', 'quiet', 'near', 'school', 'mosque',
+         'market', 'new', 'paint', 'water', 'well', 'solar', 'roof', 'parking', 'view', 'road']
+
+
+def scale_counts(scale):
+    try:
+        return dict(SCALES[scale.lower()])
+    except KeyError:
+        raise ValueError(f"Unknown scale {scale!r}; choose from {', '.join(SCALES)}.")
+
+
+def _money(rng, low, high):
+    return Decimal(rng.randrange(low * 100, high * 100)) / 100
+
+
+def _text(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize() + '.'
+
+
+def _phone(rng):
+    return f"07{rng.randrange(10**8):08d}"
+
+
+def _moment(rng, start, end):
+    """Random aware datetime between two dates."""
+    day = start + datetime.timedelta(days=rng.randrange((end - start).days + 1))
+    seconds = rng.randrange(8 * 3600, 19 * 3600)
+    return timezone.make_aware(datetime.datetime.combine(day, datetime.time()) + datetime.timedelta(seconds=seconds))
+
+
+def _property(rng, n, start, end):
+    city = rng.choice(list(CITIES))
+    listing = rng.choices(['sale', 'rent', 'mortgage', 'other'], weights=[50, 35, 12, 3])[0]
+    price = _money(rng, 500_000, 40_000_000)
+    return PropertyItem(
+        address=f"{rng.randrange(1, 400)} {rng.choice(STREETS)} {n}, {rng.choice(CITIES[city])}",
+        city=city,
+        area_name=rng.choice(CITIES[city]),
+        property_type=rng.choice(PROPERTY_TYPES),
+        listing_type=listing,
+        status=rng.choices(['available', 'sold', 'rented', 'mortgaged', 'pending'], weights=[50, 20, 15, 8, 7])[0],
+        size=f"{rng.randrange(1, 40)} biswa",
+        bedrooms=rng.randrange(0, 7),
+        bathrooms=rng.randrange(1, 4),
+        kitchens=rng.randrange(1, 3),
+        floor_no=rng.choice(['Ground', '1st', '2nd', '3rd']),
+        total_floors=rng.randrange(1, 6),
+        parking_spaces=rng.randrange(0, 4),
+        floor_area_sqft=str(rng.randrange(400, 6000)),
+        sale_price=price if listing == 'sale' else None,
+        rent_monthly=_money(rng, 5_000, 150_000) if listing == 'rent' else None,
+        rent_deposit=_money(rng, 10_000, 300_000) if listing == 'rent' else None,
+        mortgage_amount=(price / 3).quantize(Decimal('0.01')) if listing == 'mortgage' else None,
+        mortgage_terms=_text(rng, 12) if listing == 'mortgage' else None,
+        owner_name=f"{rng.choice(FIRST_NAMES)} {rng.choice(SURNAMES)}",
+        owner_contact=_phone(rng),
+        description=_text(rng, rng.randrange(8, 40)),
+        created_at=_moment(rng, start, end),
+    )
+
+
+def _investor(rng, n, start, end):
+    return Investor(
+        full_name=f"{rng.choice(FIRST_NAMES)} {rng.choice(SURNAMES)} {n}",
+        surname=rng.choice(SURNAMES),
+        location=rng.choice(list(CITIES)),
+        phone=_phone(rng),
+        whatsapp=_phone(rng) if rng.random() < 0.6 else None,
+        investor_type=rng.choices(['partner', 'client', 'other'], weights=[60, 35, 5])[0],
+        status=rng.choices(['active', 'inactive'], weights=[85, 15])[0],
+        invested_amount=_money(rng, 100_000, 10_000_000),
+        created_at=_moment(rng, start, end),
+    )
+
+
+def _transaction(rng, ids, start, end):
+    return Transaction(
+        property_item_id=rng.choice(ids['properties']),
+        investor_id=rng.choice(ids['investors']),
+        transaction_type=rng.choices(['buy', 'sell'], weights=[55, 45])[0],
+        amount=_money(rng, 50_000, 20_000_000),
+        transaction_date=_moment(rng, start, end),
+    )
+
+
+def _commission(rng, ids, start, end):
+    percent = rng.random() < 0.7
+    commission = Commission(
+        property_item_id=rng.choice(ids['properties']),
+        deal_type=rng.choice(['sale', 'rent', 'mortgage']),
+        deal_amount=_money(rng, 100_000, 30_000_000),
+        commission_type='percent' if percent else 'fixed',
+        commission_value=Decimal(rng.choice(['1', '1.5', '2', '2.5', '3'])) if percent else _money(rng, 5_000, 200_000),
+        notes=_text(rng, 6) if rng.random() < 0.2 else None,
+        created_at=_moment(rng, start, end),
+    )
+    commission.total_earned = commission.compute_total()   # as save() / bulk_create() would
+    return commission
+
+
+def _expense(rng, ids, start, end):
+    return Expense(
+        property_item_id=rng.choice(ids['properties']) if rng.random() < 0.7 else None,
+        description=_text(rng, 4),
+        category=rng.choices(
+            ['purchase', 'maintenance', 'commission', 'legal', 'office', 'other'],
+            weights=[15, 30, 10, 10, 30, 5],
+        )[0],
+        amount=_money(rng, 500, 2_000_000),
+        date=_moment(rng, start, end).date(),
+        created_by_id=rng.choice(ids['users']) if ids['users'] else None,
+        remarks=_text(rng, 8) if rng.random() < 0.1 else None,
+    )
+
+
+def _income(rng, ids, start, end):
+    return Income(
+        property_item_id=rng.choice(ids['properties']) if rng.random() < 0.8 else None,
+        description=_text(rng, 4),
+        source=rng.choices(['sale', 'rent', 'investor_return', 'other'], weights=[25, 50, 20, 5])[0],
+        amount=_money(rng, 1_000, 3_000_000),
+        date=_moment(rng, start, end).date(),
+        created_by_id=rng.choice(ids['users']) if ids['users'] else None,
+        remarks=_text(rng, 8) if rng.random() < 0.1 else None,
+    )
+
+
+def _insert(model, count, make, batch_size, stdout):
+    # as made, auto_now_add timestamps included
+    insert_objects(model, (make(n) for n in range(count)), batch_size)
+    if stdout:
+        stdout.write(f"  {model._meta.label}: {count} rows")
+
+
+def seed(counts, seed=0, years=3, batch_size=BATCH_SIZE, stdout=None):
+    """
+    Bulk-insert synthetic rows. `counts` maps properties / investors /
+    transactions / commissions / expenses / income to row counts.
+    """
+    rng = random.Random(seed)
+    end = timezone.localdate()
+    start = end - datetime.timedelta(days=365 * years)
+    closed = closed_through()
+    ledger_start = max(start, next_month(closed)) if closed else start
+
+    with transaction.atomic():
+        _insert(PropertyItem, counts.get('properties', 0),
+                lambda n: _property(rng, n, start, end), batch_size, stdout)
+        _insert(Investor, counts.get('investors', 0),
+                lambda n: _investor(rng, n, start, end), batch_size, stdout)
+
+        ids = {
+            'properties': list(PropertyItem.objects.values_list('id', flat=True)),
+            'investors': list(Investor.objects.values_list('id', flat=True)),
+            'users': list(User.objects.values_list('id', flat=True)),
+        }
+        ledger_rows = sum(counts.get(k, 0) for k in ('transactions', 'commissions', 'expenses', 'income'))
+        if ledger_rows and not ids['properties']:
+            raise ValueError("Ledger rows need at least one property.")
+        if counts.get('transactions') and not ids['investors']:
+            raise ValueError("Transactions need at least one investor.")
+
+        _insert(Transaction, counts.get('transactions', 0),
+                lambda n: _transaction(rng, ids, start, end), batch_size, stdout)
+        _insert(Commission, counts.get('commissions', 0),
+                lambda n: _commission(rng, ids, start, end), batch_size, stdout)
+        _insert(Expense, counts.get('expenses', 0),
+                lambda n: _expense(rng, ids, ledger_start, end), batch_size, stdout)
+        _insert(Income, counts.get('income', 0),
+                lambda n: _income(rng, ids, ledger_start, end), batch_size, stdout)
+
+        # raw INSERTs skip signals, as in restore_backup()
+        rebuild_totals()
+        clear_period_summaries()
+        bump_all()
@@ -0,0 +1,159 @@
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+
+from django.db import connections
+
+from .ledger import LEDGERS, apply_delta, ledger_key
+from .caching import VERSIONED_MODELS, bump, bump_all
+from .models import Transaction, Commission, Expense, Income
+from .reports import check_open, forget_periods
+from .search import fts_installed, install_fts
+
+
+def _key_and_amount(sender, key_value, amount):
+    return ledger_key(sender, key_value), amount or 0
+
+
+# ===================== RUNNING TOTALS =====================
+
+@receiver(pre_save, sender=Transaction)
+@receiver(pre_save, sender=Commission)
+@receiver(pre_save, sender=Expense)
+@receiver(pre_save, sender=Income)
+def remember_ledger_row(sender, instance, raw=False, **kwargs):
+    """
+    On edit, remember what the row looked like before so post_save can
+    apply only the difference. The row is locked until the save commits
+    (LedgerRow.save() runs in a transaction), so a concurrent edit waits
+    and then reads the new values instead of applying the same delta.
+    """
+    instance._ledger_old = None
+    if raw or instance.pk is None:
+        return
+
+    _, key_field, amount_field = LEDGERS[sender]
+    fields = [key_field, amount_field] if key_field else [amount_field]
+    old = (
+        sender.objects.select_for_update()
+        .filter(pk=instance.pk).values_list(*fields).first()
+    )
+    if old is None:
+        return
+
+    if key_field:
+        instance._ledger_old = _key_and_amount(sender, old[0], old[1])
+    else:
+        instance._ledger_old = _key_and_amount(sender, None, old[0])
+
+
+@receiver(post_save, sender=Transaction)
+@receiver(post_save, sender=Commission)
+@receiver(post_save, sender=Expense)
+@receiver(post_save, sender=Income)
+def update_ledger_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+
+    ledger, key_field, amount_field = LEDGERS[sender]
+    new_key, new_amount = _key_and_amount(
+        sender,
+        getattr(instance, key_field) if key_field else None,
+        getattr(instance, amount_field),
+    )
+    old = getattr(instance, '_ledger_old', None)
+    instance._ledger_old = None
+
+    if created or old is None:
+        apply_delta(ledger, new_key, 1, new_amount)
+        return
+
+    old_key, old_amount = old
+    if old_key == new_key:
+        apply_delta(ledger, new_key, 0, new_amount - old_amount)
+    else:
+        # type / category / source changed -> move the row across keys
+        apply_delta(ledger, old_key, -1, -old_amount)
+        apply_delta(ledger, new_key, 1, new_amount)
+
+
+@receiver(post_delete, sender=Transaction)
+@receiver(post_delete, sender=Commission)
+@receiver(post_delete, sender=Expense)
+@receiver(post_delete, sender=Income)
+def update_ledger_on_delete(sender, instance, **kwargs):
+    ledger, key_field, amount_field = LEDGERS[sender]
+    key, amount = _key_and_amount(
+        sender,
+        getattr(instance, key_field) if key_field else None,
+        getattr(instance, amount_field),
+    )
+    apply_delta(ledger, key, -1, -amount)
+
+
+# ===================== PERIOD SUMMARIES / CLOSED BOOKS =====================
+
+@receiver(pre_save, sender=Expense)
+@receiver(pre_save, sender=Income)
+def remember_period(sender, instance, raw=False, **kwargs):
+    """
+    Refuse writes into closed months (old or new date), and remember the
+    old date so a row moved to another month clears both summaries.
+    """
+    instance._period_old = None
+    if raw:
+        return
+    if instance.pk is not None:
+        instance._period_old = sender.objects.filter(pk=instance.pk).values_list('date', flat=True).first()
+    check_open(instance.date, instance._period_old)
+
+
+@receiver(post_save, sender=Expense)
+@receiver(post_save, sender=Income)
+def forget_period_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    ledger = LEDGERS[sender][0]
+    forget_periods(ledger, instance.date, getattr(instance, '_period_old', None))
+    instance._period_old = None
+
+
+@receiver(pre_delete, sender=Expense)
+@receiver(pre_delete, sender=Income)
+def refuse_closed_delete(sender, instance, **kwargs):
+    check_open(instance.date)
+
+
+@receiver(post_delete, sender=Expense)
+@receiver(post_delete, sender=Income)
+def forget_period_on_delete(sender, instance, **kwargs):
+    forget_periods(LEDGERS[sender][0], instance.date)
+
+
+# ===================== CACHE VERSIONS =====================
+
+def bump_cache_version(sender, **kwargs):
+    """post_save / post_delete: cached data built from `sender` is stale."""
+    bump(sender)
+
+
+for _model in VERSIONED_MODELS:
+    post_save.connect(bump_cache_version, sender=_model, dispatch_uid=f'bump_cache_{_model._meta.label_lower}_save')
+    post_delete.connect(bump_cache_version, sender=_model, dispatch_uid=f'bump_cache_{_model._meta.label_lower}_delete')
+
+
+def reset_cache_versions(sender, **kwargs):
+    """post_migrate: migrations can rewrite rows without signals."""
+    bump_all()
+
+
+# ===================== SEARCH INDEX =====================
+
+def ensure_search_index(sender, using='default', **kwargs):
+    """
+    post_migrate: SQLite table rebuilds during migrations drop the
+    triggers on dealer_propertyitem, so put them back if the FTS table
+    is there (no-op when they already exist).
+    """
+    conn = connections[using]
+    if fts_installed(conn):
+        install_fts(conn)
@@ -0,0 +1,47 @@
+from contextlib import contextmanager
+
+from django.db import connection, transaction
+
+
+# ===================== READ SNAPSHOTS =====================
+# One transaction around a long read (backups, streamed exports), so
+# every query in it sees the same moment without blocking writers.
+#   SQLite: connections BEGIN IMMEDIATE (settings.py), which takes the
+#     write lock for the whole transaction; a read-only one is started
+#     with a plain (deferred) BEGIN, which only holds a WAL snapshot.
+#   PostgreSQL: READ COMMITTED takes a new snapshot per statement, so
+#     the transaction asks for REPEATABLE READ.
+# Nested in a transaction that is already open (ATOMIC_REQUESTS, tests)
+# neither can be changed, and the outer transaction's rules apply.
+
+
+def set_snapshot_isolation():
+    """REPEATABLE READ for the transaction just begun; must run before its first query."""
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SET TRANSACTION ISOLATION LEVEL REPEATABLE READ')
+
+
+@contextmanager
+def read_snapshot():
+    """A transaction for reads that all see one snapshot and take no write lock."""
+    if connection.in_atomic_block:
+        with transaction.atomic():
+            yield
+        return
+
+    if connection.vendor != 'sqlite':
+        with transaction.atomic():
+            set_snapshot_isolation()
+            yield
+        return
+
+    connection.ensure_connection()   # connecting resets transaction_mode from settings
+    mode = connection.transaction_mode
+    connection.transaction_mode = None
+    try:
+        with transaction.atomic():
+            connection.transaction_mode = mode
+            yield
+    finally:
+        connection.transaction_mode = mode
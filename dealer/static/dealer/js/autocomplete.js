@@ -0,0 +1,80 @@
+// Autocomplete for <select data-autocomplete-url="...">.
+// The server renders only the chosen option; typing in the search box
+// above the select fetches matching rows and swaps them in as options.
+(function () {
+  'use strict';
+
+  var DELAY = 200;
+
+  function option(value, text, selected) {
+    var opt = document.createElement('option');
+    opt.value = value;
+    opt.textContent = text;
+    opt.selected = !!selected;
+    return opt;
+  }
+
+  function setup(select) {
+    var url = select.getAttribute('data-autocomplete-url');
+    var search = document.createElement('input');
+    search.type = 'search';
+    search.className = 'form-control form-control-sm mb-1';
+    search.placeholder = 'Type to search…';
+    search.setAttribute('autocomplete', 'off');
+    select.parentNode.insertBefore(search, select);
+
+    var blank = select.querySelector('option[value=""]');
+    var timer = null;
+    var pending = null;
+
+    function render(data) {
+      var current = select.value;
+      var keep = current ? select.querySelector('option:checked') : null;
+      select.innerHTML = '';
+      if (blank) select.appendChild(blank);
+      var seen = false;
+      data.results.forEach(function (row) {
+        var value = String(row.id);
+        if (value === current) seen = true;
+        select.appendChild(option(value, row.text, value === current));
+      });
+      // the chosen row stays selectable even if it no longer matches
+      if (keep && !seen) select.insertBefore(keep, select.children[blank ? 1 : 0] || null);
+      if (data.more) {
+        var hint = option('', 'Keep typing to narrow the list…');
+        hint.disabled = true;
+        select.appendChild(hint);
+      }
+      select.value = current;
+    }
+
+    function lookup() {
+      if (pending) pending.abort();
+      pending = new AbortController();
+      fetch(url + '?q=' + encodeURIComponent(search.value), {
+        credentials: 'same-origin',
+        headers: {'Accept': 'application/json'},
+        signal: pending.signal
+      })
+        .then(function (response) { return response.ok ? response.json() : null; })
+        .then(function (data) { if (data) render(data); })
+        .catch(function () {});
+    }
+
+    search.addEventListener('input', function () {
+      clearTimeout(timer);
+      timer = setTimeout(lookup, DELAY);
+    });
+    // first focus loads the first page of options
+    select.addEventListener('focus', function () {
+      if (!select.dataset.loaded) {
+        select.dataset.loaded = '1';
+        lookup();
+      }
+    });
+  }
+
+  document.addEventListener('DOMContentLoaded', function () {
+    document.querySelectorAll('select[data-autocomplete-url]').forEach(setup);
+  });
+})();
@@ -1,3 +1,1105 @@
-from django.test import TestCase
+import contextvars
+import datetime
+import gzip
+import io
+import json
+import re
+import tempfile
+import threading
+import tracemalloc
+from decimal import Decimal
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import IntegrityError, connection, connections, transaction
+from django.db.models import OuterRef, Subquery, Sum
+from django.template import engines
+from django.template.loaders.cached import Loader as CachedLoader
+from django.template.loaders.filesystem import Loader as FilesystemLoader
+from django.templatetags.static import static
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.module_loading import import_string
+from django.utils import timezone
+
+from . import reports
+from .backup import BACKUP_MODELS, BackupError, restore_backup, write_backup
+from .benchmark import MIN_SAMPLES, compare, discover_cases, run
+from .exports import BACKUP_SECTIONS, CHUNK_SIZE
+from .forms import ExpenseForm, IncomeForm
+from .importers import import_file
+from .ledger import compute_totals, stored_totals, verify_totals
+from .metrics import dashboard_metrics, with_investor_totals, with_property_pnl
+from .models import (
+    Investor, PropertyItem, Transaction, Commission, Expense, Income, PeriodBalance, PeriodSummary,
+    PROPERTY_TEXT_FIELDS, commission_total,
+)
+from .pagination import encode_cursor, keyset_paginate
+from .profiling import TRANSACTION_CONTROL, QueryBudgetExceeded, RequestProfile, _current, recent_requests
+from .reports import (
+    PeriodClosedError, close_books, closed_through, month_start, period_rollup, summarise_months,
+)
+from .search import FTS_TABLE, search_properties
+from .seed import seed
+from .views import INVESTOR_SORTS, PROPERTY_PNL_SORTS
+
+
+class DealerTestCase(TestCase):
+    """
+    Logged-in client and an empty cache. Cache versions are bumped on
+    commit, which never happens inside a TestCase, so entries cached by
+    one test would otherwise be served to the next.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_superuser('admin', 'admin@example.com', None)
+        self.client.force_login(self.user)
+
+    def seed(self, **counts):
+        seed(counts)
+        cache.clear()
+
+
+# ===================== DASHBOARD =====================
+
+class DashboardTests(DealerTestCase):
+    def test_metrics_match_a_full_recount(self):
+        self.seed(properties=40, investors=10, transactions=120, commissions=30)
+        metrics = dashboard_metrics()
+
+        self.assertEqual(metrics['investor_count'], Investor.objects.count())
+        self.assertEqual(metrics['property_count'], PropertyItem.objects.count())
+        self.assertEqual(metrics['transaction_count'], Transaction.objects.count())
+        for status in ('available', 'rented', 'sold', 'mortgaged'):
+            self.assertEqual(
+                metrics[f'{status}_count'], PropertyItem.objects.filter(status=status).count(),
+            )
+        for key, kind in (('total_invested', 'buy'), ('total_returned', 'sell')):
+            expected = sum(t.amount for t in Transaction.objects.filter(transaction_type=kind))
+            self.assertAlmostEqual(float(metrics[key]), float(expected), places=2)
+        self.assertAlmostEqual(
+            float(metrics['total_commissions']),
+            float(sum(c.total_earned for c in Commission.objects.all())),
+            places=2,
+        )
+
+    def test_query_count_does_not_grow_with_data(self):
+        self.seed(properties=10, investors=5, transactions=10)
+        with self.assertNumQueries(3):
+            dashboard_metrics()
+
+        self.seed(properties=500, investors=50, transactions=2000, commissions=200)
+        with self.assertNumQueries(3):
+            dashboard_metrics()
+
+    def test_home_page(self):
+        self.seed(properties=200, investors=20, transactions=500, commissions=50)
+        # session + user + the three dashboard queries
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse('home'))
+        self.assertEqual(response.status_code, 200)
+        # cached for the next request
+        with self.assertNumQueries(2):
+            self.client.get(reverse('home'))
+
+    @override_settings(CACHE_SINGLE_PROCESS=False)
+    def test_no_caching_on_a_per_process_backend(self):
+        # other workers would never see this process's version bumps
+        self.seed(properties=20, investors=5, transactions=20)
+        for _ in range(2):
+            with self.assertNumQueries(5):
+                self.client.get(reverse('home'))
+
+    def test_caching_on_a_shared_backend(self):
+        self.seed(properties=20, investors=5, transactions=20)
+        with tempfile.TemporaryDirectory() as location, override_settings(
+            CACHE_SINGLE_PROCESS=False,
+            CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                'LOCATION': location,
+            }},
+        ):
+            with self.assertNumQueries(5):
+                self.client.get(reverse('home'))
+            with self.assertNumQueries(2):
+                self.client.get(reverse('home'))
+
+
+class ConditionalGetTests(DealerTestCase):
+    def test_unchanged_page_is_not_modified(self):
+        self.seed(properties=5, investors=2, transactions=5)
+        etag = self.client.get(reverse('investor_list'))['ETag']
+        response = self.client.get(reverse('investor_list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    @override_settings(CACHE_SINGLE_PROCESS=False)
+    def test_no_etag_from_per_process_versions(self):
+        self.seed(properties=5, investors=2, transactions=5)
+        response = self.client.get(reverse('investor_list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('ETag'))
+        self.assertIn('no-store', response['Cache-Control'])
+
+
+# ===================== RUNNING TOTALS =====================
+
+class LedgerTotalTests(DealerTestCase):
+    def assertTotalsInSync(self):
+        stored = stored_totals()
+        for key, (n, total) in compute_totals().items():
+            got_n, got_total = stored.get(key, (0, Decimal('0')))
+            self.assertEqual(got_n, n, key)
+            self.assertEqual(round(Decimal(got_total), 2), round(Decimal(total), 2), key)
+
+    def test_edits_move_amounts_between_keys(self):
+        self.seed(properties=5, investors=3, transactions=20, expenses=20, income=10, commissions=10)
+        self.assertTotalsInSync()
+
+        t = Transaction.objects.filter(transaction_type='buy').first()
+        t.transaction_type, t.amount = 'SELL', t.amount + 5
+        t.save()
+        e = Expense.objects.first()
+        e.category = 'legal' if e.category != 'legal' else 'other'
+        e.save()
+        c = Commission.objects.first()
+        c.deal_amount += 1000
+        c.save()
+        Income.objects.first().delete()
+        Transaction.objects.filter(pk__in=Transaction.objects.values('pk')[:3]).delete()
+
+        self.assertTotalsInSync()
+
+    def test_row_and_total_roll_back_together(self):
+        self.seed(properties=2, investors=1, expenses=3)
+        e = Expense.objects.first()
+        amount = e.amount
+        before = stored_totals()
+
+        with mock.patch('dealer.signals.apply_delta', side_effect=RuntimeError('boom')):
+            e.amount += 10
+            with self.assertRaises(RuntimeError):
+                e.save()
+
+        e.refresh_from_db()
+        self.assertEqual(e.amount, amount)
+        self.assertEqual(stored_totals(), before)
+        self.assertTotalsInSync()
+
+    def test_old_values_are_read_for_update(self):
+        self.seed(properties=1, investors=1, transactions=1)
+        t = Transaction.objects.get()
+        t.amount += 1
+        with CaptureQueriesContext(connection) as ctx:
+            t.save()
+        reads = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('SELECT')]
+        if connection.features.has_select_for_update:
+            self.assertIn('FOR UPDATE', reads[0])
+        # the save and its signal writes are one transaction (a savepoint inside TestCase)
+        self.assertIn(ctx.captured_queries[0]['sql'].split()[0], ('BEGIN', 'SAVEPOINT'))
+
+
+class CommissionQuerySetTests(DealerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.seed(properties=3, investors=1, commissions=5)
+        self.prop = PropertyItem.objects.first()
+
+    def test_bulk_writes_keep_the_total(self):
+        rows = [
+            Commission(property_item=self.prop, deal_type='sale', deal_amount=Decimal(1000 + i),
+                       commission_type='percent', commission_value=Decimal('1.5'))
+            for i in range(501)
+        ]
+        Commission.objects.bulk_create(rows, batch_size=100)
+        self.assertEqual(verify_totals(), [])
+
+        Commission.objects.filter(pk__in=[c.pk for c in rows[:50]]).update(commission_value=Decimal('2'))
+        self.assertEqual(verify_totals(), [])
+
+        Commission.objects.bulk_create([Commission(
+            property_item=self.prop, deal_type='rent', deal_amount=Decimal('500'),
+            commission_type='fixed', commission_value=Decimal('25'),
+        )], ignore_conflicts=True)
+        self.assertEqual(verify_totals(), [])
+
+    def test_bulk_update_of_the_inputs_recomputes_the_total(self):
+        rows = list(Commission.objects.all())
+        for c in rows:
+            c.deal_amount += 100
+        Commission.objects.bulk_update(rows, ['deal_amount', 'total_earned'])
+        self.assertEqual(verify_totals(), [])
+        for c in rows:
+            self.assertEqual(Commission.objects.get(pk=c.pk).total_earned, c.compute_total())
+
+    def test_bulk_update_of_total_earned_alone_recomputes_it(self):
+        rows = list(Commission.objects.all())
+        Commission.objects.filter(pk=rows[0].pk).update(total_earned=Decimal('999999'))   # written behind its back
+        for c in rows:
+            c.total_earned = Decimal('1')
+        self.assertEqual(Commission.objects.bulk_update(rows, ['total_earned']), len(rows))
+        for c in rows:
+            self.assertEqual(c.total_earned, c.compute_total())
+        self.assertEqual(Commission.objects.exclude(total_earned=commission_total()).count(), 0)
+        self.assertEqual(verify_totals(), [])
+        with self.assertRaisesMessage(ValueError, 'Field names must be given'):
+            Commission.objects.bulk_update(rows, [])
+
+
+# ===================== TRANSACTION TYPES =====================
+
+class TransactionTypeTests(DealerTestCase):
+    def test_type_is_stored_lowercase(self):
+        self.seed(properties=1, investors=1)
+        t = Transaction.objects.create(
+            property_item=PropertyItem.objects.get(), investor=Investor.objects.get(),
+            transaction_type=' SELL ', amount=Decimal('10'),
+        )
+        t.refresh_from_db()
+        self.assertEqual(t.transaction_type, 'sell')
+
+        # bulk writes skip save(); the CHECK constraint catches them
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Transaction.objects.filter(pk=t.pk).update(transaction_type='Buy')
+
+    def test_type_filters_compile_to_equality(self):
+        self.seed(properties=5, investors=3, transactions=30)
+        investor = Investor.objects.first()
+        prop = PropertyItem.objects.first()
+        # the dashboard reads LedgerTotal and never filters on the type
+        for url in (reverse('investor_list'), reverse('investor_detail', args=[investor.pk]),
+                    reverse('property_detail', args=[prop.pk])):
+            with CaptureQueriesContext(connection) as ctx:
+                self.assertEqual(self.client.get(url).status_code, 200)
+            filtered = [q['sql'] for q in ctx.captured_queries if 'transaction_type' in q['sql']]
+            self.assertTrue(filtered, url)
+            for sql in filtered:
+                self.assertNotIn('LIKE', sql.upper(), url)
+                self.assertNotIn('UPPER(', sql.upper(), url)
+
+
+# ===================== KEYSET PAGINATION =====================
+
+class CursorTests(DealerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.seed(properties=5, investors=5, transactions=10, expenses=60)
+
+    def test_pages_cover_every_row_once(self):
+        seen, after = [], None
+        while True:
+            page = keyset_paginate(Expense.objects.all(), ['-date', '-id'], after=after, per_page=7)
+            seen += [e.pk for e in page]
+            if not page.has_next:
+                break
+            after = page.next_cursor
+        self.assertEqual(sorted(seen), sorted(Expense.objects.values_list('pk', flat=True)))
+
+    def test_tampered_cursors_fall_back_to_the_first_page(self):
+        first = [e.pk for e in keyset_paginate(Expense.objects.all(), ['-date', '-id'])]
+        tampered = [
+            encode_cursor(['not-a-date', 5]),
+            encode_cursor(['2024-01-01', 'x']),
+            encode_cursor([{'d': 'garbage'}, 5]),
+            encode_cursor([{'dec': 'NaNx'}, 5]),
+            encode_cursor([[1, 2], 5]),
+            encode_cursor([None, 5]),
+            'not base64 !!',
+        ]
+        for cursor in tampered:
+            for param in ('after', 'before'):
+                page = keyset_paginate(Expense.objects.all(), ['-date', '-id'], **{param: cursor})
+                self.assertEqual([e.pk for e in page], first, (param, cursor))
+
+                response = self.client.get(reverse('expense_list'), {param: cursor})
+                self.assertEqual(response.status_code, 200)
+
+        response = self.client.get(reverse('investor_list'), {'sort': 'net', 'after': encode_cursor(['abc', 'x'])})
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(
+            reverse('api_collection', args=['transactions']), {'after': encode_cursor(['abc', 'x'])},
+        )
+        self.assertEqual(response.status_code, 200)
+
+
+def walk(queryset, ordering, per_page=7):
+    """Primary keys of every page, following next_cursor to the end."""
+    seen, after = [], None
+    while True:
+        page = keyset_paginate(queryset, ordering, after=after, per_page=per_page)
+        seen += [row.pk for row in page]
+        if not page.has_next:
+            return seen
+        after = page.next_cursor
+
+
+class AggregateSortTests(DealerTestCase):
+    """Sorting on summed money must page through every row exactly once."""
+
+    def assertWalksOnce(self, queryset, sorts):
+        expected = sorted(queryset.values_list('pk', flat=True))
+        for sort, ordering in sorts.items():
+            seen = walk(queryset, ordering)
+            self.assertEqual(len(seen), len(expected), sort)
+            self.assertEqual(sorted(seen), expected, sort)
+
+    def test_investor_sorts(self):
+        self.seed(properties=50, investors=100, transactions=1000)
+        self.assertWalksOnce(with_investor_totals(Investor.objects.all()), INVESTOR_SORTS)
+
+    def test_property_pnl_sorts(self):
+        self.seed(properties=1000, investors=20, transactions=2000, commissions=500, expenses=1500, income=1500)
+        self.assertWalksOnce(with_property_pnl(PropertyItem.objects.all()), PROPERTY_PNL_SORTS)
+
+
+# ===================== PROJECTIONS =====================
+
+class ProjectionTests(DealerTestCase):
+    # a text column selected whole (SUBSTR / SUBSTRING previews are fine)
+    TEXT_COLUMN = re.compile(
+        r'(?<!SUBSTR\()(?<!SUBSTRING\()"dealer_propertyitem"\."(?:%s)"' % '|'.join(PROPERTY_TEXT_FIELDS)
+    )
+
+    def test_list_paths_never_fetch_text_columns(self):
+        self.seed(properties=20, investors=5, transactions=20, commissions=10, expenses=20, income=20)
+        urls = [
+            reverse('property_list'),
+            reverse('property_list') + '?pnl=1&sort=profit',
+            reverse('property_list') + '?q=kabul',
+            reverse('commission_list'),
+            reverse('transaction_list'),
+            reverse('expense_list'),
+            reverse('income_list'),
+            reverse('transaction_create'),
+            reverse('commission_create'),
+            reverse('api_collection', args=['properties']),
+            reverse('autocomplete', args=['properties']) + '?q=a',
+        ] + [
+            reverse(f'admin:dealer_{model._meta.model_name}_changelist')
+            for model in (PropertyItem, Transaction, Commission, Expense, Income)
+        ]
+        for url in urls:
+            cache.clear()
+            with CaptureQueriesContext(connection) as ctx:
+                self.assertEqual(self.client.get(url).status_code, 200, url)
+            for query in ctx.captured_queries:
+                # the select list; searching without FTS5 filters on the text
+                columns = query['sql'].split(' FROM ', 1)[0]
+                self.assertIsNone(self.TEXT_COLUMN.search(columns), f"{url}: {query['sql']}")
+
+
+class AutocompleteFormTests(DealerTestCase):
+    def test_forms_load_the_autocomplete_script(self):
+        script = static('dealer/js/autocomplete.js')
+        for name in ('transaction_create', 'commission_create', 'expense_create', 'income_create'):
+            response = self.client.get(reverse(name))
+            self.assertContains(response, f'<script src="{script}"', msg_prefix=name)
+            self.assertContains(response, 'data-autocomplete-url', msg_prefix=name)
+
+
+class PageAssetTests(DealerTestCase):
+    PAGES = {
+        'home': 'dealer/css/home.css',
+        'property_list': 'dealer/css/property_list.css',
+        'expense_create': 'dealer/css/expense_form.css',
+        'finance_report': 'dealer/css/finance_report.css',
+    }
+
+    def assertLinksStylesheets(self, response, *paths, msg_prefix=''):
+        for path in paths:
+            self.assertContains(response, f'<link rel="stylesheet" href="{static(path)}">', msg_prefix=msg_prefix)
+        self.assertNotContains(response, '<style', msg_prefix=msg_prefix)
+
+    def test_pages_link_their_stylesheets(self):
+        for name, css in self.PAGES.items():
+            response = self.client.get(reverse(name))
+            self.assertLinksStylesheets(response, 'dealer/css/base.css', css, msg_prefix=name)
+
+        self.client.logout()
+        self.assertLinksStylesheets(self.client.get(reverse('login')), 'css/login.css', msg_prefix='login')
+
+    def test_no_template_has_inline_styles(self):
+        base = settings.BASE_DIR
+        templates = [*base.glob('templates/**/*.html'), *base.glob('*/templates/**/*.html')]
+        self.assertTrue(templates)
+        for path in templates:
+            self.assertNotIn('<style', path.read_text(encoding='utf-8'), path)
+
+    def test_templates_are_cached_outside_debug(self):
+        self.assertFalse(settings.DEBUG)
+        loader = engines.all()[0].engine.template_loaders[0]
+        self.assertIsInstance(loader, CachedLoader)
+        loader.reset()
+        self.client.get(reverse('home'))
+        self.assertIn('dealer/home.html', loader.get_template_cache)
+        with mock.patch.object(FilesystemLoader, 'get_contents') as read:
+            self.assertEqual(self.client.get(reverse('home')).status_code, 200)
+        read.assert_not_called()
+
+
+# ===================== JSON API =====================
+
+class ApiTests(DealerTestCase):
+    def api(self, method, resource, pk=None, data=None, **extra):
+        if pk is None:
+            url = reverse('api_collection', args=[resource])
+        else:
+            url = reverse('api_item', args=[resource, pk])
+        if data is not None:
+            extra.update(data=json.dumps(data), content_type='application/json')
+        return getattr(self.client, method)(url, **extra)
+
+    def test_create_edit_delete(self):
+        response = self.api('post', 'expenses', data={
+            'description': 'fuel', 'category': 'office', 'amount': '12.50', 'date': str(timezone.localdate()),
+        })
+        self.assertEqual(response.status_code, 201)
+        pk = response.json()['id']
+        self.assertEqual(Expense.objects.get(pk=pk).created_by, self.user)
+
+        response = self.api('patch', 'expenses', pk, data={'amount': '20'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Decimal(response.json()['amount']), Decimal('20'))
+        self.assertEqual(Expense.objects.get(pk=pk).description, 'fuel')
+
+        self.assertEqual(self.api('delete', 'expenses', pk).status_code, 204)
+        self.assertFalse(Expense.objects.filter(pk=pk).exists())
+
+    def test_errors(self):
+        self.assertEqual(self.api('get', 'nothing').status_code, 404)
+        self.assertEqual(self.api('get', 'expenses', 999999).status_code, 404)
+        self.assertEqual(self.api('patch', 'expenses', 999999, data={}).status_code, 404)
+        self.assertEqual(self.api('put', 'expenses').status_code, 405)
+        self.assertEqual(self.api('post', 'expenses', data=[]).status_code, 400)
+
+        response = self.api('post', 'expenses', data={'category': 'nope'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('amount', response.json()['details'])
+
+        self.client.logout()
+        response = self.api('get', 'expenses')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json(), {'error': 'Authentication required.'})
+
+    def test_closed_month_is_a_conflict(self):
+        self.seed(properties=2, investors=1, expenses=60)
+        through = datetime.date(timezone.localdate().year - 1, 12, 1)
+        self.assertTrue(close_books(through))
+        closed = Expense.objects.filter(date__lte=through).first()
+        response = self.api('delete', 'expenses', closed.pk)
+        self.assertEqual(response.status_code, 409)
+        self.assertIn('error', response.json())
+        self.assertTrue(Expense.objects.filter(pk=closed.pk).exists())
+
+    def test_field_selection(self):
+        self.seed(properties=5)
+        rows = self.api('get', 'properties', QUERY_STRING='fields=city').json()['results']
+        self.assertEqual({tuple(sorted(row)) for row in rows}, {('city', 'id')})   # ordering column added
+        pk = rows[0]['id']
+        self.assertEqual(sorted(self.api('get', 'properties', pk, QUERY_STRING='fields=city').json()), ['city', 'id'])
+        self.assertEqual(self.api('get', 'properties', QUERY_STRING='fields=city,secret').status_code, 400)
+        self.assertEqual(self.api('get', 'properties', QUERY_STRING='projection=nope').status_code, 400)
+
+    def test_gzip(self):
+        self.seed(properties=40)
+        response = self.api('get', 'properties', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(len(json.loads(gzip.decompress(response.content))['results']), 40)
+        self.assertFalse(self.api('get', 'properties').has_header('Content-Encoding'))
+
+    def test_middleware_stack_is_async_capable(self):
+        # a sync-only middleware would run the API views in a thread under ASGI
+        for path in settings.MIDDLEWARE:
+            self.assertTrue(getattr(import_string(path), 'async_capable', False), path)
+
+        self.async_client.force_login(self.user)
+        response = async_to_sync(self.async_client.get)(reverse('income_create'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], 'no-store, no-cache, must-revalidate, max-age=0')
+
+
+# ===================== SEARCH =====================
+
+@skipUnless(connection.vendor == 'sqlite', 'FTS5 is SQLite only')
+class SearchTests(DealerTestCase):
+    def prop(self, address, **fields):
+        fields = {'city': 'Kabul', 'property_type': 'House', **fields}
+        return PropertyItem.objects.create(address=address, **fields)
+
+    def search(self, q):
+        matches, ranked = search_properties(PropertyItem.objects.all(), q)
+        self.assertTrue(ranked)
+        return list(matches.order_by('search_rank', 'id').values_list('address', flat=True))
+
+    def indexed(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT count(*) FROM {FTS_TABLE}")
+            return cursor.fetchone()[0]
+
+    def test_triggers_keep_the_index_in_sync(self):
+        item = self.prop('Street 1', description='Near the Zarnegar park')
+        self.assertEqual(self.search('zarnegar'), ['Street 1'])
+
+        item.description = 'Near the Shahr-e Naw park'
+        item.save()
+        self.assertEqual(self.search('zarnegar'), [])
+        self.assertEqual(self.search('shahr naw'), ['Street 1'])
+
+        PropertyItem.objects.filter(pk=item.pk).update(owner_name='Haidari')
+        self.assertEqual(self.search('haidari'), ['Street 1'])
+
+        item.delete()
+        self.assertEqual(self.search('naw'), [])
+        self.assertEqual(self.indexed(), 0)
+
+    def test_every_word_matches_as_a_prefix(self):
+        self.prop('Karte-4 Street 2', area_name='Karte Se')
+        self.prop('Karte-4 Street 3', area_name='Taimani')
+        self.prop('Wazir Akbar Khan')
+        self.assertEqual(self.search('kart'), ['Karte-4 Street 2', 'Karte-4 Street 3'])
+        self.assertEqual(self.search('kart se'), ['Karte-4 Street 2'])
+        # not a prefix of any word
+        self.assertEqual(self.search('arte'), [])
+
+    def test_more_matching_fields_rank_first(self):
+        self.prop('Street 5', description='Garden flat')
+        self.prop('Garden Street 6', area_name='Garden City', description='Garden view')
+        self.assertEqual(self.search('garden'), ['Garden Street 6', 'Street 5'])
+
+    def test_rank_follows_the_table_alias(self):
+        self.prop('Street 7', description='Bagh-e Bala')
+        best = self.prop('Bala Street 8', description='Bala hills')
+        ranked, _ = search_properties(PropertyItem.objects.all(), 'bala')
+        # nested, the table is aliased and the outer row is another PropertyItem
+        rank = Subquery(ranked.filter(pk=OuterRef('pk')).values('search_rank')[:1])
+        rows = PropertyItem.objects.annotate(rank=rank).filter(rank__isnull=False).order_by('rank')
+        self.assertEqual([p.pk for p in rows][0], best.pk)
+        top = PropertyItem.objects.filter(pk__in=ranked.order_by('search_rank')[:1])
+        self.assertEqual(list(top), [best])
+
+
+# ===================== QUERY PLANS =====================
+
+# pages that read whole tables by design
+WHOLE_TABLE_PAGES = ('export', 'backup')
+# ranked by a per-row total, which has to be computed for every row
+RANKED_BY_TOTAL = ('investor_list?sort=', 'property_list?pnl=1&sort=')
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN is SQLite syntax')
+class QueryPlanTests(DealerTestCase):
+    def full_scans(self, sql):
+        """Plan lines reading a whole dealer table without an index."""
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            plan = [row[3] for row in cursor.fetchall()]
+        # a rowid-order walk that stops at the page size is not a full scan
+        if re.search(r'\bLIMIT\b', sql) and not any('TEMP B-TREE' in line for line in plan):
+            return []
+        return [line for line in plan if re.fullmatch(r'SCAN dealer_\w+', line)
+                and not line.endswith('_fts')]
+
+    def test_views_use_indexes(self):
+        self.seed(properties=300, investors=30, transactions=300, commissions=100, expenses=300, income=300)
+        for label, url in discover_cases():
+            if label.startswith(WHOLE_TABLE_PAGES) or label.startswith(RANKED_BY_TOTAL):
+                continue
+            cache.clear()
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(url)
+            self.assertLess(response.status_code, 400, label)
+            for query in ctx.captured_queries:
+                sql = query['sql']   # captured with the parameters inlined
+                if sql.startswith('SELECT') and 'dealer_' in sql:
+                    self.assertEqual(self.full_scans(sql), [], f'{label}: {sql}')
+
+
+# ===================== EXPORTS =====================
+
+class ExportTests(DealerTestCase):
+    def stream(self, url):
+        """(query count, traced peak bytes, line count) for one streamed export."""
+        response = self.client.get(url)
+        self.assertTrue(response.streaming)
+        lines = 0
+        tracemalloc.start()
+        try:
+            with CaptureQueriesContext(connection) as ctx:
+                for chunk in response.streaming_content:
+                    lines += chunk.count(b'\n')
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        queries = [q for q in ctx.captured_queries if not q['sql'].startswith(TRANSACTION_CONTROL)]
+        return len(queries), peak, lines
+
+    def test_property_export_memory_is_flat(self):
+        url = reverse('export_properties_csv')
+        # past a couple of chunks, so both runs hold the same buffers
+        self.seed(properties=2 * CHUNK_SIZE)
+        _, small, lines = self.stream(url)
+        self.assertEqual(lines, 2 * CHUNK_SIZE + 1)
+
+        self.seed(properties=6 * CHUNK_SIZE)
+        _, large, lines = self.stream(url)
+        self.assertEqual(lines, 8 * CHUNK_SIZE + 1)
+        # four times the rows, the same peak
+        self.assertLess(large, small * 1.25)
+
+    def test_backup_query_count_does_not_grow_with_rows(self):
+        sections = [title for title, _, _ in BACKUP_SECTIONS]
+        self.seed(properties=5, investors=3, transactions=10, commissions=5, expenses=10, income=10)
+        small, _, _ = self.stream(reverse('export_backup_csv'))
+        small_gz, _, _ = self.stream(reverse('export_backup_csv') + '?gzip=1')
+
+        self.seed(properties=300, investors=40, transactions=900, commissions=200, expenses=900, income=600)
+        large, _, _ = self.stream(reverse('export_backup_csv'))
+        large_gz, _, _ = self.stream(reverse('export_backup_csv') + '?gzip=1')
+
+        self.assertEqual(large, small)
+        self.assertEqual(large_gz, small_gz)
+        self.assertLessEqual(large, len(sections))
+
+
+@skipUnless(connection.vendor == 'postgresql', 'server-side cursors are PostgreSQL only')
+class ServerSideCursorTests(TransactionTestCase):
+    def test_exports_stream_from_one_snapshot(self):
+        seed({'properties': 5, 'investors': 3, 'transactions': 10, 'expenses': 5, 'income': 5})
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', None))
+        for url in (reverse('export_properties_csv'), reverse('export_backup_csv')):
+            with self.subTest(url=url), CaptureQueriesContext(connection) as ctx:
+                b''.join(self.client.get(url).streaming_content)
+            sql = [q['sql'] for q in ctx.captured_queries]
+            self.assertIn('SET TRANSACTION ISOLATION LEVEL REPEATABLE READ', sql)
+            declared = [q for q in sql if q.startswith('DECLARE')]
+            self.assertTrue(declared, url)
+            # WITH HOLD would make the server materialize the whole result first
+            self.assertFalse([q for q in declared if 'WITH HOLD' in q], url)
+
+
+# ===================== QUERY BUDGETS =====================
+
+class QueryBudgetTests(DealerTestCase):
+    def test_list_pages_stay_within_budget_as_rows_grow(self):
+        # a per-row query can hide under the budget at 3 rows, not at 60
+        for counts in ({'properties': 3, 'investors': 3, 'transactions': 3},
+                       {'properties': 60, 'investors': 60, 'transactions': 200}):
+            self.seed(**counts)
+            for name in ('home', 'investor_list', 'property_list'):
+                with self.subTest(name=name, **counts):
+                    self.assertEqual(self.client.get(reverse(name)).status_code, 200)
+
+    def test_over_budget_page_raises(self):
+        self.seed(properties=5, investors=5, transactions=10)
+        with override_settings(QUERY_BUDGETS={'investor_list': 1}):
+            with self.assertRaisesMessage(QueryBudgetExceeded, 'investor_list ran'):
+                self.client.get(reverse('investor_list'))
+
+    def test_over_budget_stream_raises_once_consumed(self):
+        self.seed(properties=5)
+        with override_settings(QUERY_BUDGETS={'export_properties_csv': 0}):
+            response = self.client.get(reverse('export_properties_csv'))
+            with self.assertRaises(QueryBudgetExceeded):
+                b''.join(response.streaming_content)
+
+    @override_settings(QUERY_BUDGETS_STRICT=False)
+    def test_over_budget_only_logs_when_not_strict(self):
+        with override_settings(QUERY_BUDGETS={'investor_list': 0}):
+            with self.assertLogs('dealer.profiling', 'WARNING'):
+                self.assertEqual(self.client.get(reverse('investor_list')).status_code, 200)
+
+    def test_async_views_count_their_queries(self):
+        self.seed(properties=5)
+        self.async_client.force_login(self.user)
+        url = reverse('api_collection', args=['properties']) + '?count=1'
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(async_to_sync(self.async_client.get)(url).status_code, 200)
+        queries = [q for q in ctx.captured_queries if not q['sql'].startswith(TRANSACTION_CONTROL)]
+        self.assertEqual(recent_requests()[0]['queries'], len(queries))
+        with override_settings(QUERY_BUDGETS={'api_collection': 1}):
+            with self.assertRaisesMessage(QueryBudgetExceeded, 'api_collection ran'):
+                async_to_sync(self.async_client.get)(url)
+
+    def test_queries_in_worker_threads_count_for_the_request(self):
+        # the async ORM's threads have their own connections; the
+        # request follows them in the copied context
+        profile = RequestProfile(RequestFactory().get('/'))
+        token = _current.set(profile)
+        context = contextvars.copy_context()
+        _current.reset(token)
+
+        def query():
+            try:
+                with connections['default'].cursor() as cursor:
+                    cursor.execute('SELECT 1')
+            finally:
+                connections.close_all()
+
+        worker = threading.Thread(target=context.run, args=(query,))
+        worker.start()
+        worker.join()
+        self.assertEqual(profile.queries, 1)
+
+
+class BenchmarkCompareTests(DealerTestCase):
+    def result(self, samples, cold_ms, queries=3):
+        return {'results': {'home': {
+            'queries': queries, 'samples': samples,
+            'cold_ms': cold_ms, 'warm_ms': 1.0, 'template_ms': None,
+        }}}
+
+    def test_run_takes_repeat_samples(self):
+        self.seed(properties=5, investors=3)
+        result = run(self.user, repeat=3, cases=[('home', reverse('home'))])
+        self.assertEqual(result['results']['home']['samples'], 3)
+        self.assertEqual(result['meta']['repeat'], 3)
+
+    def test_single_samples_only_compare_queries(self):
+        # one request each way is noise, not a 10x slowdown
+        self.assertEqual(compare(self.result(1, 100.0, queries=4), self.result(1, 10.0)),
+                         [('home', 'queries', 3, 4)])
+        self.assertEqual(compare(self.result(MIN_SAMPLES, 100.0), self.result(MIN_SAMPLES, 10.0)),
+                         [('home', 'cold_ms', 10.0, 100.0)])
+
+
+class SeedTests(DealerTestCase):
+    def test_rows_keep_their_generated_values(self):
+        field = Commission._meta.get_field('created_at')
+        self.seed(properties=20, investors=5, transactions=20, commissions=30, expenses=20)
+        self.assertTrue(field.auto_now_add)   # left alone for other threads' saves
+        a_day_ago = timezone.now() - datetime.timedelta(days=1)
+        for model, stamp in ((PropertyItem, 'created_at'), (Commission, 'created_at'),
+                             (Transaction, 'transaction_date')):
+            with self.subTest(model=model.__name__):
+                self.assertTrue(model.objects.filter(**{f'{stamp}__lt': a_day_ago}).exists())
+        self.assertFalse(Commission.objects.exclude(total_earned=commission_total()).exists())
+        self.assertEqual(verify_totals(), [])
+
+
+# ===================== PERIOD REPORTS =====================
+
+class PeriodSummaryTests(DealerTestCase):
+    def setUp(self):
+        super().setUp()
+        # last month: over, so reports summarise and store it
+        self.month = month_start(month_start(timezone.localdate()) - datetime.timedelta(days=1))
+        Expense.objects.create(description='rent', category='other', amount=Decimal('100'), date=self.month)
+
+    def test_summary_is_stored(self):
+        self.assertEqual(summarise_months('expense', [self.month])[self.month]['other'], Decimal('100'))
+        self.assertTrue(PeriodSummary.objects.filter(ledger='expense', period=self.month).exists())
+
+    def test_summary_is_not_stored_over_a_concurrent_write(self):
+        def write_meanwhile(*args):
+            result = real_month_totals(*args)
+            # another request adds a row to the month and commits
+            with self.captureOnCommitCallbacks(execute=True):
+                Expense.objects.create(description='late', category='other', amount=Decimal('5'), date=self.month)
+            return result
+
+        real_month_totals = reports.month_totals
+        with mock.patch('dealer.reports.month_totals', side_effect=write_meanwhile):
+            summarise_months('expense', [self.month])
+
+        self.assertFalse(PeriodSummary.objects.filter(ledger='expense', period=self.month).exists())
+        [(_, totals)] = period_rollup('expense', self.month, self.month)
+        self.assertEqual(totals['other'], Decimal('105'))
+
+
+
+class CloseBooksTests(DealerTestCase):
+    def test_concurrent_close_reports_already_closed(self):
+        self.seed(properties=2, investors=1, expenses=60, income=30)
+        through = datetime.date(timezone.localdate().year - 1, 6, 1)
+        months = close_books(through)
+        self.assertTrue(months)
+
+        # the second run read closed_through() before the first committed
+        reads = [None, reports.closed_through()]
+        with mock.patch('dealer.reports.closed_through', side_effect=reads):
+            self.assertEqual(close_books(through), [])
+        self.assertEqual(closed_through(), through)
+        self.assertEqual(PeriodBalance.objects.filter(key='').count(), 2 * len(months))
+
+
+class ClosedMonthTests(DealerTestCase):
+    """Rows dated in a closed month cannot be added, edited or deleted."""
+
+    LEDGERS = [
+        (Expense, ExpenseForm, {'category': 'other'}),
+        (Income, IncomeForm, {'source': 'sale'}),
+    ]
+
+    def setUp(self):
+        super().setUp()
+        year = timezone.localdate().year - 1
+        self.closed = datetime.date(year, 6, 15)
+        self.open = timezone.localdate()
+        self.closed_rows = {model: self.create(model, self.closed, **fields) for model, _, fields in self.LEDGERS}
+        self.assertTrue(close_books(datetime.date(year, 12, 1)))
+
+    def create(self, model, date, **fields):
+        return model.objects.create(description='row', amount=Decimal('5'), date=date, **fields)
+
+    def data(self, date, **fields):
+        return {'description': 'row', 'amount': '5', 'date': date.isoformat(), **fields}
+
+    def test_forms_reject_closed_months(self):
+        for model, form_class, fields in self.LEDGERS:
+            with self.subTest(model=model.__name__):
+                self.assertTrue(form_class(data=self.data(self.open, **fields)).is_valid())
+                open_row = self.create(model, self.open, **fields)
+                for form in (
+                    form_class(data=self.data(self.closed, **fields)),                                   # add
+                    form_class(data=self.data(self.open, **fields), instance=self.closed_rows[model]),   # edit
+                    form_class(data=self.data(self.closed, **fields), instance=open_row),                # move in
+                ):
+                    self.assertFalse(form.is_valid())
+                    self.assertIn('closed', form.errors['date'][0])
+
+    def test_signals_reject_closed_months(self):
+        for model, _, fields in self.LEDGERS:
+            with self.subTest(model=model.__name__):
+                with self.assertRaises(PeriodClosedError):
+                    self.create(model, self.closed, **fields)
+                closed_row = self.closed_rows[model]
+                closed_row.amount = Decimal('6')
+                with self.assertRaises(PeriodClosedError):
+                    closed_row.save()
+                with self.assertRaises(PeriodClosedError):
+                    closed_row.delete()
+                open_row = self.create(model, self.open, **fields)
+                open_row.date = self.closed
+                with self.assertRaises(PeriodClosedError):
+                    open_row.save()
+
+                # nothing was written, and the transaction is still usable
+                self.assertEqual(list(model.objects.filter(date__lte=self.closed).values_list('amount', flat=True)),
+                                 [Decimal('5')])
+        self.assertEqual(verify_totals(), [])
+
+    def test_delete_view_keeps_a_closed_row(self):
+        expense = self.closed_rows[Expense]
+        response = self.client.post(reverse('expense_delete', args=[expense.pk]), follow=True)
+        self.assertContains(response, 'closed')
+        self.assertTrue(Expense.objects.filter(pk=expense.pk).exists())
+
+
+@skipUnless(connection.vendor == 'postgresql', 'SQLite writers already hold the database lock')
+class PeriodSummaryLockTests(TransactionTestCase):
+    """A summary racing a write to its month must not outlive the write."""
+
+    def setUp(self):
+        self.month = month_start(month_start(timezone.localdate()) - datetime.timedelta(days=1))
+        Expense.objects.create(description='rent', category='other', amount=Decimal('100'), date=self.month)
+
+    def in_thread(self, target):
+        def run():
+            try:
+                target()
+            finally:
+                connections.close_all()
+        thread = threading.Thread(target=run)
+        thread.start()
+        return thread
+
+    def add_expense(self):
+        Expense.objects.create(description='late', category='other', amount=Decimal('5'), date=self.month)
+
+    def test_summary_waits_for_an_uncommitted_write(self):
+        saved, release, result = threading.Event(), threading.Event(), {}
+
+        def write():
+            with transaction.atomic():
+                self.add_expense()
+                saved.set()
+                release.wait(5)
+
+        writer = self.in_thread(write)
+        self.assertTrue(saved.wait(5))
+        reader = self.in_thread(lambda: result.update(summarise_months('expense', [self.month])))
+        reader.join(0.5)
+        self.assertTrue(reader.is_alive())
+        release.set()
+        writer.join()
+        reader.join()
+        self.assertEqual(result[self.month], {'other': Decimal('105')})
+
+    def test_write_drops_a_summary_stored_meanwhile(self):
+        with transaction.atomic():
+            summarise_months('expense', [self.month])
+            writer = self.in_thread(self.add_expense)
+            writer.join(0.5)
+            self.assertTrue(writer.is_alive())
+        writer.join()
+        self.assertFalse(PeriodSummary.objects.filter(ledger='expense', period=self.month).exists())
+
+
+# ===================== IMPORTS =====================
+
+class ImportTests(DealerTestCase):
+    def test_non_utf8_file_is_a_form_error(self):
+        upload = SimpleUploadedFile('people.csv', 'full_name\nJos\xe9\n'.encode('latin-1'), 'text/csv')
+        response = self.client.post(reverse('import_data'), {'kind': 'investors', 'file': upload})
+        self.assertEqual(response.status_code, 200)
+        self.assertFormError(response.context['form'], 'file', 'File must be UTF-8 encoded')
+        self.assertFalse(Investor.objects.exists())
+
+        with self.assertRaisesMessage(ValidationError, 'File must be UTF-8 encoded'):
+            import_file('investors', io.BytesIO(b'full_name\n\xff\xfe\n'), 'people.csv')
+
+    def test_utf8_with_bom_imports(self):
+        data = '\ufefffull_name,phone\nJosé,0701234567\n'.encode('utf-8')
+        result = import_file('investors', io.BytesIO(data), 'people.csv')
+        self.assertEqual((result.created, result.errors), (1, []))
+        self.assertEqual(Investor.objects.get().full_name, 'José')
+
+    def people(self, *names):
+        return io.BytesIO(('full_name,invested_amount\n' + ''.join(f'{n}\n' for n in names)).encode())
+
+    def test_rows_are_inserted_in_batches_as_read(self):
+        result = import_file('investors', self.people('A', 'B,5', 'C', 'D', 'E'), 'people.csv', batch_size=2)
+        self.assertEqual((result.rows, result.created, result.errors), (5, 5, []))
+        self.assertEqual(Investor.objects.get(full_name='B').invested_amount, Decimal('5'))
+        # raw inserts still stamp auto_now_add
+        self.assertFalse(Investor.objects.filter(created_at=None).exists())
+
+    def test_late_error_rolls_back_written_batches(self):
+        people = self.people('A', 'B', 'C', 'D,lots', 'E')
+        result = import_file('investors', people, 'people.csv', batch_size=2)
+        self.assertEqual((result.rows, result.created, result.error_total), (5, 0, 1))
+        self.assertEqual(result.errors[0][0], 5)
+        self.assertFalse(Investor.objects.exists())
+
+        people.seek(0)
+        result = import_file('investors', people, 'people.csv', batch_size=2, skip_invalid=True)
+        self.assertEqual((result.created, result.error_total), (4, 1))
+        self.assertEqual(Investor.objects.count(), 4)
+
+    @override_settings(IMPORT_MAX_ROWS=3)
+    def test_large_files_are_left_to_the_command(self):
+        upload = SimpleUploadedFile('people.csv', self.people('A', 'B', 'C', 'D').getvalue(), 'text/csv')
+        response = self.client.post(reverse('import_data'), {'kind': 'investors', 'file': upload})
+        self.assertFormError(
+            response.context['form'], 'file',
+            "The file has more than 3 rows, too many to import here; "
+            "run `manage.py khplwak_import` on the server instead.",
+        )
+        self.assertFalse(Investor.objects.exists())
+
+        upload = SimpleUploadedFile('people.csv', self.people('A', 'B', 'C').getvalue(), 'text/csv')
+        self.client.post(reverse('import_data'), {'kind': 'investors', 'file': upload})
+        self.assertEqual(Investor.objects.count(), 3)
+
+    def test_xlsx_imports(self):
+        from openpyxl import Workbook
+        book = Workbook()
+        book.active.append(['Full Name', 'Invested Amount'])
+        book.active.append(['Zahir', 1500])
+        book.active.append(['Nadia', None])
+        data = io.BytesIO()
+        book.save(data)
+        data.seek(0)
+        result = import_file('investors', data, 'people.xlsx')
+        self.assertEqual((result.created, result.errors), (2, []))
+        self.assertEqual(Investor.objects.get(full_name='Zahir').invested_amount, Decimal('1500'))
+
+
+# ===================== BACKUP ARCHIVE =====================
+
+class BackupArchiveTests(DealerTestCase):
+    def archive(self):
+        buf = io.BytesIO()
+        write_backup(buf)
+        buf.seek(0)
+        return buf
+
+    def snapshot(self):
+        return {
+            'counts': [m.objects.count() for m in BACKUP_MODELS],
+            'amounts': Transaction.objects.aggregate(s=Sum('amount'))['s'],
+            'by_address': sorted(Transaction.objects.values_list('property_item__address', 'amount')),
+            'totals': stored_totals(),
+            'values': sorted(Commission.objects.values_list('created_at', 'deal_amount', 'total_earned'))
+            + sorted(Expense.objects.values_list('date', 'amount')),
+        }
+
+    def schema(self):
+        with connection.cursor() as cursor:
+            return connection.introspection.get_constraints(cursor, Transaction._meta.db_table).keys()
+
+    def test_flush_restore_round_trips(self):
+        self.seed(properties=30, investors=10, transactions=120, commissions=20, expenses=60, income=40)
+        before, indexes = self.snapshot(), set(self.schema())
+        archive = self.archive()
+
+        restore_backup(archive, batch_size=25, flush=True)
+        self.assertEqual(self.snapshot(), before)
+        self.assertEqual(set(self.schema()), indexes)
+        address = PropertyItem.objects.first().address
+        matches, _ = search_properties(PropertyItem.objects.all(), address)
+        self.assertTrue(matches.exists())
+
+    def test_merge_restore_remaps_ids(self):
+        self.seed(properties=10, investors=5, transactions=40)
+        archive = self.archive()
+        top = Transaction.objects.latest('pk').pk
+        top_property = PropertyItem.objects.latest('pk').pk
+
+        counts = restore_backup(archive)
+        self.assertEqual(counts['dealer.Transaction'], 40)
+        self.assertEqual(Transaction.objects.count(), 80)
+        restored = Transaction.objects.filter(pk__gt=top)
+        self.assertEqual(restored.count(), 40)
+        # every restored row points at a restored parent
+        self.assertFalse(restored.filter(property_item__pk__lte=top_property).exists())
+        last = restored.latest('pk').pk
+        t = Transaction.objects.create(
+            property_item=PropertyItem.objects.first(), investor=Investor.objects.first(),
+            transaction_type='buy', amount=Decimal('1'),
+        )
+        self.assertGreater(t.pk, last)
+
+    def close_last_year(self):
+        through = datetime.date(timezone.localdate().year - 1, 12, 1)
+        self.assertTrue(close_books(through))
+        return through
+
+    def test_flush_restore_keeps_closed_books(self):
+        self.seed(properties=5, investors=3, expenses=80, income=40)
+        through = self.close_last_year()
+        balances = sorted(PeriodBalance.objects.values_list('ledger', 'period', 'key', 'total'))
+        archive = self.archive()
+
+        restore_backup(archive, flush=True)
+        self.assertEqual(closed_through(), through)
+        self.assertEqual(sorted(PeriodBalance.objects.values_list('ledger', 'period', 'key', 'total')), balances)
+
+    def test_merge_restore_rejects_closed_months(self):
+        self.seed(properties=5, investors=3, expenses=80, income=40)
+        archive = self.archive()
+        self.close_last_year()
+        before = self.snapshot()
+
+        with self.assertRaisesMessage(BackupError, 'closed month'):
+            restore_backup(archive)
+        self.assertEqual(self.snapshot(), before)
+
+
+@skipUnless(connection.vendor == 'sqlite', 'SQLite transaction modes')
+class BackupLockTests(TransactionTestCase):
+    def test_backup_reads_without_the_write_lock(self):
+        # IMMEDIATE would make every save during a backup wait and fail
+        seed({'properties': 5, 'investors': 3, 'transactions': 10})
+        mode = connection.transaction_mode
+        with CaptureQueriesContext(connection) as ctx:
+            write_backup(io.BytesIO())
+        begins = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('BEGIN')]
+        self.assertEqual(begins, ['BEGIN'])
+        self.assertEqual(connection.transaction_mode, mode)
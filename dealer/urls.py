@@ -1,15 +1,22 @@
 from django.urls import path
 from django.contrib.auth import views as auth_views
-from . import views
+from . import api, views
 
 
 urlpatterns = [
     # ================= DASHBOARD / HOME =================
     path('', views.home, name='home'),
     path('dashboard/', views.home, name='dashboard'),
+    path('autocomplete/<str:resource>/', views.autocomplete, name='autocomplete'),
+
+    # ================= JSON API =================
+    path('api/summary/', api.api_summary, name='api_summary'),
+    path('api/<str:resource>/', api.api_collection, name='api_collection'),
+    path('api/<str:resource>/<int:pk>/', api.api_item, name='api_item'),
 
     # ================= INVESTORS =================
     path('investors/', views.investor_list, name='investor_list'),
+    path('investors/summary.json', views.investor_summary_json, name='investor_summary_json'),
     path('investors/new/', views.investor_create, name='investor_create'),
     path('investors/<int:id>/', views.investor_detail, name='investor_detail'),
     path('investors/<int:id>/edit/', views.investor_edit, name='investor_edit'),
@@ -47,10 +54,14 @@ urlpatterns = [
 
     # ================= REPORTS =================
     path('reports/finance/', views.finance_report, name='finance_report'),
+    path('reports/finance/series.json', views.finance_series_json, name='finance_series_json'),
+    path('reports/finance/close/', views.finance_close, name='finance_close'),
 
     # ================= BACKUP & TOOLS =================
     path('backup/dashboard/', views.backup_dashboard, name='backup_dashboard'),
     path('backup/export_csv/', views.export_backup_csv, name='export_backup_csv'),
+    path('backup/import/', views.import_data, name='import_data'),
+    path('backup/stats/', views.profiling_stats, name='profiling_stats'),
 
     # ================= AUTH =================
     path(
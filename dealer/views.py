@@ -1,75 +1,168 @@
+import datetime
+
 from django.shortcuts import render, get_object_or_404, redirect
 from django.db.models import Sum, Q
+from django.db.models.functions import Substr
 from django.contrib.auth.decorators import login_required
-from django.http import HttpResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from django import forms
-import csv
+from django.core.exceptions import ValidationError
 from django.contrib.auth import logout
 from django.contrib.auth import authenticate, login
 from django.contrib import messages
-from .models import Investor, PropertyItem, Transaction, Commission, Expense, Income
+from django.conf import settings
+from .models import (
+    Investor, PropertyItem, Transaction, Commission, Expense, Income, PeriodBalance,
+    without_property_text,
+)
+from .metrics import dashboard_metrics, with_investor_totals, with_property_pnl
+from .ledger import ledger_summary, ledger_totals
+from .pagination import paginate_request
+from .search import prefix_search, search_properties
+from .exports import property_csv_lines, backup_csv_lines, buffered, gzip_stream
+from .importers import import_file
+from .profiling import recent_requests, reset_stats, view_stats
+from .caching import cached, query_parts, revalidate
+from .reports import (
+    GROUPINGS,
+    PeriodClosedError,
+    close_books,
+    closed_through,
+    earliest_ledger_date,
+    finance_series,
+    month_start,
+)
 from django.views.decorators.cache import never_cache
+from django.utils import timezone
 from .forms import (
     InvestorForm,
     PropertyItemForm,
     TransactionForm,
     CommissionForm,
     ExpenseForm,
-    IncomeForm
+    IncomeForm,
+    ImportForm,
 )
 
+# models the cached dashboard / finance report are built from
+DASHBOARD_MODELS = [Investor, PropertyItem, Transaction, Commission]
+FINANCE_MODELS = [Income, Expense, PeriodBalance]
+
+
 # ===================== DASHBOARD =====================
 
 @login_required
-@never_cache
+@revalidate('dashboard', DASHBOARD_MODELS)
 def home(request):
-    investor_count    = Investor.objects.count()
-    property_count    = PropertyItem.objects.count()
-    transaction_count = Transaction.objects.count()
+    context = cached('dashboard', DASHBOARD_MODELS, dashboard_metrics)
+    return render(request, 'dealer/home.html', context)
 
-    # property status counts
-    available_count = PropertyItem.objects.filter(status='available').count()
-    rented_count    = PropertyItem.objects.filter(status='rented').count()
-    sold_count      = PropertyItem.objects.filter(status='sold').count()
-    mortgaged_count = PropertyItem.objects.filter(status='mortgaged').count()
 
-    # totals across ALL activity
-    total_invested = Transaction.objects.filter(
-        transaction_type__iexact='buy'
-    ).aggregate(total=Sum('amount'))['total'] or 0
+# ===================== AUTOCOMPLETE =====================
+# Options for the AutocompleteSelect widgets: a prefix match on the
+# label column (index-backed), two columns per row, a page at a time.
 
-    total_returned = Transaction.objects.filter(
-        transaction_type__iexact='sell'
-    ).aggregate(total=Sum('amount'))['total'] or 0
+AUTOCOMPLETE_SOURCES = {
+    'properties': (PropertyItem, 'address'),
+    'investors': (Investor, 'full_name'),
+}
+AUTOCOMPLETE_LIMIT = 20
 
-    total_commissions = Commission.objects.aggregate(
-        total=Sum('total_earned')
-    )['total'] or 0
 
-    context = {
-        "investor_count": investor_count,
-        "property_count": property_count,
-        "transaction_count": transaction_count,
-
-        "available_count": available_count,
-        "rented_count": rented_count,
-        "sold_count": sold_count,
-        "mortgaged_count": mortgaged_count,
-
-        "total_invested": total_invested,
-        "total_returned": total_returned,
-        "total_commissions": total_commissions,
-    }
-    return render(request, 'dealer/home.html', context)
+@login_required
+@revalidate('autocomplete', [PropertyItem, Investor])
+def autocomplete(request, resource):
+    try:
+        model, field = AUTOCOMPLETE_SOURCES[resource]
+    except KeyError:
+        return JsonResponse({'error': f"Unknown resource '{resource}'."}, status=404)
+
+    rows = list(
+        prefix_search(model.objects.all(), field, request.GET.get('q', ''))
+        .values_list('id', field)[:AUTOCOMPLETE_LIMIT + 1]
+    )
+    return JsonResponse({
+        'results': [{'id': pk, 'text': text} for pk, text in rows[:AUTOCOMPLETE_LIMIT]],
+        'more': len(rows) > AUTOCOMPLETE_LIMIT,
+    })
 
 
 # ===================== INVESTORS =====================
 
 @login_required
-@never_cache
+@revalidate('investor_list', [Investor, Transaction])
 def investor_list(request):
-    investors = Investor.objects.all()
-    return render(request, 'dealer/investor_list.html', {'investors': investors})
+    def build():
+        investors, page, sort, result = _investor_summary(request)
+        return page, investors.count(), sort, result
+
+    page, total_count, sort, result = cached(
+        'investor_list', [Investor, Transaction], build, query_parts(request),
+    )
+
+    context = {
+        'investors': page,
+        'page': page,
+        'total_count': total_count,
+        'selected_sort': sort,
+        'selected_result': result,
+    }
+    return render(request, 'dealer/investor_list.html', context)
+
+
+# ?sort= -> keyset ordering (always ends in the pk); money sorts use the
+# exact *_cents annotations, see metrics.cents()
+INVESTOR_SORTS = {
+    'name': ['full_name', 'id'],
+    'net': ['-net_cents', 'id'],
+    '-net': ['net_cents', 'id'],
+    'invested': ['-invested_cents', 'id'],
+}
+
+
+def _investor_summary(request):
+    """
+    Investors with their invested / returned / net totals (one grouped
+    query), filtered by ?result=profit|loss and sorted by ?sort=.
+    """
+    sort = request.GET.get('sort', '').strip()
+    result = request.GET.get('result', '').strip()
+
+    investors = with_investor_totals(Investor.objects.all())
+    if result == 'profit':
+        investors = investors.filter(net_cents__gt=0)
+    elif result == 'loss':
+        investors = investors.filter(net_cents__lt=0)
+
+    ordering = INVESTOR_SORTS.get(sort, ['id'])
+    page = paginate_request(request, investors, ordering)
+    return investors, page, sort, result
+
+
+@login_required
+@revalidate('investor_summary_json', [Investor, Transaction])
+def investor_summary_json(request):
+    """Same data as investor_list, as JSON (cursor-paginated)."""
+    investors, page, sort, result = _investor_summary(request)
+
+    data = {
+        'count': investors.count(),
+        'next': page.next_cursor or None,
+        'previous': page.previous_cursor or None,
+        'results': [
+            {
+                'id': inv.id,
+                'full_name': inv.full_name,
+                'surname': inv.surname,
+                'phone': inv.phone,
+                'total_invested': str(inv.total_invested),
+                'total_returned': str(inv.total_returned),
+                'net_result': str(inv.net_result),
+            }
+            for inv in page
+        ],
+    }
+    return JsonResponse(data)
 
 
 @login_required
@@ -115,13 +208,12 @@ def investor_detail(request, id):
     investor = get_object_or_404(Investor, id=id)
     transactions = Transaction.objects.filter(investor=investor).select_related('property_item')
 
-    total_invested = transactions.filter(
-        transaction_type__iexact='buy'
-    ).aggregate(total=Sum('amount'))['total'] or 0
-
-    total_returned = transactions.filter(
-        transaction_type__iexact='sell'
-    ).aggregate(total=Sum('amount'))['total'] or 0
+    totals = transactions.aggregate(
+        invested=Sum('amount', filter=Q(transaction_type='buy')),
+        returned=Sum('amount', filter=Q(transaction_type='sell')),
+    )
+    total_invested = totals['invested'] or 0
+    total_returned = totals['returned'] or 0
 
     net_result = total_returned - total_invested  # profit/loss for THIS investor
 
@@ -138,33 +230,69 @@ def investor_detail(request, id):
 
 # ===================== PROPERTIES =====================
 
+# ?sort= -> keyset ordering over the exact with_property_pnl() annotations
+PROPERTY_PNL_SORTS = {
+    'profit': ['-profit_cents', 'id'],
+    '-profit': ['profit_cents', 'id'],
+    'net': ['-net_cents', 'id'],
+    'invested': ['-invested_cents', 'id'],
+}
+
+
 @login_required
-@never_cache
+@revalidate('property_list', [PropertyItem, Transaction, Commission, Income, Expense])
 def property_list(request):
     q = request.GET.get('q', '').strip()
     listing_type = request.GET.get('listing_type', '').strip()
     status = request.GET.get('status', '').strip()
+    sort = request.GET.get('sort', '').strip()
+    if sort not in PROPERTY_PNL_SORTS:
+        sort = ''
+    # P&L columns on request, or whenever sorting by them
+    show_pnl = request.GET.get('pnl') == '1' or bool(sort)
+
+    def build():
+        # only the table's columns; mortgage terms as a short preview
+        properties = PropertyItem.objects.projection('list').annotate(
+            mortgage_terms_preview=Substr('mortgage_terms', 1, 41),
+        )
+        properties, ranked = search_properties(properties, q)
 
-    properties = PropertyItem.objects.all()
+        if listing_type:
+            properties = properties.filter(listing_type=listing_type)
 
-    if q:
-        properties = properties.filter(
-            Q(address__icontains=q) |
-            Q(city__icontains=q) |
-            Q(area_name__icontains=q)
-        )
+        if status:
+            properties = properties.filter(status=status)
 
-    if listing_type:
-        properties = properties.filter(listing_type=listing_type)
+        total_count = properties.count()
 
-    if status:
-        properties = properties.filter(status=status)
+        if show_pnl:
+            properties = with_property_pnl(properties)
+
+        if sort:
+            ordering = PROPERTY_PNL_SORTS[sort]
+        elif ranked:
+            # best matches first when searching
+            ordering = ['search_rank', 'id']
+        else:
+            ordering = ['id']
+        return paginate_request(request, properties, ordering), total_count
+
+    # the P&L columns also depend on the ledgers
+    models = [PropertyItem]
+    if show_pnl:
+        models += [Transaction, Commission, Income, Expense]
+    page, total_count = cached('property_list', models, build, query_parts(request))
 
     context = {
-        'properties': properties,
+        'properties': page,
+        'page': page,
+        'total_count': total_count,
         'q': q,
         'selected_listing_type': listing_type,
         'selected_status': status,
+        'selected_sort': sort,
+        'show_pnl': show_pnl,
     }
     return render(request, 'dealer/property_list.html', context)
 
@@ -213,76 +341,19 @@ def export_properties_csv(request):
     listing_type = request.GET.get('listing_type', '').strip()
     status = request.GET.get('status', '').strip()
 
-    properties = PropertyItem.objects.all()
+    properties, ranked = search_properties(PropertyItem.objects.all(), q)
 
-    if q:
-        properties = properties.filter(
-            Q(address__icontains=q) |
-            Q(city__icontains=q) |
-            Q(area_name__icontains=q)
-        )
     if listing_type:
         properties = properties.filter(listing_type=listing_type)
     if status:
         properties = properties.filter(status=status)
+    if ranked:
+        properties = properties.order_by('search_rank', 'id')
+    else:
+        properties = properties.order_by('id')
 
-    response = HttpResponse(content_type='text/csv')
+    response = StreamingHttpResponse(buffered(property_csv_lines(properties)), content_type='text/csv')
     response['Content-Disposition'] = 'attachment; filename="properties_export.csv"'
-    writer = csv.writer(response)
-
-    writer.writerow([
-        'ID',
-        'Address',
-        'City',
-        'Area',
-        'Property Type',
-        'Listing Type',
-        'Status',
-        'Size (Biswa)',
-        'Bedrooms',
-        'Bathrooms',
-        'Kitchens',
-        'Floor No',
-        'Total Floors',
-        'Parking Spaces',
-        'Floor Area (sqft)',
-        'Sale Price',
-        'Rent Monthly',
-        'Rent Deposit',
-        'Mortgage Amount',
-        'Mortgage Terms',
-        'Owner Name',
-        'Owner Contact',
-        'Description',
-    ])
-
-    for p in properties:
-        writer.writerow([
-            p.id,
-            p.address,
-            p.city or '',
-            p.area_name or '',
-            p.property_type,
-            p.get_listing_type_display(),
-            p.status,
-            p.size or '',
-            p.bedrooms or '',
-            p.bathrooms or '',
-            p.kitchens or '',
-            p.floor_no or '',
-            p.total_floors or '',
-            p.parking_spaces or '',
-            p.floor_area_sqft or '',
-            p.sale_price or '',
-            p.rent_monthly or '',
-            p.rent_deposit or '',
-            p.mortgage_amount or '',
-            (p.mortgage_terms or '').replace('\n', ' '),
-            p.owner_name or '',
-            p.owner_contact or '',
-            (p.description or '').replace('\n', ' '),
-        ])
-
     return response
 
 
@@ -291,7 +362,8 @@ def export_properties_csv(request):
 @login_required
 @never_cache
 def property_detail(request, id):
-    prop = get_object_or_404(PropertyItem, id=id)
+    # the property and its totals in one query
+    prop = get_object_or_404(with_property_pnl(PropertyItem.objects.all()), id=id)
 
     transactions = (
         Transaction.objects
@@ -306,26 +378,12 @@ def property_detail(request, id):
         .order_by('-created_at')
     )
 
-    total_invested = transactions.filter(
-        transaction_type__iexact='buy'
-    ).aggregate(total=Sum('amount'))['total'] or 0
-
-    total_returned = transactions.filter(
-        transaction_type__iexact='sell'
-    ).aggregate(total=Sum('amount'))['total'] or 0
-
-    net_result = total_returned - total_invested
-
-    total_commission_earned = commissions.aggregate(
-        total=Sum('total_earned')
-    )['total'] or 0
-
     context = {
         "prop": prop,
-        "total_invested": total_invested,
-        "total_returned": total_returned,
-        "net_result": net_result,
-        "total_commission_earned": total_commission_earned,
+        "total_invested": prop.total_invested,
+        "total_returned": prop.total_returned,
+        "net_result": prop.net_result,
+        "total_commission_earned": prop.commission_earned,
         "transactions": transactions,
         "commissions": commissions,
     }
@@ -336,16 +394,21 @@ def property_detail(request, id):
 # ===================== COMMISSIONS =====================
 
 @login_required
-@never_cache
+@revalidate('commission_list', [Commission, PropertyItem])
 def commission_list(request):
-    commissions = Commission.objects.select_related('property_item').order_by('-created_at')
+    def build():
+        commissions = without_property_text(Commission.objects.select_related('property_item'))
+        page = paginate_request(request, commissions, ['-created_at', '-id'])
+        return page, ledger_summary('commission')
 
-    total_commission = commissions.aggregate(
-        total=Sum('total_earned')
-    )['total'] or 0
+    page, (total_count, total_commission) = cached(
+        'commission_list', [Commission, PropertyItem], build, query_parts(request),
+    )
 
     context = {
-        'commissions': commissions,
+        'commissions': page,
+        'page': page,
+        'total_count': total_count,
         'total_commission': total_commission,
     }
     return render(request, 'dealer/commission_list.html', context)
@@ -441,14 +504,24 @@ def commission_delete(request, id):
 # ===================== TRANSACTIONS =====================
 
 @login_required
-@never_cache
+@revalidate('transaction_list', [Transaction, PropertyItem, Investor])
 def transaction_list(request):
-    transactions = (
-        Transaction.objects
-        .select_related('property_item', 'investor')
-        .order_by('-transaction_date')
+    def build():
+        transactions = without_property_text(Transaction.objects.select_related('property_item', 'investor'))
+        page = paginate_request(request, transactions, ['-transaction_date', '-id'])
+        return page, ledger_summary('transaction')
+
+    page, (total_count, total_amount) = cached(
+        'transaction_list', [Transaction, PropertyItem, Investor], build, query_parts(request),
     )
-    return render(request, 'dealer/transaction_list.html', {'transactions': transactions})
+
+    context = {
+        'transactions': page,
+        'page': page,
+        'total_count': total_count,
+        'total_amount': total_amount,
+    }
+    return render(request, 'dealer/transaction_list.html', context)
 
 
 @login_required
@@ -533,18 +606,21 @@ def transaction_delete(request, id):
 # ===================== EXPENSES =====================
 
 @login_required
-@never_cache
+@revalidate('expense_list', [Expense, PropertyItem])
 def expense_list(request):
-    expenses = (
-        Expense.objects
-        .select_related('property_item')
-        .order_by('-date', '-id')
-    )
+    def build():
+        expenses = without_property_text(Expense.objects.select_related('property_item'))
+        page = paginate_request(request, expenses, ['-date', '-id'])
+        return page, ledger_summary('expense')
 
-    total_expense = expenses.aggregate(total=Sum('amount'))['total'] or 0
+    page, (total_count, total_expense) = cached(
+        'expense_list', [Expense, PropertyItem], build, query_parts(request),
+    )
 
     context = {
-        'expenses': expenses,
+        'expenses': page,
+        'page': page,
+        'total_count': total_count,
         'total_expense': total_expense,
     }
     return render(request, 'dealer/expense_list.html', context)
@@ -588,7 +664,10 @@ def expense_delete(request, id):
     expense = get_object_or_404(Expense, id=id)
 
     if request.method == 'POST':
-        expense.delete()
+        try:
+            expense.delete()
+        except PeriodClosedError as exc:
+            messages.error(request, exc.messages[0])
         return redirect('expense_list')
 
     return render(request, 'dealer/expense_confirm_delete.html', {'expense': expense})
@@ -597,18 +676,21 @@ def expense_delete(request, id):
 # ===================== INCOME =====================
 
 @login_required
-@never_cache
+@revalidate('income_list', [Income, PropertyItem])
 def income_list(request):
-    incomes = (
-        Income.objects
-        .select_related('property_item')
-        .order_by('-date', '-id')
-    )
+    def build():
+        incomes = without_property_text(Income.objects.select_related('property_item'))
+        page = paginate_request(request, incomes, ['-date', '-id'])
+        return page, ledger_summary('income')
 
-    total_income = incomes.aggregate(total=Sum('amount'))['total'] or 0
+    page, (total_count, total_income) = cached(
+        'income_list', [Income, PropertyItem], build, query_parts(request),
+    )
 
     context = {
-        'incomes': incomes,
+        'incomes': page,
+        'page': page,
+        'total_count': total_count,
         'total_income': total_income,
     }
     return render(request, 'dealer/income_list.html', context)
@@ -652,7 +734,10 @@ def income_delete(request, id):
     income = get_object_or_404(Income, id=id)
 
     if request.method == 'POST':
-        income.delete()
+        try:
+            income.delete()
+        except PeriodClosedError as exc:
+            messages.error(request, exc.messages[0])
         return redirect('income_list')
 
     return render(request, 'dealer/income_confirm_delete.html', {'income': income})
@@ -661,25 +746,35 @@ def income_delete(request, id):
 # ===================== REPORTS / FINANCE =====================
 
 @login_required
-@never_cache
+@revalidate('finance_report', FINANCE_MODELS, daily=True)
 def finance_report(request):
-    total_income = Income.objects.aggregate(total=Sum('amount'))['total'] or 0
-    total_expense = Expense.objects.aggregate(total=Sum('amount'))['total'] or 0
+    start, end, group, ranged = _report_range(request)
+    series = _cached_series(start, end, group)
+
+    if ranged:
+        expense_totals = series['expense_by_category']
+        income_totals = series['income_by_source']
+    else:
+        # all-time breakdowns come from the running totals, not from
+        # re-summing the ledgers
+        expense_totals, income_totals = cached(
+            'ledger_breakdown', FINANCE_MODELS,
+            lambda: (ledger_totals('expense'), ledger_totals('income')),
+        )
+
+    total_income = sum(income_totals.values(), 0)
+    total_expense = sum(expense_totals.values(), 0)
     net_balance = total_income - total_expense
 
-    expense_by_category = (
-        Expense.objects
-        .values('category')
-        .annotate(total=Sum('amount'))
-        .order_by('-total')
-    )
+    expense_by_category = [
+        {'category': key, 'total': total}
+        for key, total in sorted(expense_totals.items(), key=lambda kv: -kv[1])
+    ]
 
-    income_by_source = (
-        Income.objects
-        .values('source')
-        .annotate(total=Sum('amount'))
-        .order_by('-total')
-    )
+    income_by_source = [
+        {'source': key, 'total': total}
+        for key, total in sorted(income_totals.items(), key=lambda kv: -kv[1])
+    ]
 
     context = {
         'total_income': total_income,
@@ -687,10 +782,117 @@ def finance_report(request):
         'net_balance': net_balance,
         'expense_by_category': expense_by_category,
         'income_by_source': income_by_source,
+        'periods': series['periods'],
+        'chart_data': _chart_data(series),
+        'ranged': ranged,
+        'date_from': start if ranged else None,
+        'date_to': end if ranged else None,
+        'trend_start': start,
+        'trend_end': end,
+        'group': group,
+        'opening_balance': series['opening_balance'],
+        'closing_balance': series['closing_balance'],
+        'closed_through': closed_through(),
     }
     return render(request, 'dealer/finance_report.html', context)
 
 
+@login_required
+@never_cache
+def finance_close(request):
+    """POST ?month=YYYY-MM: close the books for every open month up to it."""
+    if request.method != 'POST':
+        return redirect('finance_report')
+
+    month = _parse_date((request.POST.get('month') or '') + '-01')
+    if month is None:
+        messages.error(request, "Pick the month to close.")
+        return redirect('finance_report')
+
+    try:
+        months = close_books(month, user=request.user)
+    except PeriodClosedError as exc:
+        messages.error(request, exc.messages[0])
+    else:
+        if months:
+            messages.success(request, f"Books closed through {month:%B %Y} ({len(months)} month(s)).")
+        else:
+            messages.info(request, f"{month:%B %Y} was already closed.")
+    return redirect('finance_report')
+
+
+@login_required
+@revalidate('finance_series_json', FINANCE_MODELS, daily=True)
+def finance_series_json(request):
+    """Income vs expense trend for charting (same ?from= / ?to= / ?group=)."""
+    start, end, group, _ = _report_range(request)
+    series = _cached_series(start, end, group)
+
+    data = _chart_data(series)
+    data.update({
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'group': group,
+        'total_income': float(series['total_income']),
+        'total_expense': float(series['total_expense']),
+    })
+    return JsonResponse(data)
+
+
+def _cached_series(start, end, group):
+    # today is part of the key: it decides which month is still open
+    return cached(
+        'finance_series', FINANCE_MODELS,
+        lambda: finance_series(start, end, group),
+        start, end, group, timezone.localdate(),
+    )
+
+
+def _parse_date(value):
+    try:
+        return datetime.date.fromisoformat((value or '').strip())
+    except ValueError:
+        return None
+
+
+def _report_range(request):
+    """
+    (start, end, group, ranged) from ?from= / ?to= / ?group=month|quarter.
+    Without either date the trend covers the last 12 months and `ranged`
+    is False (headline totals stay all-time).
+    """
+    group = request.GET.get('group', 'month')
+    if group not in GROUPINGS:
+        group = 'month'
+
+    start = _parse_date(request.GET.get('from'))
+    end = _parse_date(request.GET.get('to'))
+    ranged = bool(start or end)
+
+    if end is None:
+        end = timezone.localdate()
+    if start is None:
+        if ranged:
+            start = earliest_ledger_date() or end
+        else:
+            start = month_start(end)
+            for _ in range(11):
+                start = month_start(start - datetime.timedelta(days=1))
+    if start > end:
+        start, end = end, start
+    return start, end, group, ranged
+
+
+def _chart_data(series):
+    periods = series['periods']
+    return {
+        'labels': [p['label'] for p in periods],
+        'income': [float(p['income']) for p in periods],
+        'expense': [float(p['expense']) for p in periods],
+        'net': [float(p['net']) for p in periods],
+    }
+
+
 # ===================== BACKUP & TOOLS =====================
 
 @login_required
@@ -699,73 +901,57 @@ def export_backup_csv(request):
     """
     Download a CSV snapshot of all core data:
     - Investors
+    - Properties
+    - Transactions
+    - Commissions
     - Expenses
     - Income
     One file. Easy to keep offline or give to accountant.
+    Streamed section by section; ?gzip=1 sends it compressed.
     """
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="khplwak_backup.csv"'
+    chunks = buffered(backup_csv_lines())
 
-    writer = csv.writer(response)
-
-    # Investors
-    writer.writerow(['=== INVESTORS ==='])
-    writer.writerow([
-        'id', 'full_name', 'surname', 'phone', 'location',
-        'invested_amount', 'created_at'
-    ])
-    for inv in Investor.objects.all():
-        writer.writerow([
-            inv.id,
-            getattr(inv, 'full_name', ''),
-            getattr(inv, 'surname', ''),
-            getattr(inv, 'phone', ''),
-            getattr(inv, 'location', ''),
-            getattr(inv, 'invested_amount', ''),
-            getattr(inv, 'created_at', ''),
-        ])
-
-    writer.writerow([])
-
-    # Expenses
-    writer.writerow(['=== EXPENSES ==='])
-    writer.writerow([
-        'id', 'date', 'category', 'description', 'amount',
-        'property_item', 'remarks'
-    ])
-    for e in Expense.objects.all():
-        writer.writerow([
-            e.id,
-            e.date,
-            e.category,
-            e.description,
-            e.amount,
-            e.property_item.address if e.property_item else '',
-            e.remarks or '',
-        ])
-
-    writer.writerow([])
-
-    # Income
-    writer.writerow(['=== INCOME ==='])
-    writer.writerow([
-        'id', 'date', 'source', 'description', 'amount',
-        'property_item', 'remarks'
-    ])
-    for inc in Income.objects.all():
-        writer.writerow([
-            inc.id,
-            inc.date,
-            inc.source,
-            inc.description,
-            inc.amount,
-            inc.property_item.address if inc.property_item else '',
-            inc.remarks or '',
-        ])
+    if request.GET.get('gzip'):
+        response = StreamingHttpResponse(gzip_stream(chunks), content_type='application/gzip')
+        response['Content-Disposition'] = 'attachment; filename="khplwak_backup.csv.gz"'
+        return response
 
+    response = StreamingHttpResponse(chunks, content_type='text/csv')
+    response['Content-Disposition'] = 'attachment; filename="khplwak_backup.csv"'
     return response
 
 
+@login_required
+@never_cache
+def import_data(request):
+    """
+    Bulk import properties / investors from a CSV (or .xlsx) upload.
+    Rows are validated and inserted in batches as the file is read, in one
+    transaction; files over IMPORT_MAX_ROWS are left to khplwak_import.
+    """
+    result = None
+
+    if request.method == 'POST':
+        form = ImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            upload = form.cleaned_data['file']
+            try:
+                result = import_file(
+                    form.cleaned_data['kind'],
+                    upload,
+                    upload.name,
+                    dry_run=form.cleaned_data['dry_run'],
+                    skip_invalid=form.cleaned_data['skip_invalid'],
+                    max_rows=settings.IMPORT_MAX_ROWS,
+                )
+            except ValidationError as exc:
+                form.add_error('file', exc)
+    else:
+        form = ImportForm()
+
+    return render(request, 'dealer/import_form.html', {'form': form, 'result': result})
+
+
 @login_required
 @never_cache
 def backup_dashboard(request):
@@ -779,6 +965,19 @@ def backup_dashboard(request):
     return render(request, 'dealer/backup_dashboard.html')
 
 
+@login_required
+@never_cache
+def profiling_stats(request):
+    """Per-view query counts / timings recorded by RequestProfiler (this worker)."""
+    if request.method == 'POST':
+        reset_stats()
+        return redirect('profiling_stats')
+    return render(request, 'dealer/profiling_stats.html', {
+        'views': view_stats(),
+        'recent': recent_requests()[:50],
+    })
+
+
 # ===================== AUTH =====================
 
 